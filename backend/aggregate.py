@@ -0,0 +1,307 @@
+"""
+Incremental daily aggregates per report type.
+
+Each aggregator is fed parsed records one at a time and keeps only counters,
+so a multi-GB log can be summarised in a single streaming pass. The numbers
+match what the daily HTML reports show (totals, top-N tables, pie data) plus
+an hourly histogram of the notable events.
+
+The same numbers can be computed from a day in the event store
+(``from_store``), so every stored day has aggregates, whether or not it
+was ingested on upload.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import urllib.parse
+from collections import Counter
+from contextlib import closing
+from pathlib import Path
+
+import eventstore
+
+# Keep more than the reports display so monthly roll-ups stay accurate
+KEEP_TOP = 500
+
+
+def _webfilter(r):
+    if r.get("action") != "blocked" or "webfilter" not in r.get("subtype", ""):
+        return None
+    return {
+        "srcip": r.get("srcip", "Unknown"),
+        "url": r.get("url", r.get("hostname", "Unknown")),
+        "catdesc": r.get("catdesc", "Uncategorized"),
+        "crlevel": r.get("crlevel", "-"),
+    }
+
+
+def _appctrl(r):
+    if r.get("type") != "utm" or r.get("subtype") != "app-ctrl" or r.get("action") != "block":
+        return None
+    return {
+        "app": r.get("app", "Unknown"),
+        "srcip": r.get("srcip", "Unknown"),
+        "hostname": r.get("hostname", r.get("dstip", "No Hostname")),
+        "appcat": r.get("appcat", "Uncategorized"),
+        "apprisk": r.get("apprisk", "unknown"),
+    }
+
+
+def _ips(r):
+    severity = r.get("severity", "").lower()
+    action = r.get("action", "").lower()
+    if severity not in ("high", "critical") and action not in ("blocked", "block", "deny"):
+        return None
+    return {
+        "attack": r.get("attack", r.get("msg", "Unknown Attack")),
+        "srcip": r.get("srcip", "Unknown"),
+        "dstip": r.get("dstip", r.get("dst", r.get("destip", "N/A"))),
+        "srccountry": r.get("srccountry", "Unknown"),
+        "severity": severity,
+        "action": action,
+    }
+
+
+def _dns(r):
+    category = eventstore.DNS_CATEGORIES.get(r.get("cat", "0"), "Other")
+    action = r.get("action", "pass")
+    if category == "Other" and action not in ("blocked", "block", "deny"):
+        return None
+    return {
+        "category": category,
+        "qname": r.get("qname", "").lower(),
+        "srcip": r.get("srcip", "N/A"),
+        "action": action,
+    }
+
+
+def _antivirus(r):
+    action = r.get("action", "N/A")
+    crlevel = r.get("crlevel", "low").lower()
+    if action not in ("blocked", "block"):
+        return None
+    if crlevel not in ("critical", "high") and r.get("level", "info") != "warning":
+        return None
+    return {
+        "virus": r.get("virus", "Unknown"),
+        "url": r.get("url", "N/A"),
+        "filename": r.get("filename", "N/A"),
+        "srcip": r.get("srcip", "N/A"),
+    }
+
+
+# rtype -> (notable-event selector, fields counted for top-N tables)
+SPECS = {
+    "webfilter": (_webfilter, ["srcip", "url", "catdesc", "crlevel"]),
+    "appctrl": (_appctrl, ["app", "srcip", "hostname", "appcat", "apprisk"]),
+    "ips": (_ips, ["attack", "srcip", "dstip", "srccountry", "severity", "action"]),
+    "dns": (_dns, ["category", "qname", "srcip", "action"]),
+    "antivirus": (_antivirus, ["virus", "url", "filename", "srcip"]),
+}
+
+_DNS_CATEGORY_SQL = ("CASE COALESCE(cat, '0') "
+                     + " ".join(f"WHEN '{c}' THEN '{name}'" for c, name in eventstore.DNS_CATEGORIES.items())
+                     + " ELSE 'Other' END")
+
+# The SPECS fields as SQL over the event store, with the selectors' defaults
+FIELD_SQL = {
+    "webfilter": {
+        "srcip": "COALESCE(srcip, 'Unknown')",
+        "url": "COALESCE(url, hostname, 'Unknown')",
+        "catdesc": "COALESCE(catdesc, 'Uncategorized')",
+        "crlevel": "COALESCE(crlevel, '-')",
+    },
+    "appctrl": {
+        "app": "COALESCE(app, 'Unknown')",
+        "srcip": "COALESCE(srcip, 'Unknown')",
+        "hostname": "COALESCE(hostname, dstip, 'No Hostname')",
+        "appcat": "COALESCE(appcat, 'Uncategorized')",
+        "apprisk": "COALESCE(apprisk, 'unknown')",
+    },
+    "ips": {
+        "attack": "COALESCE(attack, msg, 'Unknown Attack')",
+        "srcip": "COALESCE(srcip, 'Unknown')",
+        "dstip": "COALESCE(dstip, dst, destip, 'N/A')",
+        "srccountry": "COALESCE(srccountry, 'Unknown')",
+        "severity": "lower(COALESCE(severity, ''))",
+        "action": "lower(COALESCE(action, ''))",
+    },
+    "dns": {
+        "category": _DNS_CATEGORY_SQL,
+        "qname": "lower(COALESCE(qname, ''))",
+        "srcip": "COALESCE(srcip, 'N/A')",
+        "action": "COALESCE(action, 'pass')",
+    },
+    "antivirus": {
+        "virus": "COALESCE(virus, 'Unknown')",
+        "url": "COALESCE(url, 'N/A')",
+        "filename": "COALESCE(filename, 'N/A')",
+        "srcip": "COALESCE(srcip, 'N/A')",
+    },
+}
+
+# What the HTML reports draw their pie chart from (top 8), and table length
+PIE_FIELDS = {
+    "webfilter": "catdesc",
+    "appctrl": "appcat",
+    "ips": "attack",
+    "dns": "category",
+    "antivirus": "virus",
+}
+PIE_TOP = 8
+TABLE_TOP = 10
+
+
+class DailyAggregator:
+    def __init__(self, rtype: str):
+        self.rtype = rtype
+        self._select, self.fields = SPECS[rtype]
+        self.total = 0
+        self.notable = 0
+        self.counters = {field: Counter() for field in self.fields}
+        self.hourly = [0] * 24
+
+    def feed(self, record: dict):
+        self.total += 1
+        event = self._select(record)
+        if event is None:
+            return
+        self.notable += 1
+        for field in self.fields:
+            self.counters[field][event[field]] += 1
+        hour = record.get("time", "")[:2]
+        if hour.isdigit() and int(hour) < 24:
+            self.hourly[int(hour)] += 1
+
+    def result(self) -> dict:
+        return {
+            "type": self.rtype,
+            "total": self.total,
+            "notable": self.notable,
+            "top": {f: c.most_common(KEEP_TOP) for f, c in self.counters.items()},
+            "hourly": self.hourly,
+        }
+
+    def state(self) -> dict:
+        """Everything fed so far, untrimmed (``result()`` keeps only the top entries); see ``restore``."""
+        return {"total": self.total, "notable": self.notable, "hourly": self.hourly,
+                "counters": {f: dict(c) for f, c in self.counters.items()}}
+
+    @classmethod
+    def restore(cls, rtype: str, state: dict) -> "DailyAggregator":
+        agg = cls(rtype)
+        agg.total = state["total"]
+        agg.notable = state["notable"]
+        agg.hourly = list(state["hourly"])
+        for field in agg.fields:
+            agg.counters[field] = Counter(state["counters"].get(field, {}))
+        return agg
+
+
+def aggregates_path(folder: Path, ymd: str, device: str = None, vdom: str = None) -> Path:
+    if device is None and vdom is None:
+        return folder / "aggregates" / f"daily_{ymd}.json"
+    # one device and/or VDOM: daily_YYYYMMDD@<device>@<vdom>.json, either part may be empty.
+    # Percent-encoded, not partition_name(): "a/b" and "a_b" must not share a file.
+    scope = "@".join(urllib.parse.quote(v, safe="") if v else "" for v in (device, vdom))
+    return folder / "aggregates" / f"daily_{ymd}@{scope}.json"
+
+
+def save(folder: Path, ymd: str, data: dict, device: str = None, vdom: str = None) -> Path:
+    path = aggregates_path(folder, ymd, device, vdom)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # per writer: an upload and a data request may save the same day at once
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def from_store(day: "eventstore.Day", rtype: str) -> dict:
+    """``DailyAggregator.result()`` for a stored day, by query instead of a re-parse."""
+    records = eventstore.RECORD_SQL[rtype]
+    notable = f"{records} AND ({eventstore.NOTABLE_SQL[rtype]})"
+    with closing(day.connect()) as conn:
+        total, hits = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(CASE WHEN {notable} THEN 1 ELSE 0 END), 0)"
+                                   f" FROM events WHERE {records}").fetchone()
+        top = {
+            field: [list(row) for row in conn.execute(
+                f"SELECT {expr}, COUNT(*) FROM events WHERE {notable} GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT {KEEP_TOP}")]
+            for field, expr in FIELD_SQL[rtype].items()
+        }
+        hourly = [0] * 24
+        for hour, count in conn.execute(
+                f"SELECT CAST(substr(time, 1, 2) AS INTEGER), COUNT(*) FROM events"
+                f" WHERE {notable} AND substr(time, 1, 2) GLOB '[0-9][0-9]' GROUP BY 1"):
+            if hour < 24:
+                hourly[hour] += count
+    return {"type": rtype, "total": total, "notable": hits, "top": top, "hourly": hourly}
+
+
+def current(folder: Path, rtype: str, ymd: str, device: str = None, vdom: str = None):
+    """Path of the day's aggregates (for one device and/or VDOM if given), or None if there are none.
+
+    Recomputed from the event store when the stored day is newer than the
+    saved file (a generation re-parsed the raw log, a device was added), or
+    there is no file yet.
+    """
+    path = aggregates_path(folder, ymd, device, vdom)
+    saved = path.stat().st_mtime_ns if path.exists() else 0
+    day = eventstore.Day(folder, ymd, device, vdom)
+    parts = day.partitions if eventstore.enabled() else []
+    try:
+        if parts and max(p.stat().st_mtime_ns for p in parts) > saved:
+            save(folder, ymd, from_store(day, rtype), device, vdom)
+            return path
+    except (OSError, sqlite3.Error):
+        # a day being rebuilt right now: keep serving what was saved
+        pass
+    return path if saved else None
+
+
+def month_days(folder: Path, yyyymm: str) -> list:
+    """Days of a month (YYYYMMDD) with saved or stored aggregates, oldest first."""
+    days = {p.stem[len("daily_"):] for p in (Path(folder) / "aggregates").glob(f"daily_{yyyymm}[0-3][0-9].json")}
+    if eventstore.enabled():
+        days.update(day.ymd for day in eventstore.month_days(folder, yyyymm))
+    return sorted(days)
+
+
+def load(path: Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def merge(rtype: str, results) -> dict:
+    """Sum daily results; top-N lists are merged from each day's KEEP_TOP entries."""
+    counters = {field: Counter() for field in SPECS[rtype][1]}
+    total = notable = 0
+    hourly = [0] * 24
+    for data in results:
+        total += data["total"]
+        notable += data["notable"]
+        for field, rows in data["top"].items():
+            if field in counters:
+                counters[field].update(dict(rows))
+        hourly = [a + b for a, b in zip(hourly, data["hourly"])]
+    return {
+        "type": rtype,
+        "total": total,
+        "notable": notable,
+        "top": {f: c.most_common(KEEP_TOP) for f, c in counters.items()},
+        "hourly": hourly,
+    }
+
+
+def compact(data: dict, top: int = TABLE_TOP) -> dict:
+    """What a dashboard needs from a result: trimmed tables, the pie slices, the hourly series."""
+    pie = data["top"].get(PIE_FIELDS[data["type"]], [])[:PIE_TOP]
+    return {
+        "type": data["type"],
+        "total": data["total"],
+        "notable": data["notable"],
+        "top": {field: rows[:top] for field, rows in data["top"].items()},
+        "pie": {"field": PIE_FIELDS[data["type"]], "labels": [k for k, _ in pie], "values": [v for _, v in pie]},
+        "hourly": data["hourly"],
+    }
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the report generators.
+
+``synth`` writes deterministic FortiGate-style raw logs; ``suite`` runs the
+daily and monthly generators over them in a scratch report tree and saves
+the measurements as JSON. Run from ``backend/``::
+
+    python -m bench.synth ips 2025_11_02 --lines 1M -o /tmp/disk-ips-2025_11_02.log
+    python -m bench.suite --lines 1M --days 3 --types ips,dns
+"""
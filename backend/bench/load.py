@@ -0,0 +1,287 @@
+"""
+Load test for report listing and serving.
+
+Populates a fake report tree (years of daily and monthly HTML reports for
+every type), then lets N concurrent virtual analysts browse it: list a
+type's reports, open one (recent days far more often than old ones), come
+back later and revalidate it with its ETag. By default the app runs
+in-process through httpx's ASGI transport; ``--url`` drives a running
+server instead (start it with ``FORTI_REPORT_DIR`` pointing at the same
+tree). Latency percentiles and throughput are printed per endpoint and
+saved as JSON.
+
+    python -m bench.load --years 5 --users 200 --requests 20000
+    python -m bench.load --workdir /tmp/tree --populate-only
+    FORTI_REPORT_DIR=/tmp/tree uvicorn main:app --port 8000 &
+    python -m bench.load --workdir /tmp/tree --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bench import suite, synth  # noqa: E402
+
+# folder, daily prefix, monthly prefix -- as in main.REPORT_CONFIG
+TREE = {
+    "appctrl": ("Python Reports Application", "AppCtrl_Blocked_", "AppCtrl_Monthly_Report_"),
+    "webfilter": ("Python Generate WebFilter", "WebFilter_Blocked_", "WebFilter_Monthly_Report_"),
+    "ips": ("Python Generate Intrusion", "IPS_Critical_Events_", "IPS_Monthly_Report_"),
+    "dns": ("Python Generate DNS", "DNS_Events_Report_", "DNS_Monthly_Report_"),
+    "antivirus": ("Python Generate Antivirus", "AV_Infected_Report_", "AV_Monthly_Report_"),
+}
+
+# what an analyst does next, with relative weights
+MIX = (
+    ("list_daily", 20),
+    ("list_monthly", 5),
+    ("open_daily", 50),
+    ("open_monthly", 10),
+    ("revalidate", 15),
+)
+
+MARKER = ".bench-tree.json"
+
+
+# ---------------------------
+# Fake report tree
+# ---------------------------
+def _report_html(title: str, size: int, rng: random.Random) -> str:
+    rows = []
+    length = 0
+    while length < size:
+        row = (f"<tr><td>{rng.choice(synth.SIGNATURES)}</td><td>10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}</td>"
+               f"<td>{rng.randint(1, 99999):,}</td></tr>\n")
+        rows.append(row)
+        length += len(row)
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title></head><body>"
+            f"<h1>{title}</h1><table class='table'><tr><th>Name</th><th>Source</th><th>Count</th></tr>\n"
+            + "".join(rows) + "</table></body></html>\n")
+
+
+def populate(root: Path, years: int, size: int, types, precompress: bool = False, seed: int = 0) -> dict:
+    """Write ``years`` of daily and monthly reports per type up to yesterday (kept if already there)."""
+    spec = {"years": years, "size": size, "types": list(types), "precompress": precompress, "seed": seed}
+    marker = root / MARKER
+    try:
+        existing = json.loads(marker.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        existing = None
+    if existing and existing.get("spec") == spec:
+        return existing
+
+    rng = random.Random(seed)
+    end = date.today() - timedelta(days=1)
+    days = [end - timedelta(days=i) for i in range(365 * years)]
+    months = sorted({(d.year, d.month) for d in days if (d.year, d.month) != (date.today().year, date.today().month)})
+    counts = {"daily": 0, "monthly": 0}
+    for rtype in types:
+        folder, daily_prefix, monthly_prefix = TREE[rtype]
+        daily_dir = root / folder / "daily_reports"
+        monthly_dir = root / folder / "monthly_reports"
+        daily_dir.mkdir(parents=True, exist_ok=True)
+        monthly_dir.mkdir(parents=True, exist_ok=True)
+        for d in days:
+            (daily_dir / f"{daily_prefix}{d:%Y%m%d}.html").write_text(
+                _report_html(f"{rtype} {d:%d %B %Y}", size, rng), encoding="utf-8")
+        for y, m in months:
+            (monthly_dir / f"{monthly_prefix}{y}{m:02d}.html").write_text(
+                _report_html(f"{rtype} {y}-{m:02d}", size * 2, rng), encoding="utf-8")
+        counts["daily"] += len(days)
+        counts["monthly"] += len(months)
+        if precompress:
+            import storage
+            storage.precompress_folder(daily_dir)
+            storage.precompress_folder(monthly_dir)
+    info = {"spec": spec, "counts": counts, "created": datetime.now().isoformat(timespec="seconds")}
+    marker.write_text(json.dumps(info, indent=2), encoding="utf-8")
+    return info
+
+
+# ---------------------------
+# Virtual analysts
+# ---------------------------
+def _percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+class _Stats:
+    def __init__(self):
+        self.samples = {}  # endpoint -> [(seconds, status)]
+
+    def add(self, endpoint: str, seconds: float, status: int):
+        self.samples.setdefault(endpoint, []).append((seconds, status))
+
+    def summary(self, wall: float) -> dict:
+        out = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            times = sorted(s for s, _ in samples)
+            errors = sum(1 for _, status in samples if status == 0 or status >= 400)
+            out[endpoint] = {
+                "count": len(samples),
+                "errors": errors,
+                "rps": round(len(samples) / wall, 1) if wall else None,
+                "mean_ms": round(sum(times) / len(times) * 1000, 2),
+                "p50_ms": round(_percentile(times, 50) * 1000, 2),
+                "p95_ms": round(_percentile(times, 95) * 1000, 2),
+                "p99_ms": round(_percentile(times, 99) * 1000, 2),
+                "max_ms": round(times[-1] * 1000, 2),
+            }
+        return out
+
+
+async def _analyst(client, rng: random.Random, types, budget: dict, stats: _Stats, record: bool):
+    listings = {}  # (rtype, period) -> entries from the listing endpoint
+    seen = {}      # path -> etag
+    actions, weights = zip(*MIX)
+
+    async def call(endpoint, path, headers=None):
+        budget["left"] -= 1
+        started = time.perf_counter()
+        try:
+            resp = await client.get(path, headers=headers)
+            await resp.aread()
+            status = resp.status_code
+        except Exception:
+            resp, status = None, 0
+        if record:
+            stats.add(endpoint, time.perf_counter() - started, status)
+        return resp
+
+    async def listing(rtype, period):
+        resp = await call(f"GET /api/reports/{{rtype}}/{period}", f"/api/reports/{rtype}/{period}")
+        if resp is not None and resp.status_code == 200:
+            listings[(rtype, period)] = resp.json()
+        return listings.get((rtype, period)) or []
+
+    while budget["left"] > 0:
+        action = rng.choices(actions, weights)[0]
+        rtype = rng.choice(types)
+        if action in ("list_daily", "list_monthly"):
+            await listing(rtype, action.split("_")[1])
+        elif action in ("open_daily", "open_monthly"):
+            period = action.split("_")[1]
+            entries = listings.get((rtype, period)) or await listing(rtype, period)
+            if not entries:
+                continue
+            # newest first; analysts mostly look at the last few weeks
+            entry = entries[min(len(entries) - 1, int(rng.expovariate(1 / 20)))]
+            resp = await call(f"GET /api/serve/{{rtype}}/{period} 200", entry["path"],
+                              {"Accept-Encoding": "gzip, deflate, br"})
+            if resp is not None and resp.status_code == 200 and resp.headers.get("etag"):
+                seen[entry["path"]] = resp.headers["etag"]
+        elif seen:
+            path = rng.choice(sorted(seen))
+            await call("GET /api/serve/{rtype}/{period} 304", path,
+                       {"If-None-Match": seen[path], "Accept-Encoding": "gzip, deflate, br"})
+
+
+async def _drive(client, users: int, requests: int, warmup: int, types, seed: int):
+    stats = _Stats()
+    if warmup:
+        budget = {"left": warmup}
+        await asyncio.gather(*(_analyst(client, random.Random(f"warmup:{seed}:{i}"), types, budget, stats, False)
+                               for i in range(min(users, warmup))))
+    budget = {"left": requests}
+    started = time.perf_counter()
+    await asyncio.gather(*(_analyst(client, random.Random(f"{seed}:{i}"), types, budget, stats, True)
+                           for i in range(users)))
+    wall = time.perf_counter() - started
+    return stats, wall
+
+
+async def _run(args, root: Path, types):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), limits=limits, timeout=60)
+    else:
+        # the app reads FORTI_REPORT_DIR when it is imported
+        os.environ["FORTI_REPORT_DIR"] = str(root)
+        import main
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench",
+                                   limits=limits, timeout=60)
+    async with client:
+        return await _drive(client, args.users, args.requests, args.warmup, types, args.seed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test report listing and serving")
+    parser.add_argument("--years", type=int, default=5, help="years of daily reports per type (default 5)")
+    parser.add_argument("--size", default="30K", help="size of a daily report, K/M suffixes (monthlies are twice that)")
+    parser.add_argument("--types", help="comma separated report types (default: all)")
+    parser.add_argument("--precompress", action="store_true", help="also write .gz/.br variants, as generation does")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual analysts (default 50)")
+    parser.add_argument("--requests", type=int, default=10000, help="measured requests in total (default 10000)")
+    parser.add_argument("--warmup", type=int, default=500, help="requests before measuring (default 500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="base URL of a running server (default: the app in-process)")
+    parser.add_argument("--workdir", help="report tree to create or reuse (default: a temporary one)")
+    parser.add_argument("--populate-only", action="store_true", help="build the tree and exit")
+    parser.add_argument("--output", help=f"results file (default {suite.RESULTS_DIR}/load_<time>.json)")
+    args = parser.parse_args(argv)
+
+    types = args.types.split(",") if args.types else list(TREE)
+    unknown = [t for t in types if t not in TREE]
+    if unknown:
+        parser.error(f"Unknown type(s): {', '.join(unknown)}")
+    if args.url and not args.workdir:
+        parser.error("--url needs --workdir: the server must serve the same tree")
+
+    root = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="forti-load-"))
+    try:
+        t0 = time.perf_counter()
+        tree = populate(root, args.years, synth.parse_count(args.size), types, args.precompress, args.seed)
+        print(f"Report tree: {root} ({tree['counts']['daily']:,} daily, {tree['counts']['monthly']:,} monthly"
+              f", ready in {time.perf_counter() - t0:.1f}s)")
+        if args.populate_only:
+            return 0
+
+        stats, wall = asyncio.run(_run(args, root, types))
+        summary = stats.summary(wall)
+        total = sum(s["count"] for s in summary.values())
+        print(f"\n{args.users} users, {total:,} requests in {wall:.1f}s = {total / wall:,.0f} req/s"
+              f" ({'in-process' if not args.url else args.url})\n")
+        print(f"{'endpoint':42} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for endpoint, s in summary.items():
+            print(f"{endpoint:42} {s['count']:>7,} {s['errors']:>5} {s['rps']:>8,.1f} {s['p50_ms']:>8.2f}"
+                  f" {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+
+        output = Path(args.output) if args.output else suite.RESULTS_DIR / f"load_{datetime.now():%Y%m%d_%H%M%S}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "environment": suite.environment(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "populate_only")},
+            "tree": tree,
+            "wall_seconds": round(wall, 3),
+            "requests": total,
+            "rps": round(total / wall, 1),
+            "endpoints": summary,
+        }, indent=2), encoding="utf-8")
+        print(f"\nResults: {output}")
+        return 1 if any(s["errors"] for s in summary.values()) else 0
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Generator benchmark suite.
+
+Builds a scratch report tree (``FORTI_REPORT_DIR``), fills ``Raw Logs`` with
+synthetic logs and runs every daily generator, then each monthly over the
+dailies it produced. Each run gets a fresh worker process, the same
+``workers.execute`` path the API uses, so the per-stage timings and peak RSS
+come from ``progress`` exactly as they do for real jobs. Results go to a
+JSON file; ``compare`` diffs two of them.
+
+    python -m bench.suite run --lines 1M,10M --days 3 --types ips,dns
+    python -m bench.suite compare bench/results/old.json bench/results/new.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REPO_REPORTS = BACKEND_DIR.parent / "public" / "Python Report"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bench import synth  # noqa: E402
+
+# folder, daily script, monthly script, raw log prefix -- as in main.REPORT_CONFIG / RAW_LOG_PREFIX
+REPORTS = {
+    "appctrl": ("Python Reports Application", "daily report application.py",
+                "monthly report application.py", "disk-appctrl-"),
+    "webfilter": ("Python Generate WebFilter", "daily report.py", "monthly report.py", "disk-webfilter-"),
+    "ips": ("Python Generate Intrusion", "generate IPS daily.py", "generate IPS Monthly.py", "disk-ips-"),
+    "dns": ("Python Generate DNS", "generate dns daily.py", "generate dns monthly.py", "disk-dns-"),
+    "antivirus": ("Python Generate Antivirus", "generate antivirus daily.py",
+                  "generate antivirus monthly.py", "disk-antivirus-"),
+}
+
+TIMEOUT = 6 * 3600
+# run once per fresh worker before the timed run, so imports are not timed
+WARMUP_SCRIPT = "warmup.py"
+
+
+def environment() -> dict:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+    try:
+        from importlib.metadata import version
+        info["pandas"] = version("pandas")
+    except Exception:
+        pass
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                        capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        info["commit"] = None
+    return info
+
+
+def _prepare_tree(workdir: Path, types):
+    """Report folders under ``workdir``; the scripts are read from the repo, outputs stay here."""
+    for rtype in types:
+        (workdir / REPORTS[rtype][0] / "Raw Logs").mkdir(parents=True, exist_ok=True)
+    (workdir / "job_logs").mkdir(exist_ok=True)
+    (workdir / WARMUP_SCRIPT).write_text("def generate(date=None):\n    return None\n", encoding="utf-8")
+
+
+def _run(rtype: str, mode: str, date: str, workdir: Path) -> dict:
+    import workers
+
+    folder, daily, monthly, _ = REPORTS[rtype]
+    script = REPO_REPORTS / folder / (daily if mode == "daily" else monthly)
+    log_file = workdir / "job_logs" / f"{rtype}_{mode}_{date}.log"
+    worker = workers.WorkerProcess(multiprocessing.get_context("spawn"))
+    try:
+        # the first task only returns once the worker has finished its imports
+        warmup = worker.run({"script": str(workdir / WARMUP_SCRIPT), "log_file": str(log_file)},
+                            threading.Event(), 300)
+        if warmup.get("error"):
+            raise RuntimeError(f"Benchmark worker did not start: {warmup['error']}")
+        started = time.perf_counter()
+        result = worker.run({"script": str(script), "date": date, "log_file": str(log_file)},
+                            threading.Event(), TIMEOUT)
+        seconds = time.perf_counter() - started
+    finally:
+        worker.stop()
+    timings = result.get("timings") or {}
+    return {
+        "type": rtype,
+        "mode": mode,
+        "date": date,
+        "seconds": round(seconds, 3),
+        "peak_rss": timings.get("peak_rss"),
+        "stages": timings.get("stages", []),
+        "summary": result.get("summary"),
+        "error": result.get("error"),
+    }
+
+
+def _fmt_rss(value) -> str:
+    return f"{value / 2**20:,.0f} MiB" if value else "-"
+
+
+def cmd_run(args) -> int:
+    volumes = [synth.parse_count(v) for v in args.lines.split(",")]
+    types = args.types.split(",") if args.types else list(REPORTS)
+    unknown = [t for t in types if t not in REPORTS]
+    if unknown:
+        raise SystemExit(f"Unknown type(s): {', '.join(unknown)}")
+    cardinality = synth.parse_cardinality(args.cardinality)
+    first = datetime.strptime(args.month + "_01", "%Y_%m_%d")
+    days = [(first + timedelta(days=i)).strftime("%Y_%m_%d") for i in range(args.days)]
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="forti-bench-"))
+    _prepare_tree(workdir, types)
+    # read by the generator scripts in the worker processes
+    os.environ["FORTI_REPORT_DIR"] = str(workdir)
+    print(f"Report tree: {workdir}")
+
+    record = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "params": {"lines": volumes, "days": days, "types": types, "seed": args.seed, "match": args.match,
+                   "cardinality": {**synth.DEFAULT_CARDINALITY, **cardinality}, "repeat": args.repeat},
+        "runs": [],
+    }
+    try:
+        for volume in volumes:
+            for rtype in types:
+                folder, _, _, prefix = REPORTS[rtype]
+                for day in days:
+                    t0 = time.perf_counter()
+                    log = synth.write_log(workdir / folder / "Raw Logs" / f"{prefix}{day}.log", rtype, day, volume,
+                                          args.seed, args.match, cardinality)
+                    if not log["reused"]:
+                        print(f"  synthesized {rtype} {day}: {volume:,} lines in {time.perf_counter() - t0:.1f}s")
+                    for n in range(args.repeat):
+                        run = _run(rtype, "daily", day, workdir)
+                        run.update({"volume": volume, "repeat": n, "lines": volume, "bytes": log["bytes"],
+                                    "lines_per_second": round(volume / run["seconds"]) if run["seconds"] else None})
+                        record["runs"].append(run)
+                        print(f"{rtype:9} daily   {day} {volume:>11,} lines {run['seconds']:8.2f}s "
+                              f"{run['lines_per_second'] or 0:>9,}/s  peak {_fmt_rss(run['peak_rss'])}"
+                              + (f"  ERROR {run['error']}" if run["error"] else ""), flush=True)
+                if args.no_monthly:
+                    continue
+                for n in range(args.repeat):
+                    run = _run(rtype, "monthly", args.month.replace("_", ""), workdir)
+                    run.update({"volume": volume, "repeat": n, "inputs": len(days)})
+                    record["runs"].append(run)
+                    print(f"{rtype:9} monthly {run['date']:10} {len(days):>5} dailies      {run['seconds']:8.2f}s "
+                          f"{'':>11}  peak {_fmt_rss(run['peak_rss'])}"
+                          + (f"  ERROR {run['error']}" if run["error"] else ""), flush=True)
+    finally:
+        record["finished"] = datetime.now().isoformat(timespec="seconds")
+        output = Path(args.output) if args.output else RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(record, indent=2), encoding="utf-8")
+        print(f"Results: {output}")
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), record)
+    return 1 if any(r["error"] for r in record["runs"]) else 0
+
+
+def _medians(record: dict) -> dict:
+    grouped = {}
+    for run in record["runs"]:
+        if run.get("error"):
+            continue
+        key = (run["type"], run["mode"], run.get("volume"))
+        grouped.setdefault(key, []).append(run)
+    out = {}
+    for key, runs in grouped.items():
+        stages = {}
+        for run in runs:
+            for stage in run["stages"]:
+                stages.setdefault(stage["stage"], []).append(stage["seconds"])
+        out[key] = {
+            "seconds": statistics.median(r["seconds"] for r in runs),
+            "peak_rss": statistics.median(r["peak_rss"] or 0 for r in runs),
+            "stages": {name: statistics.median(values) for name, values in stages.items()},
+        }
+    return out
+
+
+def compare(old: dict, new: dict):
+    """Print median wall time, peak RSS and per-stage time of ``new`` against ``old``."""
+    before, after = _medians(old), _medians(new)
+
+    def delta(a, b):
+        return f"{(b - a) / a * 100:+6.1f}%" if a else "    n/a"
+
+    print(f"{'type':9} {'mode':7} {'lines':>11} {'seconds':>19} {'':7} {'peak RSS':>23}")
+    for key in sorted(set(before) & set(after), key=lambda k: (k[0], k[1], k[2] or 0)):
+        a, b = before[key], after[key]
+        print(f"{key[0]:9} {key[1]:7} {key[2] or 0:>11,} {a['seconds']:8.2f} -> {b['seconds']:8.2f} "
+              f"{delta(a['seconds'], b['seconds'])} {_fmt_rss(a['peak_rss']):>10} -> {_fmt_rss(b['peak_rss']):>10}")
+        for name, seconds in b["stages"].items():
+            if name in a["stages"]:
+                print(f"{'':19}   {name:>12} {a['stages'][name]:8.2f} -> {seconds:8.2f} "
+                      f"{delta(a['stages'][name], seconds)}")
+    missing = sorted(set(before) ^ set(after), key=lambda k: (k[0], k[1], k[2] or 0))
+    if missing:
+        print("Only in one file:", ", ".join(f"{t}/{m}/{v}" for t, m, v in missing))
+
+
+def cmd_compare(args) -> int:
+    compare(*(json.loads(Path(p).read_text(encoding="utf-8")) for p in (args.old, args.new)))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the report generators on synthetic logs")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="generate synthetic logs and time every generator")
+    p.add_argument("--lines", default="100K", help="lines per daily log, comma separated for several volumes (e.g. 1M,10M,50M)")
+    p.add_argument("--days", type=int, default=2, help="days of logs per type, which the monthly then covers (default 2)")
+    p.add_argument("--month", default="2025_11", help="month to put the synthetic days in, YYYY_MM")
+    p.add_argument("--types", help="comma separated report types (default: all)")
+    p.add_argument("--no-monthly", action="store_true", help="only time the dailies")
+    p.add_argument("--repeat", type=int, default=1, help="runs per generator (compare uses the median)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--match", type=float, default=0.3, help="share of lines each report keeps")
+    p.add_argument("--cardinality", nargs="*", metavar="KEY=N", help="distinct values per field, e.g. hosts=50000")
+    p.add_argument("--workdir", help="report tree to use and keep (synthetic logs are reused when unchanged)")
+    p.add_argument("--keep", action="store_true", help="keep the temporary report tree")
+    p.add_argument("--output", help=f"results file (default {RESULTS_DIR}/bench_<time>.json)")
+    p.add_argument("--compare", metavar="BASELINE", help="results file to compare this run against")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("compare", help="compare two results files")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
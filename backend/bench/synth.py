@@ -0,0 +1,325 @@
+"""
+Deterministic synthetic FortiGate logs.
+
+Lines look like what a FortiGate writes to disk (key=value, quoted strings)
+for the five report types, with the fields the generators read. The same
+(type, day, lines, seed, cardinalities) always gives the same file. Values
+are drawn from Zipf-like pools, so a few hosts, domains and signatures
+dominate the way they do on real traffic. ``--match`` sets the share of lines
+a report keeps (blocked / critical / infected).
+
+    python -m bench.synth webfilter 2025_11_02 --lines 10M -o "disk-webfilter-2025_11_02.log"
+"""
+
+import argparse
+import hashlib
+import itertools
+import random
+import sys
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+TYPES = ("appctrl", "webfilter", "ips", "dns", "antivirus")
+
+# distinct values per field; scale them with --cardinality
+DEFAULT_CARDINALITY = {
+    "hosts": 2000,      # internal source IPs
+    "servers": 5000,    # external destination IPs
+    "domains": 20000,
+    "apps": 400,
+    "signatures": 300,
+    "viruses": 80,
+    "devices": 1,       # FortiGates (devname / devid)
+    "vdoms": 1,         # VDOMs per device: root, vdom1, ...
+}
+
+CHUNK = 8192
+
+WEB_CATEGORIES = [
+    (26, "Malicious Websites"), (61, "Phishing"), (86, "Spam URLs"), (88, "Dynamic DNS"),
+    (14, "Pornography"), (11, "Gambling"), (59, "Proxy Avoidance"), (37, "Social Networking"),
+    (52, "Information Technology"), (90, "Newly Observed Domain"), (91, "Newly Registered Domain"),
+    (49, "Business"), (41, "Search Engines and Portals"), (25, "File Sharing and Storage"),
+]
+DNS_CATEGORIES = [
+    (62, "Phishing"), (63, "Malicious Websites"), (64, "Newly Observed Domain"),
+    (65, "Newly Registered Domain"), (66, "Dynamic DNS"), (67, "Spam URLs"), (68, "Gambling"),
+    (69, "Pornography"), (52, "Information Technology"), (49, "Business"), (41, "Search Engines and Portals"),
+]
+APPS = [
+    ("Facebook", "Social.Media", "medium"), ("YouTube", "Video/Audio", "elevated"),
+    ("BitTorrent", "P2P", "critical"), ("TikTok", "Social.Media", "medium"),
+    ("Tor", "Proxy", "critical"), ("TeamViewer", "Remote.Access", "high"),
+    ("Dropbox", "Cloud.IT", "elevated"), ("Netflix", "Video/Audio", "low"),
+    ("WhatsApp", "Collaboration", "medium"), ("Telegram", "Collaboration", "elevated"),
+    ("AnyDesk", "Remote.Access", "high"), ("Psiphon", "Proxy", "critical"),
+    ("Spotify", "Video/Audio", "low"), ("Instagram", "Social.Media", "medium"),
+    ("Steam", "Game", "elevated"), ("OpenVPN", "Network.Service", "high"),
+]
+SIGNATURES = [
+    "MS.SMB.Server.SMB1.Trans2.Secondary.Handling.Code.Execution", "Apache.Log4j.Error.Log.Remote.Code.Execution",
+    "HTTP.URI.SQL.Injection", "Bladabindi.Botnet", "Nmap.Script.Scanner", "SSH.Brute.Force.Login",
+    "PHPUnit.Eval-stdin.PHP.Remote.Code.Execution", "ThinkPHP.Controller.Parameter.Remote.Code.Execution",
+    "Mirai.Botnet", "Web.Server.Password.Files.Access", "Cross.Site.Scripting", "Zeus.Botnet",
+    "Netcore.Netis.Devices.Hardcoded.Password.Security.Bypass", "Microsoft.Exchange.Server.SSRF",
+]
+SEVERITIES = ["critical", "high", "medium", "low", "info"]
+VIRUSES = [
+    "EICAR_TEST_FILE", "W32/Agent.ABCD!tr", "JS/Miner.BP!tr", "W32/Emotet.A!tr", "MSOffice/Agent.BXT!tr",
+    "HTML/Phishing.A!tr", "Linux/Mirai.B!tr", "W32/GenKryptik.FKJQ!tr", "Riskware/CoinMiner", "PDF/Phish.C!tr",
+]
+COUNTRIES = ["United States", "China", "Russian Federation", "Netherlands", "Germany", "Brazil",
+             "India", "Viet Nam", "France", "Reserved", "Singapore", "Korea, Republic of"]
+SERVICES = ["HTTPS", "HTTP", "DNS", "SMB", "SSH", "RDP", "SMTP", "FTP"]
+AGENTS = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64)", "curl/8.4.0", "Microsoft BITS/7.8",
+          "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_1)", "python-requests/2.31"]
+TLDS = ["com", "net", "org", "io", "ru", "cn", "info", "xyz", "top", "vn"]
+SYLLABLES = ["ka", "lo", "mi", "net", "tra", "zen", "cdn", "sec", "po", "ra", "vi", "go", "mo", "ex", "da", "lu"]
+
+
+def parse_count(value: str) -> int:
+    """``"10M"`` -> 10_000_000 (K/M/G suffixes)."""
+    value = str(value).strip().upper()
+    scale = {"K": 10**3, "M": 10**6, "G": 10**9}.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+def _id(value: str, mod: int) -> int:
+    # stable across processes, unlike hash()
+    return zlib.crc32(value.encode()) % mod
+
+
+def _zipf(n: int, s: float = 1.1):
+    total = 0.0
+    cum = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** s
+        cum.append(total)
+    return cum
+
+
+def _extend(base: list, n: int, make) -> list:
+    """``base`` first (the common real names), then synthetic ones up to ``n``."""
+    out = list(base[:n])
+    out.extend(make(i) for i in range(len(out), n))
+    return out
+
+
+class _Pools:
+    def __init__(self, rng: random.Random, card: dict):
+        self.hosts = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256 or 1}" for i in range(card["hosts"])]
+        rng.shuffle(self.hosts)
+        self.servers = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                        for _ in range(card["servers"])]
+        self.domains = [
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + f"{i}.{rng.choice(TLDS)}"
+            for i in range(card["domains"])]
+        self.apps = _extend(APPS, card["apps"],
+                            lambda i: (f"App.{i}", rng.choice(["Web.Client", "Business", "Storage.Backup", "General.Interest"]),
+                                       rng.choice(["low", "medium", "elevated", "high"])))
+        self.signatures = _extend(SIGNATURES, card["signatures"], lambda i: f"Generic.Exploit.Attempt.{i}")
+        self.viruses = _extend(VIRUSES, card["viruses"], lambda i: f"W32/Kryptik.{i:04X}!tr")
+        self.devices = [f'devname="FGT-{i + 1:02d}" devid="FG100FTK22{i + 1:06d}"' for i in range(card["devices"])]
+        self.vdoms = ["root", *(f"vdom{i}" for i in range(1, card["vdoms"]))]
+        self.cum = {name: _zipf(len(getattr(self, name)))
+                    for name in ("hosts", "servers", "domains", "apps", "signatures", "viruses")}
+
+    def pick(self, rng, name: str, k: int) -> list:
+        return rng.choices(getattr(self, name), cum_weights=self.cum[name], k=k)
+
+    def origins(self, rng, k: int) -> list:
+        """(devname/devid, vd) per line, evenly over devices and VDOMs."""
+        if len(self.devices) == 1 and len(self.vdoms) == 1:
+            # a single FortiGate draws nothing from rng
+            return [(self.devices[0], self.vdoms[0])] * k
+        return [(rng.choice(self.devices), rng.choice(self.vdoms)) for _ in range(k)]
+
+
+def _common(day: datetime, sec: int, n: int, device: str) -> str:
+    return (f'date={day:%Y-%m-%d} time={sec // 3600:02d}:{sec // 60 % 60:02d}:{sec % 60:02d} {device} '
+            f'eventtime={int(day.timestamp()) + sec}{n % 1000000:06d}000 tz="+0700"')
+
+
+def _webfilter(rng, pools, day, secs, start, match):
+    k = len(secs)
+    origin = pools.origins(rng, k)
+    hosts, servers, domains = pools.pick(rng, "hosts", k), pools.pick(rng, "servers", k), pools.pick(rng, "domains", k)
+    for i in range(k):
+        blocked = rng.random() < match
+        cat, catdesc = rng.choice(WEB_CATEGORIES[:6] if blocked else WEB_CATEGORIES)
+        yield (f'{_common(day, secs[i], start + i, origin[i][0])} logid="0316013056" type="utm" subtype="webfilter" '
+               f'eventtype="{"ftgd_blk" if blocked else "ftgd_allow"}" level="{"warning" if blocked else "notice"}" '
+               f'vd="{origin[i][1]}" policyid={rng.randint(1, 40)} sessionid={start + i + 100000} srcip={hosts[i]} '
+               f'srcport={rng.randint(1024, 65535)} srcintf="port2" dstip={servers[i]} dstport=443 dstintf="port1" '
+               f'proto=6 service="HTTPS" hostname="{domains[i]}" profile="default" '
+               f'action="{"blocked" if blocked else "passthrough"}" reqtype="direct" url="https://{domains[i]}/" '
+               f'sentbyte={rng.randint(100, 4000)} rcvdbyte=0 direction="outgoing" '
+               f'msg="{"URL belongs to a denied category in policy" if blocked else "URL belongs to an allowed category in policy"}" '
+               f'cat={cat} catdesc="{catdesc}"\n')
+
+
+def _appctrl(rng, pools, day, secs, start, match):
+    k = len(secs)
+    origin = pools.origins(rng, k)
+    hosts, servers, apps = pools.pick(rng, "hosts", k), pools.pick(rng, "servers", k), pools.pick(rng, "apps", k)
+    domains = pools.pick(rng, "domains", k)
+    for i in range(k):
+        app, appcat, risk = apps[i]
+        action = "block" if rng.random() < match else "pass"
+        yield (f'{_common(day, secs[i], start + i, origin[i][0])} logid="1059028704" type="utm" subtype="app-ctrl" '
+               f'eventtype="signature" level="{"warning" if action == "block" else "information"}" vd="{origin[i][1]}" '
+               f'appid={_id(app, 50000)} srcip={hosts[i]} srcport={rng.randint(1024, 65535)} srcintf="port2" '
+               f'dstip={servers[i]} dstport=443 dstintf="port1" proto=6 service="HTTPS" policyid={rng.randint(1, 40)} '
+               f'sessionid={start + i + 100000} applist="default" action="{action}" appcat="{appcat}" app="{app}" '
+               f'hostname="{domains[i]}" url="/" msg="{appcat}: {app}," apprisk="{risk}"\n')
+
+
+def _ips(rng, pools, day, secs, start, match):
+    k = len(secs)
+    origin = pools.origins(rng, k)
+    # attacks come in from outside
+    attackers, targets = pools.pick(rng, "servers", k), pools.pick(rng, "hosts", k)
+    sigs = pools.pick(rng, "signatures", k)
+    for i in range(k):
+        severe = rng.random() < match
+        severity = rng.choice(SEVERITIES[:2] if severe else SEVERITIES[2:])
+        yield (f'{_common(day, secs[i], start + i, origin[i][0])} logid="0419016384" type="utm" subtype="ips" '
+               f'eventtype="signature" level="alert" vd="{origin[i][1]}" severity="{severity}" srcip={attackers[i]} '
+               f'srccountry="{rng.choice(COUNTRIES)}" dstip={targets[i]} dstcountry="Reserved" srcintf="port1" '
+               f'dstintf="port2" sessionid={start + i + 100000} action="{"dropped" if severe else "detected"}" '
+               f'proto=6 service="{rng.choice(SERVICES)}" policyid={rng.randint(1, 40)} attack="{sigs[i]}" '
+               f'srcport={rng.randint(1024, 65535)} dstport={rng.choice((80, 443, 445, 22, 3389))} direction="outgoing" '
+               f'attackid={_id(sigs[i], 100000)} profile="default" ref="http://www.fortinet.com/ids/VID{_id(sigs[i], 100000)}" '
+               f'incidentserialno={start + i} msg="{rng.choice(("web_misc", "applications3", "misc", "backdoor"))}: {sigs[i]}," '
+               f'crscore={50 if severe else 5} craction=4096 crlevel="{"critical" if severe else "low"}"\n')
+
+
+def _dns(rng, pools, day, secs, start, match):
+    k = len(secs)
+    origin = pools.origins(rng, k)
+    hosts, domains = pools.pick(rng, "hosts", k), pools.pick(rng, "domains", k)
+    for i in range(k):
+        notable = rng.random() < match
+        cat, catdesc = rng.choice(DNS_CATEGORIES[:8] if notable else DNS_CATEGORIES[8:])
+        action = rng.choice(("block", "pass")) if notable else "pass"
+        yield (f'{_common(day, secs[i], start + i, origin[i][0])} logid="1501054802" type="utm" subtype="dns" '
+               f'eventtype="dns-response" level="{"warning" if notable else "information"}" vd="{origin[i][1]}" '
+               f'policyid={rng.randint(1, 40)} sessionid={start + i + 100000} srcip={hosts[i]} '
+               f'srcport={rng.randint(1024, 65535)} srcintf="port2" dstip=8.8.8.8 dstport=53 dstintf="port1" '
+               f'proto=17 profile="default" xid={rng.randint(1, 65535)} qname="{domains[i]}" '
+               f'qtype="{rng.choice(("A", "AAAA", "HTTPS", "CNAME"))}" qtypeval=1 qclass="IN" ipaddr="{rng.choice(pools.servers)}" '
+               f'msg="Domain {"is monitored" if action == "pass" else "was blocked because it is in the domain-filter list"}" '
+               f'action="{action}" cat={cat} catdesc="{catdesc}"\n')
+
+
+def _antivirus(rng, pools, day, secs, start, match):
+    k = len(secs)
+    origin = pools.origins(rng, k)
+    hosts, servers, domains = pools.pick(rng, "hosts", k), pools.pick(rng, "servers", k), pools.pick(rng, "domains", k)
+    viruses = pools.pick(rng, "viruses", k)
+    for i in range(k):
+        infected = rng.random() < match
+        crlevel = rng.choice(("critical", "high")) if infected else rng.choice(("medium", "low"))
+        name = f"{viruses[i].split('/')[-1].split('!')[0].lower()}.{rng.choice(('exe', 'zip', 'doc', 'js', 'pdf'))}"
+        yield (f'{_common(day, secs[i], start + i, origin[i][0])} logid="0211008192" type="utm" subtype="virus" '
+               f'eventtype="{"infected" if infected else "analytics"}" level="warning" vd="{origin[i][1]}" '
+               f'policyid={rng.randint(1, 40)} msg="File is infected." action="{"blocked" if infected else "monitored"}" '
+               f'service="{rng.choice(("HTTP", "HTTPS", "SMTP"))}" sessionid={start + i + 100000} srcip={hosts[i]} '
+               f'dstip={servers[i]} srcport={rng.randint(1024, 65535)} dstport=80 srcintf="port2" dstintf="port1" '
+               f'proto=6 direction="incoming" filename="{name}" quarskip="File-was-not-quarantined" '
+               f'virus="{viruses[i]}" dtype="Virus" ref="http://www.fortinet.com/ve?vn={viruses[i]}" '
+               f'virusid={_id(viruses[i], 10000000)} url="http://{domains[i]}/{name}" profile="default" '
+               f'agent="{rng.choice(AGENTS)}" analyticssubmit="false" crscore={50 if infected else 5} '
+               f'craction=2 crlevel="{crlevel}"\n')
+
+
+_WRITERS = {"webfilter": _webfilter, "appctrl": _appctrl, "ips": _ips, "dns": _dns, "antivirus": _antivirus}
+
+
+def header(rtype: str, day: str, lines: int, seed: int = 0, match: float = 0.3, cardinality: dict = None) -> str:
+    """First line of a synthetic log; the generators skip ``#`` lines. Identifies the content for reuse."""
+    card = {**DEFAULT_CARDINALITY, **(cardinality or {})}
+    spec = f"type={rtype} day={day} lines={lines} seed={seed} match={match} " + \
+           " ".join(f"{k}={v}" for k, v in sorted(card.items()))
+    return f"# synthetic {spec}\n"
+
+
+def lines(rtype: str, day: str, count: int, seed: int = 0, match: float = 0.3, cardinality: dict = None):
+    """Yield ``count`` log lines for ``day`` (YYYY_MM_DD), in time order."""
+    if rtype not in _WRITERS:
+        raise ValueError(f"Unknown type {rtype!r}; expected one of {', '.join(TYPES)}")
+    card = {**DEFAULT_CARDINALITY, **(cardinality or {})}
+    when = datetime.strptime(day, "%Y_%m_%d")
+    # str seeds hash with sha512 internally, so this is stable across runs and platforms
+    rng = random.Random(f"{seed}:{rtype}:{day}")
+    pools = _Pools(random.Random(f"{seed}:pools:" + hashlib.md5(repr(sorted(card.items())).encode()).hexdigest()), card)
+    write = _WRITERS[rtype]
+    for start in range(0, count, CHUNK):
+        secs = [i * 86400 // count for i in range(start, min(start + CHUNK, count))]
+        yield from write(rng, pools, when, secs, start, match)
+
+
+def write_log(path: Path, rtype: str, day: str, count: int, seed: int = 0, match: float = 0.3,
+              cardinality: dict = None, reuse: bool = True) -> dict:
+    """Write a synthetic log to ``path``; an existing file with the same header is kept as is."""
+    path = Path(path)
+    head = header(rtype, day, count, seed, match, cardinality)
+    if reuse and path.exists():
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            if fh.readline() == head:
+                return {"path": str(path), "lines": count, "bytes": path.stat().st_size, "reused": True}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="\n") as fh:
+        fh.write(head)
+        it = lines(rtype, day, count, seed, match, cardinality)
+        while True:
+            block = list(itertools.islice(it, CHUNK))
+            if not block:
+                break
+            fh.write("".join(block))
+    tmp.replace(path)
+    return {"path": str(path), "lines": count, "bytes": path.stat().st_size, "reused": False}
+
+
+def parse_cardinality(values) -> dict:
+    """``["hosts=50000", "domains=1M"]`` -> {"hosts": 50000, "domains": 1000000}."""
+    out = {}
+    for item in values or ():
+        key, _, value = item.partition("=")
+        if key not in DEFAULT_CARDINALITY or not value:
+            raise ValueError(f"Bad cardinality {item!r}; keys: {', '.join(DEFAULT_CARDINALITY)}")
+        out[key] = parse_count(value)
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic FortiGate log")
+    parser.add_argument("type", choices=TYPES)
+    parser.add_argument("day", help="YYYY_MM_DD")
+    parser.add_argument("--lines", default="100K", help="number of lines, K/M suffixes (default 100K)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--match", type=float, default=0.3, help="share of lines the report keeps (default 0.3)")
+    parser.add_argument("--cardinality", nargs="*", metavar="KEY=N",
+                        help=f"distinct values per field ({', '.join(f'{k}={v}' for k, v in DEFAULT_CARDINALITY.items())})")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    try:
+        count = parse_count(args.lines)
+        card = parse_cardinality(args.cardinality)
+        datetime.strptime(args.day, "%Y_%m_%d")
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.output:
+        info = write_log(Path(args.output), args.type, args.day, count, args.seed, args.match, card, reuse=False)
+        print(f"Wrote {info['lines']:,} lines ({info['bytes'] / 2**20:.1f} MiB) to {info['path']}", file=sys.stderr)
+    else:
+        sys.stdout.write(header(args.type, args.day, count, args.seed, args.match, card))
+        sys.stdout.writelines(lines(args.type, args.day, count, args.seed, args.match, card))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Bloom filters: compact "possibly seen / definitely not seen" sets.
+
+The event store writes one file per day and partition next to its database
+(``<partition>.bloom``) holding a filter per indicator field, so an IOC
+sweep over a year tests a few kilobytes per day in memory and only opens
+the databases of the candidate days.
+
+File layout: a magic line, a JSON header line with each field's
+``m`` (bits), ``k`` (hashes), ``n`` (values added) and byte offset, then the
+bit arrays back to back.
+"""
+
+import hashlib
+import json
+import math
+import os
+import struct
+import uuid
+from functools import lru_cache
+from pathlib import Path
+
+MAGIC = b"FORTIBLOOM 1\n"
+FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    def __init__(self, m: int, k: int, bits=None, n: int = 0):
+        self.m = m
+        self.k = k
+        self.n = n
+        self.bits = bits if bits is not None else bytearray((m + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n: int, rate: float = FALSE_POSITIVE_RATE) -> "BloomFilter":
+        n = max(n, 1)
+        m = max(64, math.ceil(-n * math.log(rate) / math.log(2) ** 2))
+        return cls(m, max(1, round(m / n * math.log(2))))
+
+    def _positions(self, value: str):
+        # double hashing (Kirsch-Mitzenmacher) over one 128-bit digest
+        h1, h2 = struct.unpack("<QQ", hashlib.blake2b(value.encode("utf-8", "surrogatepass"),
+                                                      digest_size=16).digest())
+        h2 |= 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def add(self, value: str):
+        bits = self.bits
+        for p in self._positions(value):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.n += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+
+def build(values, rate: float = FALSE_POSITIVE_RATE) -> BloomFilter:
+    values = values if isinstance(values, (list, set, tuple)) else list(values)
+    bf = BloomFilter.for_capacity(len(values), rate)
+    for value in values:
+        bf.add(value)
+    return bf
+
+
+def save(path: Path, filters: dict):
+    """Write ``{field: BloomFilter}`` to ``path`` atomically."""
+    header, offset = {}, 0
+    for field, bf in filters.items():
+        header[field] = {"m": bf.m, "k": bf.k, "n": bf.n, "offset": offset}
+        offset += len(bf.bits)
+    tmp = Path(path).with_name(f".{Path(path).name}.{os.getpid()}.{uuid.uuid4().hex[:12]}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header, separators=(",", ":")).encode() + b"\n")
+        for bf in filters.values():
+            f.write(bf.bits)
+    os.replace(tmp, path)
+
+
+def load(path: Path) -> dict:
+    with open(path, "rb") as f:
+        if f.readline() != MAGIC:
+            raise ValueError(f"Not a bloom filter file: {path}")
+        header = json.loads(f.readline())
+        data = f.read()
+    return {field: BloomFilter(h["m"], h["k"], bytearray(data[h["offset"]:h["offset"] + (h["m"] + 7) // 8]), h["n"])
+            for field, h in header.items()}
+
+
+@lru_cache(maxsize=4096)
+def _cached(path: str, mtime_ns: int) -> dict:
+    return load(Path(path))
+
+
+def load_cached(path: Path) -> dict:
+    """``load`` memoized per file version; a rebuilt day has a new mtime and is reloaded."""
+    return _cached(str(path), os.stat(path).st_mtime_ns)
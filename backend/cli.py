@@ -0,0 +1,152 @@
+"""
+Command line client for the portal API.
+
+    python cli.py backfill --start 2025_11_01 --end 2025_11_30
+    python cli.py backfill --start 2025_11_01 --end 2025_11_07 --types ips,dns --no-monthly --wait
+    python cli.py generate daily ips 2025_11_02 --profile
+
+Talks to a running API over HTTP (standard library only), so it can be run
+from any machine that can reach it.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DEFAULT_API = os.environ.get("FORTI_API", "http://127.0.0.1:8000/api")
+
+
+def _request(method: str, url: str, fields: dict = None) -> dict:
+    data = urllib.parse.urlencode(fields).encode() if fields is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.load(resp)
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.load(e).get("detail", e.reason)
+        except Exception:
+            detail = e.reason
+        raise SystemExit(f"{method} {url} failed: {e.code} {detail}")
+    except urllib.error.URLError as e:
+        raise SystemExit(f"Cannot reach API at {url}: {e.reason}")
+
+
+def _download(url: str) -> bytes:
+    try:
+        with urllib.request.urlopen(url, timeout=60) as resp:
+            return resp.read()
+    except urllib.error.URLError as e:
+        raise SystemExit(f"Download of {url} failed: {e}")
+
+
+def _print_counts(summary: dict):
+    counts = ", ".join(f"{k}={v}" for k, v in sorted(summary["counts"].items()))
+    print(f"[{time.strftime('%H:%M:%S')}] {summary['total']} jobs: {counts}", flush=True)
+
+
+def cmd_backfill(args) -> int:
+    fields = {"start": args.start, "end": args.end, "monthly": str(not args.no_monthly).lower()}
+    if args.types:
+        fields["types"] = args.types
+    result = _request("POST", f"{args.api}/backfill", fields)
+    print(f"Backfill {result['backfill_id']}: {result['daily']} daily, {result['monthly']} monthly queued"
+          f" ({result['coalesced']} already queued) for {', '.join(result['types'])}")
+    if not args.wait:
+        return 0
+
+    status_url = f"{args.api}/backfill/{result['backfill_id']}"
+    try:
+        while True:
+            summary = _request("GET", status_url)
+            _print_counts(summary)
+            if not any(summary["counts"].get(s) for s in ("queued", "running")):
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Cancelling backfill...")
+        _print_counts(_request("POST", f"{status_url}/cancel", {}))
+        return 130
+
+    failed = [j for j in summary["jobs"] if j["status"] == "failed"]
+    for job in failed:
+        print(f"  FAILED {job['mode']} {job['type']} {job['date']}: {job['error']}")
+    return 1 if failed else 0
+
+
+def cmd_generate(args) -> int:
+    fields = {"profile": str(args.profile).lower()}
+    if args.date:
+        fields["selectedDate"] = args.date
+    result = _request("POST", f"{args.api}/generate/{args.mode}/{args.type}", fields)
+    print(f"Job {result['job_id']}: {args.mode} {args.type} {result['date']} {result['message']}")
+    if args.profile and not result["profile"]:
+        print("Note: joined a job that was already running, so it is not being profiled")
+    if not (args.wait or args.profile):
+        return 0
+
+    status_url = f"{args.api}/jobs/{result['job_id']}"
+    try:
+        while True:
+            job = _request("GET", status_url)
+            if job["status"] not in ("queued", "running"):
+                break
+            stage = job["progress"].get("stage") or job["status"]
+            percent = job["progress"].get("percent")
+            print(f"[{time.strftime('%H:%M:%S')}] {stage}" + (f" {percent}%" if percent is not None else ""), flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Cancelling job...")
+        _request("POST", f"{status_url}/cancel", {})
+        return 130
+
+    print(f"{job['status']} in {job['duration']:.1f}s" + (f": {job['error']}" if job["error"] else ""))
+    profile = (job.get("result") or {}).get("profile")
+    if profile:
+        base = args.api[:-len("/api")] if args.api.endswith("/api") else args.api
+        dest = os.path.join(args.output, profile["name"])
+        with open(dest, "wb") as fh:
+            fh.write(_download(base + profile["url"]))
+        print(f"Profile saved to {dest} (open with: python -m pstats {dest})")
+        if args.top:
+            print(_download(f"{base}{profile['url']}?format=text&limit={args.top}").decode("utf-8", errors="replace"))
+    return 0 if job["status"] == "succeeded" else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FortiGate report portal CLI")
+    parser.add_argument("--api", default=DEFAULT_API, help=f"API base URL (default {DEFAULT_API}, or $FORTI_API)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backfill", help="regenerate daily (then monthly) reports for a date range")
+    p.add_argument("--start", required=True, help="first day, YYYY_MM_DD")
+    p.add_argument("--end", required=True, help="last day, YYYY_MM_DD")
+    p.add_argument("--types", help="comma separated report types (default: all)")
+    p.add_argument("--no-monthly", action="store_true", help="only the daily reports")
+    p.add_argument("--wait", action="store_true", help="follow progress until every job has finished")
+    p.add_argument("--interval", type=float, default=5, help="seconds between status polls with --wait")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("generate", help="generate one report, optionally under the profiler")
+    p.add_argument("mode", choices=("daily", "monthly"))
+    p.add_argument("type", help="report type, e.g. ips")
+    p.add_argument("date", nargs="?", help="YYYY_MM_DD for daily, YYYY_MM for monthly (default: last month)")
+    p.add_argument("--profile", action="store_true", help="run under cProfile, wait, and download the .pstats file")
+    p.add_argument("--output", default=".", help="directory for the downloaded profile (default: current)")
+    p.add_argument("--top", type=int, default=25, help="print this many functions from the profile (0: none)")
+    p.add_argument("--wait", action="store_true", help="follow the job until it finishes")
+    p.add_argument("--interval", type=float, default=2, help="seconds between status polls")
+    p.set_defaults(func=cmd_generate)
+
+    args = parser.parse_args(argv)
+    args.api = args.api.rstrip("/")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,934 @@
+"""
+Embedded event store: parsed log events kept in SQLite, one database per
+report type, day and partition.
+
+    <report folder>/events/<YYYYMMDD>/<partition>.sqlite
+
+A partition holds one FortiGate (``devname``, else ``devid``); logs without
+either go to ``default``. Every raw log only ever replaces its own
+partitions, so a day can be assembled from several sources (one log per
+device) and a new device adds partitions without touching the others.
+
+Each database has one wide ``events`` table. It holds a column for every
+field the generators read, plus ``extra``: the rest of the record as JSON,
+so nothing in the raw line is lost. The ``meta`` table records which raw log
+the events came from (name, size, mtime). A store whose raw log has since
+been replaced is stale, and the raw log is parsed again.
+
+Databases are built under a temporary name and renamed into place once
+complete, so readers never see a half-written day. They are written either
+by upload ingest (``ingest.StreamIngestor``) or by the first generation
+that parses the raw log (``load_day``). After that, re-rendering a day, or
+a monthly over many days, is a query instead of a re-parse.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import bloom
+import progress
+from logparse import RECORD_FILTERS, parse_raw_line
+
+SCHEMA_VERSION = 7
+EVENTS_DIRNAME = "events"
+DEFAULT_PARTITION = "default"
+# devices past what one connection can attach share this partition
+SHARED_PARTITION = "shared"
+BATCH = 5000
+# temp databases (and .bloom files) untouched this long were left by a killed worker
+STALE_TMP_AFTER = 3600
+# partitions of one raw log are indexed and summarized in parallel
+PARTITION_WORKERS = int(os.environ.get("FORTI_PARTITION_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# Stored as columns: everything the generators and monthly queries read.
+# All TEXT as in the raw log ("cat" stays "62"), except ts.
+COLUMNS = (
+    "date", "time", "logid", "type", "subtype", "eventtype", "level", "devname", "devid", "vd",
+    "action", "policyid", "srcip", "srcport", "srccountry", "dstip", "dstport", "dstcountry",
+    "dst", "destip", "service", "hostname", "url", "cat", "catdesc", "app", "appcat", "apprisk",
+    "attack", "attackid", "severity", "crlevel", "qname", "qtype", "virus", "filename", "agent",
+    "profile", "msg", "category",
+)
+_COLUMN_SET = frozenset(COLUMNS)
+
+# SQL for logparse.RECORD_FILTERS: which stored events belong to each report
+RECORD_SQL = {
+    "webfilter": "1",
+    "appctrl": "1",
+    "ips": "subtype = 'ips' AND eventtype = 'signature'",
+    "dns": "subtype = 'dns'",
+    "antivirus": "subtype = 'virus' AND eventtype = 'infected'",
+}
+
+# Query filters (API name -> column): common to every type, then per type
+FILTERS = {"srcip": "srcip", "dstip": "dstip", "action": "action"}
+TYPE_FILTERS = {
+    "webfilter": {"category": "catdesc", "hostname": "hostname"},
+    "appctrl": {"category": "appcat", "app": "app"},
+    "ips": {"attack": "attack", "severity": "severity"},
+    "dns": {"category": "catdesc", "qname": "qname"},
+    "antivirus": {"virus": "virus"},
+}
+
+
+def filter_columns(rtype: str) -> dict:
+    return {**FILTERS, **TYPE_FILTERS.get(rtype, {})}
+
+
+# Substring-searchable fields per type (trigram full-text index)
+SEARCH_FIELDS = {
+    "webfilter": ("url",),
+    "dns": ("qname",),
+    "antivirus": ("url", "filename"),
+}
+
+# Indicator fields with a per-day Bloom filter (IOC sweeps)
+BLOOM_FIELDS = {
+    "webfilter": ("srcip", "dstip", "hostname"),
+    "appctrl": ("srcip", "dstip", "hostname"),
+    "ips": ("srcip", "dstip", "attack"),
+    "dns": ("srcip", "dstip", "qname"),
+    "antivirus": ("srcip", "dstip", "virus"),
+}
+
+# Per-minute series kept for each day: split name -> SQL expression, per type.
+# "total" and "notable" (the daily report's rule) are always there.
+SERIES_SPLITS = {
+    "webfilter": {"action": "action", "category": "catdesc"},
+    "appctrl": {"action": "action", "category": "appcat", "risk": "lower(apprisk)"},
+    "ips": {"action": "lower(action)", "severity": "lower(severity)"},
+    "dns": {"action": "action", "category": "catdesc"},
+    "antivirus": {"action": "action", "severity": "lower(crlevel)"},
+}
+# ... and for every type
+FLEET_SPLITS = {"device": "COALESCE(devname, devid)", "vdom": "vd"}
+SERIES_MAX_KEYS = 100  # per split; the rest is summed into "(other)"
+
+
+# FortiGuard DNS categories the DNS daily treats as notable
+DNS_CATEGORIES = {
+    "62": "Phishing", "63": "Malicious Websites", "64": "Newly Observed Domain",
+    "65": "Newly Registered Domain", "66": "Dynamic DNS", "67": "Spam URLs",
+    "68": "Gambling", "69": "Pornography",
+}
+
+# SQL for the events each daily report counts (see aggregate.SPECS and the daily scripts)
+NOTABLE_SQL = {
+    "webfilter": "action = 'blocked' AND subtype LIKE '%webfilter%'",
+    "appctrl": "type = 'utm' AND subtype = 'app-ctrl' AND action = 'block'",
+    "ips": (f"{RECORD_SQL['ips']} AND (lower(severity) IN ('high', 'critical')"
+            " OR lower(action) IN ('blocked', 'block', 'deny'))"),
+    "dns": (f"{RECORD_SQL['dns']} AND (COALESCE(cat, '0') IN ({', '.join(repr(c) for c in DNS_CATEGORIES)})"
+            " OR COALESCE(action, 'pass') IN ('blocked', 'block', 'deny'))"),
+    "antivirus": (f"{RECORD_SQL['antivirus']} AND action IN ('blocked', 'block')"
+                  " AND (lower(COALESCE(crlevel, 'low')) IN ('critical', 'high') OR COALESCE(level, 'info') = 'warning')"),
+}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS events (
+    ts INTEGER,
+    {", ".join(f"{c} TEXT" for c in COLUMNS)},
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+_INSERT = f"INSERT INTO events VALUES ({', '.join('?' * (len(COLUMNS) + 2))})"
+
+
+def enabled() -> bool:
+    return os.environ.get("FORTI_EVENT_STORE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def day_dir(folder: Path, ymd: str) -> Path:
+    return Path(folder) / EVENTS_DIRNAME / ymd
+
+
+def purge_tmp(directory: Path, max_age: float = STALE_TMP_AFTER) -> int:
+    """Remove the ``.<name>.<pid>.<id>.tmp`` files of writers that never finished."""
+    removed = 0
+    cutoff = time.time() - max_age
+    for tmp in Path(directory).glob(".*.tmp"):
+        try:
+            if tmp.stat().st_mtime < cutoff:
+                tmp.unlink()
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _source_info(path: Path) -> dict:
+    st = path.stat()
+    return {"source": path.name, "source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+
+def _max_partitions() -> int:
+    # a day is read through one connection: main plus SQLite's ATTACH limit (10 unless rebuilt)
+    with closing(sqlite3.connect(":memory:")) as conn:
+        try:
+            return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) + 1
+        except AttributeError:  # Python < 3.11
+            return 11
+
+
+MAX_PARTITIONS = _max_partitions()
+
+
+def partition_name(device) -> str:
+    """File-safe partition name for a device (``devname`` or ``devid``)."""
+    if not device:
+        return DEFAULT_PARTITION
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", device).strip(".")
+    return name if name and name not in (DEFAULT_PARTITION, SHARED_PARTITION) else f"dev-{name}"
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+class DayWriter:
+    """Collects parsed records for one day/partition; ``commit()`` indexes and publishes the database."""
+
+    def __init__(self, folder: Path, ymd: str, partition: str = DEFAULT_PARTITION, rtype: str = None):
+        self.rtype = rtype
+        self.ymd = ymd
+        self.path = day_dir(folder, ymd) / f"{partition}.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # unique per writer: an upload and a rebuild of the same day may be building at once
+        self.tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{uuid.uuid4().hex[:12]}.tmp")
+        self.conn = sqlite3.connect(self.tmp, check_same_thread=False)
+        # a half-built file is thrown away, so there is nothing to journal
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.executescript(_SCHEMA)
+        self.rows = 0
+        self._batch = []
+        self._day_start = {}
+
+    def _ts(self, date: str, time_: str):
+        start = self._day_start.get(date)
+        if start is None:
+            try:
+                start = int((datetime.strptime(date, "%Y-%m-%d") - datetime(1970, 1, 1)).total_seconds())
+            except (TypeError, ValueError):
+                start = False
+            self._day_start[date] = start
+        if start is False or not time_ or len(time_) < 8:
+            return None
+        try:
+            return start + int(time_[0:2]) * 3600 + int(time_[3:5]) * 60 + int(time_[6:8])
+        except ValueError:
+            return None
+
+    def add(self, record: dict):
+        extra = {k: v for k, v in record.items() if k not in _COLUMN_SET}
+        get = record.get
+        self._batch.append((self._ts(get("date"), get("time")), *[get(c) for c in COLUMNS],
+                            json.dumps(extra, separators=(",", ":")) if extra else None))
+        if len(self._batch) >= BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self.conn.executemany(_INSERT, self._batch)
+            self.rows += len(self._batch)
+            self._batch = []
+
+    def _index(self):
+        # built once after the bulk load, which is much cheaper than maintaining them per insert
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_ts ON events (ts)")
+        columns = filter_columns(self.rtype).values() if self.rtype else FILTERS.values()
+        for column in dict.fromkeys(columns):
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{column} ON events ({column}, ts)")
+        fields = SEARCH_FIELDS.get(self.rtype)
+        if fields:
+            try:
+                self.conn.execute(f"CREATE VIRTUAL TABLE search USING fts5({', '.join(fields)},"
+                                  " content='events', content_rowid='rowid', tokenize='trigram')")
+                self.conn.execute("INSERT INTO search (search) VALUES ('rebuild')")
+            except sqlite3.OperationalError:
+                # SQLite without FTS5 / trigram (< 3.34): text search falls back to LIKE
+                pass
+        # sampled statistics, so srcip=? is preferred over a low-cardinality action=?
+        self.conn.execute("PRAGMA analysis_limit = 1000")
+        self.conn.execute("ANALYZE")
+
+    def _summarize(self):
+        # per source IP and hour: what /api/hosts reads instead of the events
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ip_counts (srcip TEXT, hour INTEGER, events INTEGER,"
+                          " notable INTEGER, first_ts INTEGER, last_ts INTEGER, PRIMARY KEY (srcip, hour))"
+                          " WITHOUT ROWID")
+        self.conn.execute(
+            "INSERT INTO ip_counts SELECT srcip, ts - ts % 3600, COUNT(*),"
+            f" SUM(CASE WHEN {NOTABLE_SQL[self.rtype]} THEN 1 ELSE 0 END), MIN(ts), MAX(ts)"
+            f" FROM events WHERE {RECORD_SQL[self.rtype]} AND srcip IS NOT NULL AND ts IS NOT NULL"
+            " GROUP BY 1, 2")
+
+    def _series(self):
+        # one little-endian uint32[1440] per (split, key); events outside the day are left out
+        self.conn.execute("CREATE TABLE IF NOT EXISTS minutes (split TEXT, key TEXT, counts BLOB,"
+                          " PRIMARY KEY (split, key)) WITHOUT ROWID")
+        day0 = epoch(datetime.strptime(self.ymd, "%Y%m%d"))
+        where = f"{RECORD_SQL[self.rtype]} AND ts >= {day0} AND ts < {day0 + 86400}"
+        splits = {"total": ("''", where), "notable": ("''", f"{where} AND {NOTABLE_SQL[self.rtype]}")}
+        splits.update((name, (f"COALESCE({expr}, '(none)')", where))
+                      for name, expr in {**SERIES_SPLITS[self.rtype], **FLEET_SPLITS}.items())
+        for name, (expr, cond) in splits.items():
+            series = {}
+            for minute, key, count in self.conn.execute(
+                    f"SELECT (ts - {day0}) / 60, {expr}, COUNT(*) FROM events WHERE {cond} GROUP BY 1, 2"):
+                series.setdefault(key, array("I", bytes(4 * 1440)))[minute] += count
+            if len(series) > SERIES_MAX_KEYS:
+                ranked = sorted(series, key=lambda k: sum(series[k]), reverse=True)
+                other = array("I", bytes(4 * 1440))
+                for key in ranked[SERIES_MAX_KEYS - 1:]:
+                    for i, v in enumerate(series.pop(key)):
+                        other[i] += v
+                series["(other)"] = other
+            rows = []
+            for key, counts in series.items():
+                if sys.byteorder == "big":
+                    counts.byteswap()
+                rows.append((name, key, counts.tobytes()))
+            self.conn.executemany("INSERT OR REPLACE INTO minutes VALUES (?, ?, ?)", rows)
+
+    def _blooms(self):
+        filters = {}
+        for field in BLOOM_FIELDS.get(self.rtype, ()):
+            # the same rows sweep() confirms against: a filter of every line would only add false positives
+            values = [v for (v,) in self.conn.execute(
+                f"SELECT DISTINCT {field} FROM events WHERE {RECORD_SQL[self.rtype]} AND {field} IS NOT NULL")]
+            filters[field] = bloom.build(values)
+        # written before the database is renamed into place: a bloom newer than
+        # its database only costs a false positive, an older one could miss a day
+        bloom.save(self.path.with_suffix(".bloom"), filters)
+
+    def commit(self, source: Path = None, **info) -> Path:
+        self._flush()
+        if self.rtype:
+            self._summarize()
+            self._series()
+        self._index()
+        if self.rtype:
+            self._blooms()
+        # [device, vdom, events] held here, for listing and for pruning scoped reads
+        scopes = self.conn.execute("SELECT COALESCE(devname, devid), vd, COUNT(*) FROM events GROUP BY 1, 2").fetchall()
+        meta = {"schema": SCHEMA_VERSION, "rows": self.rows, "created": time.time(),
+                "scopes": [list(s) for s in scopes], **info}
+        if source is not None:
+            meta.update(_source_info(Path(source)))
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                              [(k, json.dumps(v)) for k, v in meta.items()])
+        self.conn.commit()
+        self.conn.close()
+        os.replace(self.tmp, self.path)
+        return self.path
+
+    def abort(self):
+        try:
+            self.conn.close()
+        finally:
+            self.tmp.unlink(missing_ok=True)
+
+
+class DayPartitions:
+    """One raw log's records routed to a ``DayWriter`` per device, committed in parallel.
+
+    On commit, partitions this source wrote before and not this time (a
+    device gone from the log, a store from before partitioning) are
+    removed; other sources' partitions are left alone. A partition name
+    another source already uses (the same device in two logs, the shared
+    partition) gets this source's name appended: ``<device>@<log>``.
+
+    When other logs already fill every partition a day can have, this one
+    is not stored (``full``): its reads parse the raw log instead.
+    """
+
+    def __init__(self, folder: Path, ymd: str, rtype: str = None, source: Path = None):
+        self.folder = Path(folder)
+        self.ymd = ymd
+        self.rtype = rtype
+        self.source = source
+        self.writers = {}
+        self._route = {}
+        # partitions and their .bloom files are both built under a temp name here
+        purge_tmp(day_dir(folder, ymd))
+        name = Path(source).name if source is not None else None
+        self._tag = partition_name(Path(source).stem) if source is not None else None
+        self._mine, self._others = set(), set()
+        for path in Day(folder, ymd).partitions:
+            try:
+                mine = partition_meta(path).get("source") == name
+            except (OSError, sqlite3.Error, ValueError):
+                mine = False
+            (self._mine if mine else self._others).add(path.stem)
+        self.full = len(self._others) >= MAX_PARTITIONS
+        if self.full:
+            print(f"Event store: {folder} {ymd} has no room for another log's partitions; {name} is not stored")
+
+    @property
+    def rows(self) -> int:
+        return sum(w.rows for w in self.writers.values())
+
+    def _own(self, name: str) -> str:
+        return f"{name}@{self._tag}" if name in self._others and self._tag else name
+
+    def _slots_left(self, name: str) -> int:
+        return MAX_PARTITIONS - len(self._others | set(self.writers) | {name})
+
+    def _writer(self, device) -> DayWriter:
+        name = self._own(partition_name(device))
+        if name not in self.writers and name not in self._mine and self._slots_left(name) <= 0:
+            # keep the last slot for every further device
+            name = self._own(SHARED_PARTITION)
+            if name not in self.writers and self._slots_left(name) < 0 and self.writers:
+                # other logs hold the rest: in with a partition of this log's
+                name = next(iter(self.writers))
+        writer = self.writers.get(name)
+        if writer is None:
+            writer = self.writers[name] = DayWriter(self.folder, self.ymd, name, rtype=self.rtype)
+        self._route[device] = writer
+        return writer
+
+    def add(self, record: dict):
+        if self.full:
+            return
+        device = record.get("devname") or record.get("devid")
+        writer = self._route.get(device)
+        if writer is None:
+            writer = self._writer(device)
+        writer.add(record)
+
+    def commit(self, source: Path = None, **info) -> list:
+        source = source if source is not None else self.source
+        if self.full:
+            return []
+        if not self.writers:
+            # an empty log still records that the day was read from it
+            self._writer(None)
+        writers = list(self.writers.values())
+        try:
+            with ThreadPoolExecutor(min(PARTITION_WORKERS, len(writers))) as pool:
+                paths = list(pool.map(lambda w: w.commit(source, **info), writers))
+        except BaseException:
+            self.abort()
+            raise
+        if source is not None:
+            name = Path(source).name
+            for path in Day(self.folder, self.ymd).partitions:
+                if path in paths:
+                    continue
+                try:
+                    if partition_meta(path).get("source") == name:
+                        path.unlink()
+                        path.with_suffix(".bloom").unlink(missing_ok=True)
+                except (OSError, sqlite3.Error, ValueError):
+                    # open elsewhere (Windows) or unreadable: readers still see it until the next write
+                    pass
+        return paths
+
+    def abort(self):
+        for writer in self.writers.values():
+            writer.abort()
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+@lru_cache(maxsize=4096)
+def _meta(path: str, mtime_ns: int) -> dict:
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+        return {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+
+
+def partition_meta(path: Path) -> dict:
+    """A partition's ``meta`` table, memoized per file version."""
+    return _meta(str(path), os.stat(path).st_mtime_ns)
+
+
+def _literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class Day:
+    """The stored partitions of one report folder and day.
+
+    With ``device`` and/or ``vdom``, only partitions holding that device or
+    VDOM are read, and ``connect()`` shows only its events. With ``source``
+    (a raw log's file name), only the partitions built from that log.
+    """
+
+    def __init__(self, folder: Path, ymd: str, device: str = None, vdom: str = None, source: str = None):
+        self.folder = Path(folder)
+        self.ymd = ymd
+        self.dir = day_dir(folder, ymd)
+        self.device = device
+        self.vdom = vdom
+        self.source = source
+
+    @property
+    def partitions(self) -> list:
+        if not self.dir.is_dir():
+            return []
+        parts = sorted(self.dir.glob("*.sqlite"))
+        if self.source is not None:
+            parts = [p for p in parts if self._built_from(p)]
+        if self.device is None and self.vdom is None:
+            return parts
+        return [p for p in parts if self._holds(p)]
+
+    def _built_from(self, path: Path) -> bool:
+        try:
+            return partition_meta(path).get("source") == self.source
+        except (OSError, sqlite3.Error, ValueError):
+            return False
+
+    def _holds(self, path: Path) -> bool:
+        try:
+            scopes = partition_meta(path).get("scopes")
+        except (OSError, sqlite3.Error, ValueError):
+            scopes = None
+        if scopes is None:
+            # no list of devices: let the view's WHERE decide
+            return True
+        return any((self.device is None or d == self.device) and (self.vdom is None or v == self.vdom)
+                   for d, v, _ in scopes)
+
+    def scope_sql(self, alias: str = "") -> str:
+        """SQL condition for the device/VDOM this Day is limited to ("" if none)."""
+        conds = []
+        if self.device is not None:
+            conds.append(f"COALESCE({alias}devname, {alias}devid) = {_literal(self.device)}")
+        if self.vdom is not None:
+            conds.append(f"{alias}vd = {_literal(self.vdom)}")
+        return " AND ".join(conds)
+
+    def exists(self) -> bool:
+        return bool(self.partitions)
+
+    def meta(self, partition: Path = None) -> dict:
+        return partition_meta(partition or self.partitions[0])
+
+    def sources(self) -> set:
+        """Names of the raw logs the partitions were built from."""
+        return {self.meta(p).get("source") for p in self.partitions}
+
+    def current_for(self, log_file: Path = None) -> bool:
+        """True when stored, and ``log_file``'s partitions were built from it as it is now.
+
+        Without ``log_file``: stored from any source.
+        """
+        parts = self.partitions
+        if not parts:
+            return False
+        if log_file is None:
+            return True
+        try:
+            want = _source_info(Path(log_file))
+            mine = [m for m in map(self.meta, parts) if m.get("source") == want["source"]]
+        except (OSError, sqlite3.Error, ValueError):
+            return False
+        return bool(mine) and all(m.get("schema") == SCHEMA_VERSION and {k: m.get(k) for k in want} == want
+                                  for m in mine)
+
+    def connect(self) -> sqlite3.Connection:
+        """Read-only connection where ``events`` spans every partition of the day.
+
+        The view adds ``part`` (partition number) and ``rid`` (its rowid), which
+        together identify an event for keyset pagination.
+        """
+        parts = self.partitions
+        if not parts:
+            raise FileNotFoundError(f"No stored events for {self.ymd} in {self.folder.name}")
+        conn = sqlite3.connect(f"file:{parts[0]}?mode=ro", uri=True, check_same_thread=False)
+        where = f" WHERE {self.scope_sql()}" if self.scope_sql() else ""
+        selects = []
+        for i, path in enumerate(parts):
+            schema = f"p{i}" if i else "main"
+            if i:
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"file:{path}?mode=ro",))
+            selects.append(f"SELECT {i} AS part, rowid AS rid, {self._columns(conn, schema)} FROM {schema}.events{where}")
+        # the temp schema is searched first, so this shadows main.events
+        conn.execute(f"CREATE TEMP VIEW events AS {' UNION ALL '.join(selects)}")
+        return conn
+
+    @staticmethod
+    def _columns(conn: sqlite3.Connection, schema: str, alias: str = "") -> str:
+        """``ts, <COLUMNS>, extra`` of a partition; other sources' partitions may be from an older schema."""
+        have = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(events)")}
+        return ", ".join(f"{alias}{c}" if c in have else f"NULL AS {c}" for c in ("ts", *COLUMNS, "extra"))
+
+    def query(self, sql: str, params=()) -> list:
+        with closing(self.connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def frame(self, sql: str, params=()):
+        import pandas as pd
+        with closing(self.connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def schemas(self, conn: sqlite3.Connection, table: str = None) -> list:
+        """(partition number, schema name) of a ``connect()``; only those having ``table`` if given."""
+        found = []
+        for part in range(len(self.partitions)):
+            schema = f"p{part}" if part else "main"
+            if table is None or conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = ?",
+                                             (table,)).fetchone():
+                found.append((part, schema))
+        return found
+
+    def matching(self, conn: sqlite3.Connection, text: str, fields) -> tuple:
+        """(FROM source, params) for the events of a ``connect()`` whose ``fields`` contain ``text``.
+
+        Uses each partition's trigram index; LIKE where there is none, or
+        for text shorter than a trigram.
+        """
+        selects, params = [], []
+        scope = f" AND {self.scope_sql('e.')}" if self.scope_sql() else ""
+        indexed = set(self.schemas(conn, "search")) if len(text) >= 3 else set()
+        for part, schema in self.schemas(conn):
+            columns = self._columns(conn, schema, "e.")
+            if (part, schema) in indexed:
+                selects.append(f"SELECT {part} AS part, e.rowid AS rid, {columns} FROM {schema}.search s"
+                               f" JOIN {schema}.events e ON e.rowid = s.rowid WHERE s.search MATCH ?{scope}")
+                phrase = '"' + text.replace('"', '""') + '"'
+                params.append(f"{{{' '.join(fields)}}} : {phrase}")
+            else:
+                pattern = "%" + re.sub(r"([\\%_])", r"\\\1", text) + "%"
+                selects.append(f"SELECT {part} AS part, e.rowid AS rid, {columns} FROM {schema}.events e WHERE ("
+                               + " OR ".join(f"e.{f} LIKE ? ESCAPE '\\'" for f in fields) + f"){scope}")
+                params.extend([pattern] * len(fields))
+        return f"({' UNION ALL '.join(selects)})", params
+
+
+def month_days(folder: Path, yyyymm: str) -> list:
+    """Stored days of a month, oldest first."""
+    base = Path(folder) / EVENTS_DIRNAME
+    if not base.is_dir():
+        return []
+    days = (Day(folder, p.name) for p in sorted(base.glob(f"{yyyymm}[0-3][0-9]")))
+    return [day for day in days if day.exists()]
+
+
+def month_sources(folder: Path, yyyymm: str, daily_files) -> list:
+    """What a monthly reads for each day: the stored events, or else that day's HTML report."""
+    by_day = {day.ymd: day for day in month_days(folder, yyyymm)} if enabled() else {}
+    for path in daily_files:
+        match = re.search(r"(\d{8})", path.stem)
+        by_day.setdefault(match.group(1) if match else path.stem, path)
+    return [by_day[key] for key in sorted(by_day)]
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def epoch(dt: datetime) -> int:
+    """``ts`` of a naive datetime: log-local time counted as if it were UTC, like the stored column."""
+    return int((dt - datetime(1970, 1, 1)).total_seconds())
+
+
+def _event(row, names) -> dict:
+    event = {k: v for k, v in zip(names, row) if v is not None and k not in ("part", "rid", "extra")}
+    extra = row[-1]
+    if extra:
+        event.update(json.loads(extra))
+    return event
+
+
+def host_hours(folder: Path, rtype: str, ip: str, start: datetime, end: datetime) -> list:
+    """(hour, events, notable, first_ts, last_ts) of source ``ip`` per stored hour in [start, end).
+
+    Read from each day's ``ip_counts``; partitions built before it existed
+    are grouped from their srcip index instead. ``ip_counts`` rows cover
+    whole hours, so a start or end inside an hour is counted from the
+    events for that first or last hour.
+    """
+    lo, hi = epoch(start), epoch(end)
+    whole_lo, whole_hi = -(-lo // 3600) * 3600, hi - hi % 3600
+    # [lo, hi) is whole hours in between, and events for the part hours around them
+    if whole_lo < whole_hi:
+        partial = [(a, b) for a, b in ((lo, whole_lo), (whole_hi, hi)) if a < b]
+    else:
+        partial = [(lo, hi)]
+
+    def grouped(schema):
+        return ("SELECT ts - ts % 3600, COUNT(*),"
+                f" SUM(CASE WHEN {NOTABLE_SQL[rtype]} THEN 1 ELSE 0 END), MIN(ts), MAX(ts)"
+                f" FROM {schema}.events WHERE {RECORD_SQL[rtype]} AND srcip = ? AND ts >= ? AND ts < ?"
+                " GROUP BY 1")
+
+    out = {}
+    day = start.date()
+    while day <= (end - timedelta(microseconds=1)).date():
+        stored = Day(folder, day.strftime("%Y%m%d"))
+        day += timedelta(days=1)
+        if not stored.exists():
+            continue
+        with closing(stored.connect()) as conn:
+            summarized = stored.schemas(conn, "ip_counts")
+            selects, args = [], []
+            for part, schema in stored.schemas(conn):
+                if (part, schema) not in summarized:
+                    selects.append(grouped(schema))
+                    args.extend([ip, lo, hi])
+                    continue
+                if whole_lo < whole_hi:
+                    selects.append(f"SELECT hour, events, notable, first_ts, last_ts FROM {schema}.ip_counts"
+                                   " WHERE srcip = ? AND hour >= ? AND hour < ?")
+                    args.extend([ip, whole_lo, whole_hi])
+                for a, b in partial:
+                    selects.append(grouped(schema))
+                    args.extend([ip, a, b])
+            for hour, events, notable, first, last in conn.execute(" UNION ALL ".join(selects), args):
+                if hour in out:
+                    prev = out[hour]
+                    out[hour] = (hour, prev[1] + events, prev[2] + notable, min(prev[3], first), max(prev[4], last))
+                else:
+                    out[hour] = (hour, events, notable, first, last)
+    return [out[hour] for hour in sorted(out)]
+
+
+def devices(folder: Path, start: datetime, end: datetime) -> list:
+    """Every device/VDOM stored in [start, end) by day: partition, events, source log."""
+    out = []
+    day = start.date()
+    while day <= (end - timedelta(microseconds=1)).date():
+        stored = Day(folder, day.strftime("%Y%m%d"))
+        day += timedelta(days=1)
+        for path in stored.partitions:
+            try:
+                meta = partition_meta(path)
+            except (OSError, sqlite3.Error, ValueError):
+                continue
+            for device, vdom, events in meta.get("scopes", []):
+                out.append({"day": stored.ymd, "device": device, "vdom": vdom, "events": events,
+                            "partition": path.stem, "source": meta.get("source")})
+    return out
+
+
+def series_splits(rtype: str) -> list:
+    return ["total", "notable", *SERIES_SPLITS[rtype], *FLEET_SPLITS]
+
+
+def _bin(series: list, counts: array, offset: int, span: int, step: int):
+    """Add one day's minute ``counts`` (minute 0 at ``offset`` seconds from the range start) into
+    ``series``, one slice sum per bucket, so the work grows with the points and not the minutes."""
+    last_minute = min(len(counts), -(-(span - offset) // 60))
+    first = max(0, offset // step)
+    last = min(len(series), -(-(offset + last_minute * 60) // step))
+    for b in range(first, last):
+        a = max(0, -(-(b * step - offset) // 60))
+        z = min(last_minute, -(-((b + 1) * step - offset) // 60))
+        if z > a:
+            series[b] += sum(counts[a:z])
+
+
+def timeseries(folder: Path, rtype: str, split: str, start: datetime, end: datetime, step: int) -> dict:
+    """{key: [count per ``step`` seconds]} over [start, end), summed from the stored minute arrays.
+
+    ``start`` and ``step`` should be whole minutes. Days stored before the
+    arrays existed contribute nothing; events are never rescanned.
+    """
+    lo, hi = epoch(start), epoch(end)
+    points = -(-(hi - lo) // step)
+    out, days = {}, 0
+    day = start.date()
+    while day <= (end - timedelta(microseconds=1)).date():
+        stored = Day(folder, day.strftime("%Y%m%d"))
+        day0 = epoch(datetime.combine(day, datetime.min.time()))
+        day += timedelta(days=1)
+        if not stored.exists():
+            continue
+        with closing(stored.connect()) as conn:
+            selects = [f"SELECT key, counts FROM {schema}.minutes WHERE split = ?"
+                       for _, schema in stored.schemas(conn, "minutes")]
+            if not selects:
+                continue
+            rows = conn.execute(" UNION ALL ".join(selects), [split] * len(selects)).fetchall()
+        days += 1
+        for key, blob in rows:
+            counts = array("I")
+            counts.frombytes(blob)
+            if sys.byteorder == "big":
+                counts.byteswap()
+            series = out.get(key)
+            if series is None:
+                series = out[key] = [0] * points
+            _bin(series, counts, day0 - lo, hi - lo, step)
+    if len(out) > SERIES_MAX_KEYS:
+        # each partition keeps its own top keys: cap the merged ones the same way
+        ranked = sorted(out, key=lambda k: (k == "(other)", -sum(out[k])))
+        other = out.pop("(other)", [0] * points)
+        for key in ranked[SERIES_MAX_KEYS - 1:]:
+            if key != "(other)":
+                other = [a + b for a, b in zip(other, out.pop(key))]
+        out["(other)"] = other
+    return {"series": out, "days": days, "points": points}
+
+
+def sweep(folder: Path, rtype: str, values, start: datetime, end: datetime) -> dict:
+    """Stored days in [start, end) where any ``BLOOM_FIELDS`` field equals one of ``values``.
+
+    Each day's Bloom filters pick the candidate (value, field) pairs; only
+    those are confirmed against the events. Partitions without a filter
+    file are always confirmed.
+    """
+    fields = BLOOM_FIELDS.get(rtype, ())
+    hits, candidates, days = [], 0, 0
+    bloom_seconds = 0.0
+    day = start.date()
+    while day <= (end - timedelta(microseconds=1)).date():
+        stored = Day(folder, day.strftime("%Y%m%d"))
+        day += timedelta(days=1)
+        parts = stored.partitions
+        if not parts:
+            continue
+        days += 1
+        t0 = time.perf_counter()
+        maybe = set()
+        for part in parts:
+            try:
+                filters = bloom.load_cached(part.with_suffix(".bloom"))
+            except (OSError, ValueError):
+                filters = {}
+            for field in fields:
+                bf = filters.get(field)
+                maybe.update((v, field) for v in values if bf is None or v in bf)
+        bloom_seconds += time.perf_counter() - t0
+        if not maybe:
+            continue
+        candidates += len(maybe)
+        with closing(stored.connect()) as conn:
+            for value, field in sorted(maybe):
+                # counted like /api/events and /api/hosts: the report's records, inside [start, end)
+                count = conn.execute(f"SELECT COUNT(*) FROM events WHERE {RECORD_SQL[rtype]}"
+                                     f" AND ts >= ? AND ts < ? AND {field} = ?",
+                                     (epoch(start), epoch(end), value)).fetchone()[0]
+                if count:
+                    hits.append({"value": value, "day": stored.ymd, "field": field, "count": count})
+    return {"hits": hits, "days": days, "candidates": candidates,
+            "false_positives": candidates - len(hits), "bloom_ms": round(bloom_seconds * 1000, 3)}
+
+
+def search(folder: Path, rtype: str, start: datetime, end: datetime, filters: dict = None,
+           limit: int = 100, cursor: str = None, text: str = None, fields=None,
+           device: str = None, vdom: str = None) -> dict:
+    """Stored ``rtype`` events with ``start <= time < end`` matching ``filters``, oldest first.
+
+    ``filters`` maps column -> value (exact match); ``device`` / ``vdom``
+    limit it to one FortiGate or VDOM. With ``text``, only events
+    whose ``fields`` contain it (case-insensitive substring), and the first
+    page also counts the hits per day. Pages are keyset based: pass the
+    returned ``next`` as ``cursor`` to continue after the last event.
+    """
+    where = [RECORD_SQL[rtype], "ts >= ?", "ts < ?"]
+    params = [epoch(start), epoch(end)]
+    for column, value in (filters or {}).items():
+        where.append(f"{column} = ?")
+        params.append(value)
+    after_day, after = None, None
+    if cursor:
+        try:
+            after_day, ts, part, rid = cursor.split(":")
+            after = (int(ts), int(part), int(rid))
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+    per_day = {} if text is not None and not cursor else None
+
+    names = ("part", "rid", "ts", *COLUMNS, "extra")
+    events, keys, days = [], [], 0
+    day = start.date()
+    while day <= (end - timedelta(microseconds=1)).date() and (len(events) <= limit or per_day is not None):
+        stored = Day(folder, day.strftime("%Y%m%d"), device, vdom)
+        day += timedelta(days=1)
+        if (after_day and stored.ymd < after_day) or not stored.exists():
+            continue
+        days += 1
+        with closing(stored.connect()) as conn:
+            source, args = ("events", []) if text is None else stored.matching(conn, text, fields)
+            body = f"FROM {source} WHERE {' AND '.join(where)}"
+            args = [*args, *params]
+            if per_day is not None:
+                hits = conn.execute(f"SELECT COUNT(*) {body}", args).fetchone()[0]
+                if hits:
+                    per_day[stored.ymd] = hits
+            if len(events) > limit:
+                continue
+            if after and stored.ymd == after_day:
+                body += " AND (ts, part, rid) > (?, ?, ?)"
+                args.extend(after)
+            rows = conn.execute(f"SELECT {', '.join(names)} {body} ORDER BY ts, part, rid LIMIT ?",
+                                (*args, limit + 1 - len(events))).fetchall()
+        for row in rows:
+            events.append(_event(row, names))
+            keys.append(f"{stored.ymd}:{row[2]}:{row[0]}:{row[1]}")
+
+    # one extra row was fetched to know whether there is a next page
+    more = len(events) > limit
+    result = {"events": events[:limit], "next": keys[limit - 1] if more else None, "days_scanned": days}
+    if per_day is not None:
+        result["per_day"] = per_day
+        result["total"] = sum(per_day.values())
+    return result
+
+
+# ---------------------------
+# Generators
+# ---------------------------
+def load_day(folder: Path, rtype: str, ymd: str, log_file: Path = None, parse=parse_raw_line):
+    """DataFrame of the day's ``rtype`` records, as the daily scripts build it.
+
+    Read from the store when it is current for ``log_file``; otherwise
+    ``log_file`` is parsed with ``parse`` (reporting progress) and every
+    parsed record is stored on the way, so the next run is a query.
+
+    Either way the records are ``log_file``'s only: per-device logs uploaded
+    separately for the same day are not added in. Without ``log_file``,
+    everything stored for the day is read.
+    """
+    import pandas as pd
+
+    day = Day(folder, ymd, source=Path(log_file).name if log_file is not None else None)
+    if day.current_for(log_file):
+        progress.stage("query")
+        df = day.frame(f"SELECT {', '.join(COLUMNS)}, extra FROM events WHERE {RECORD_SQL[rtype]}")
+        # the fields kept in extra are columns too, as when the records are parsed
+        extra = df.pop("extra")
+        if extra.notna().any():
+            df = pd.concat([df, pd.DataFrame([json.loads(x) if x else {} for x in extra], index=df.index)], axis=1)
+        # columns no record had are absent, as with a DataFrame built from dicts
+        return df.dropna(axis=1, how="all")
+    if log_file is None:
+        raise FileNotFoundError(f"No raw log or stored events for {ymd}")
+
+    accept = RECORD_FILTERS[rtype]
+    writer = DayPartitions(folder, ymd, rtype=rtype, source=log_file) if enabled() else None
+    records = []
+    progress.stage("parse")
+    try:
+        for line in progress.read_lines(Path(log_file)):
+            parsed = parse(line)
+            if parsed:
+                if writer is not None:
+                    writer.add(parsed)
+                if accept(parsed):
+                    records.append(parsed)
+        if writer is not None:
+            progress.stage("store")
+            writer.commit(source=log_file)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    progress.stage("dataframe")
+    return pd.DataFrame(records)
@@ -0,0 +1,613 @@
+"""
+Pull connector for FortiAnalyzer's JSON-RPC log API (``/jsonrpc``, logview
+``apiver 3``), for sites whose FortiGates can only be reached through it.
+
+    python fortianalyzer.py pull --url https://faz.example:443 --token ... [--once]
+    FORTI_FAZ_URL=https://faz.example FORTI_FAZ_TOKEN=... uvicorn main:app     # inside the API
+
+Each report type is pulled in time windows (at most ``window`` seconds, never
+across midnight, ending ``lag`` seconds ago so FortiAnalyzer has indexed the
+logs). A window is one log search task, read in pages of ``page`` records
+by ``fetchers`` threads over a pool of keep-alive connections. Pages are
+added in order to the same ``syslogd.LiveDays`` as syslog messages: the
+day's spool, published as its raw log once the day is over and pulled, with
+the day's aggregates kept running.
+
+The cursor (window and offset reached per type) is saved after every page,
+so a restart carries on where it stopped; at most the page being written
+when it stopped is fetched twice.
+
+    python fortianalyzer.py stub --logs disk-ips-2025_11_02.log --record rec.jsonl    # fake FortiAnalyzer
+    python fortianalyzer.py stub --replay rec.jsonl                                     # replay recorded answers
+"""
+
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import queue
+import re
+import ssl
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import metrics
+import syslogd
+from logparse import parse_raw_line
+
+# report type -> FortiAnalyzer logtype
+LOGTYPES = {rtype: subtype for subtype, rtype in syslogd.ROUTES.items()}
+
+FETCHERS = 4
+PAGE = 1000  # FortiAnalyzer allows up to 1000 logs per fetch
+WINDOW = 3600
+LAG = 300
+SEARCH_TIMEOUT = 300
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_BARE = re.compile(r"^[\w.:/+@-]+$")
+
+
+class AnalyzerError(Exception):
+    pass
+
+
+def to_line(log: dict) -> str:
+    """A FortiAnalyzer log record as a FortiGate ``key=value`` line."""
+    parts = []
+    for key, value in log.items():
+        if not re.fullmatch(r"\w+", key) or isinstance(value, (dict, list)) or value is None:
+            continue
+        value = str(value)
+        parts.append(f"{key}={value}" if _BARE.match(value) else f'{key}="{value.replace(chr(34), chr(39))}"')
+    return " ".join(parts)
+
+
+def replay_key(payload: dict) -> str:
+    """What identifies a request in a recording (session and id left out)."""
+    params = (payload.get("params") or [{}])[0]
+    key = {"method": payload.get("method"), "url": params.get("url")}
+    for name in ("logtype", "time-range", "offset", "limit"):
+        if name in params:
+            key[name] = params[name]
+    return json.dumps(key, sort_keys=True)
+
+
+# ---------------------------
+# Client
+# ---------------------------
+class ConnectionPool:
+    """Up to ``size`` keep-alive connections to one server, reused across threads."""
+
+    def __init__(self, url: str, size: int, timeout: float = 60, verify: bool = True):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Not an http(s) URL: {url}")
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip("/") or "/jsonrpc"
+        self.timeout = timeout
+        self.context = (ssl.create_default_context() if verify else ssl._create_unverified_context()) \
+            if self.https else None
+        self.size = size
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        self.opened += 1
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def post(self, body: bytes, headers: dict) -> bytes:
+        with self._slots:
+            try:
+                conn, fresh = self._idle.get_nowait(), False
+            except queue.Empty:
+                conn, fresh = self._connect(), True
+            while True:
+                try:
+                    conn.request("POST", self.path, body, {"Content-Type": "application/json", **headers})
+                    response = conn.getresponse()
+                    data = response.read()
+                except (http.client.HTTPException, ConnectionError):
+                    conn.close()
+                    if fresh:
+                        raise
+                    # the server closed an idle keep-alive connection: once more on a new one
+                    conn, fresh = self._connect(), True
+                    continue
+                except OSError:
+                    conn.close()
+                    raise
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+                if response.status != 200:
+                    raise AnalyzerError(f"HTTP {response.status} from {self.host}")
+                return data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class Client:
+    """Log searches over JSON-RPC. Authenticates with an API token, or a user
+    and password (session login, renewed when it expires)."""
+
+    def __init__(self, url: str, adom: str = "root", token: str = None, user: str = None, password: str = None,
+                 connections: int = FETCHERS, verify: bool = True, record: Path = None):
+        self.pool = ConnectionPool(url, connections, verify=verify)
+        self.adom = adom
+        self.token = token
+        self.user = user
+        self.password = password
+        self.session = None
+        self.record = Path(record) if record else None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._record_lock = threading.Lock()
+
+    def _rpc(self, payload: dict) -> dict:
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), **payload}
+        if self.session:
+            payload["session"] = self.session
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        started = time.perf_counter()
+        reply = json.loads(self.pool.post(json.dumps(payload).encode(), headers))
+        metrics.FORTIANALYZER_REQUEST_SECONDS.observe(time.perf_counter() - started, method=payload["method"])
+        if self.record is not None:
+            with self._record_lock, open(self.record, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": replay_key(payload), "response": reply}) + "\n")
+        return reply
+
+    @staticmethod
+    def _status(reply: dict) -> tuple:
+        if reply.get("error"):
+            return reply["error"].get("code", -1), reply["error"].get("message", "")
+        result = reply.get("result")
+        result = result[0] if isinstance(result, list) and result else result
+        status = (result or {}).get("status") or {}
+        return status.get("code", 0), status.get("message", "")
+
+    def login(self):
+        if self.token or not self.user:
+            return
+        self.session = None
+        reply = self._rpc({"method": "exec", "params": [
+            {"url": "/sys/login/user", "data": {"user": self.user, "passwd": self.password}}]})
+        code, message = self._status(reply)
+        if code != 0 or not reply.get("session"):
+            raise AnalyzerError(f"FortiAnalyzer login failed: {message or code}")
+        self.session = reply["session"]
+
+    def call(self, method: str, url: str, **params) -> dict:
+        for attempt in (0, 1):
+            if self.user and not self.token and self.session is None:
+                with self._lock:
+                    if self.session is None:
+                        self.login()
+            reply = self._rpc({"method": method, "params": [{"url": url, "apiver": 3, **params}]})
+            code, message = self._status(reply)
+            if code == -11 and attempt == 0 and self.user and not self.token:
+                self.session = None  # session expired
+                continue
+            if code != 0:
+                raise AnalyzerError(f"{method} {url}: {message or code}")
+            result = reply.get("result")
+            return result[0] if isinstance(result, list) else result
+
+    def search(self, logtype: str, start: datetime, end: datetime) -> int:
+        result = self.call("add", f"/logview/adom/{self.adom}/logsearch", logtype=logtype,
+                           device=[{"devid": "All_FortiGate"}], filter="", **{
+                               "time-order": "asc",
+                               "time-range": {"start": start.strftime(TIME_FORMAT), "end": end.strftime(TIME_FORMAT)},
+                           })
+        return result["tid"]
+
+    def fetch(self, tid: int, offset: int, limit: int) -> dict:
+        return self.call("get", f"/logview/adom/{self.adom}/logsearch/{tid}", offset=offset, limit=limit)
+
+    def fetch_complete(self, tid: int, offset: int, limit: int, timeout: float = SEARCH_TIMEOUT) -> dict:
+        """``fetch``, once the search has finished (``percentage`` 100) and its total is known."""
+        deadline = time.monotonic() + timeout
+        delay = 0.2
+        while True:
+            result = self.fetch(tid, offset, limit)
+            if result.get("percentage", 100) >= 100:
+                return result
+            if time.monotonic() > deadline:
+                raise AnalyzerError(f"Log search {tid} not finished after {timeout:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+
+    def close_search(self, tid: int):
+        try:
+            self.call("delete", f"/logview/adom/{self.adom}/logsearch/{tid}")
+        except (AnalyzerError, OSError, http.client.HTTPException):
+            pass  # FortiAnalyzer expires search tasks on its own
+
+    def close(self):
+        self.pool.close()
+
+
+# ---------------------------
+# Puller
+# ---------------------------
+class Puller:
+    """Pulls ``rtypes`` from ``client`` into ``live``, the day spools it may share with the syslog receiver."""
+
+    def __init__(self, client: Client, live: syslogd.LiveDays, rtypes, state_path: Path,
+                 fetchers: int = FETCHERS, page: int = PAGE, window: float = WINDOW, lag: float = LAG,
+                 start: str = None, interval: float = 60):
+        self.client = client
+        self.live = live
+        self.rtypes = list(rtypes)
+        self.state_path = Path(state_path)
+        self.fetchers = fetchers
+        self.page = page
+        self.window = timedelta(seconds=window)
+        self.lag = timedelta(seconds=lag)
+        self.start_day = datetime.strptime(start, "%Y_%m_%d") if start else \
+            datetime.combine(datetime.now().date(), dtime())
+        self.interval = interval
+        self.state = self._load()
+        # the day each cursor is on stays unpublished until it has been pulled to the end
+        for rtype in self.rtypes:
+            self.live.hold("fortianalyzer", rtype, self._cursor(rtype)["start"][:10].replace("-", "_"))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = None
+        self._task = None
+
+    # -- state -----------------------------------------------------------------
+    def _load(self) -> dict:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("cursor", {})
+        state.setdefault("errors", {})
+        return state
+
+    def _save(self):
+        with self._lock:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+            tmp.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+            os.replace(tmp, self.state_path)
+
+    def status(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "url": f"{'https' if self.client.pool.https else 'http'}://{self.client.pool.host}"
+                   + (f":{self.client.pool.port}" if self.client.pool.port else ""),
+            "adom": self.client.adom,
+            "types": self.rtypes,
+            "fetchers": self.fetchers,
+            "connections": {"size": self.client.pool.size, "opened": self.client.pool.opened},
+            **self.state,
+        }
+
+    # -- pulling ---------------------------------------------------------------
+    def _cursor(self, rtype: str) -> dict:
+        return self.state["cursor"].get(rtype) or {"start": self.start_day.strftime(TIME_FORMAT), "offset": 0}
+
+    def _write(self, rtype: str, window_day: str, logs: list):
+        for log in logs:
+            line = to_line(log)
+            record = parse_raw_line(line)
+            if not record:
+                continue
+            try:
+                date_str = datetime.strptime(record.get("date", ""), "%Y-%m-%d").strftime("%Y_%m_%d")
+            except ValueError:
+                date_str = window_day
+            self.live.add(rtype, date_str, line, record)
+        # on disk before the cursor moves past it
+        self.live.flush()
+        metrics.FORTIANALYZER_LOGS.inc(len(logs), rtype=rtype)
+
+    def _pull_window(self, rtype: str, cursor: dict, pool: ThreadPoolExecutor) -> int:
+        start = datetime.strptime(cursor["start"], TIME_FORMAT)
+        end = datetime.strptime(cursor["end"], TIME_FORMAT)
+        day = start.strftime("%Y_%m_%d")
+        # the API's time range is inclusive: stop a second short of the next window
+        tid = self.client.search(LOGTYPES[rtype], start, end - timedelta(seconds=1))
+        pages = deque()
+        pulled = 0
+        try:
+            first = self.client.fetch_complete(tid, cursor["offset"], self.page)
+            total = int(first.get("total-count", 0))
+            pending = iter(range(cursor["offset"] + self.page, total, self.page))
+            result = first
+            while True:
+                logs = result.get("data") or []
+                self._write(rtype, day, logs)
+                pulled += len(logs)
+                cursor["offset"] += len(logs)
+                self._save()
+                if self._stop.is_set():
+                    return pulled
+                # keep a few pages in flight, written back in order
+                while len(pages) < self.fetchers * 2:
+                    offset = next(pending, None)
+                    if offset is None:
+                        break
+                    pages.append(pool.submit(self.client.fetch, tid, offset, self.page))
+                if not pages:
+                    break
+                result = pages.popleft().result()
+        finally:
+            for future in pages:
+                future.cancel()
+            self.client.close_search(tid)
+            self.live.tick()
+        return pulled
+
+    def pull_type(self, rtype: str, until: datetime = None) -> int:
+        """Pull ``rtype`` up to ``until`` (default: ``lag`` ago); returns the records written."""
+        # cursors are kept to the second: a fractional end would leave an empty window open forever
+        until = (until or datetime.now() - self.lag).replace(microsecond=0)
+        cursor = self._cursor(rtype)
+        pulled = 0
+        with ThreadPoolExecutor(self.fetchers, thread_name_prefix=f"faz-{rtype}") as pool:
+            while not self._stop.is_set():
+                start = datetime.strptime(cursor["start"], TIME_FORMAT)
+                if not cursor["offset"]:
+                    midnight = datetime.combine(start.date() + timedelta(days=1), dtime())
+                    end = min(start + self.window, midnight, until)
+                    if end <= start:
+                        break
+                    cursor["end"] = end.strftime(TIME_FORMAT)
+                with self._lock:
+                    self.state["cursor"][rtype] = cursor
+                pulled += self._pull_window(rtype, cursor, pool)
+                if self._stop.is_set():
+                    break
+                cursor = {"start": cursor["end"], "offset": 0}
+                with self._lock:
+                    self.state["cursor"][rtype] = cursor
+                self._save()
+                # days behind the cursor are finished
+                self.live.hold("fortianalyzer", rtype, cursor["start"][:10].replace("-", "_"))
+        return pulled
+
+    def pull(self, until: datetime = None) -> dict:
+        """One pass over every type, side by side."""
+        def one(rtype):
+            try:
+                count = self.pull_type(rtype, until)
+                with self._lock:
+                    self.state["errors"].pop(rtype, None)
+                return count
+            except (AnalyzerError, OSError, http.client.HTTPException, ValueError, KeyError) as e:
+                with self._lock:
+                    self.state["errors"][rtype] = f"{type(e).__name__}: {e}"
+                print(f"FortiAnalyzer: {rtype}: {e}")
+                return 0
+
+        with ThreadPoolExecutor(len(self.rtypes) or 1) as pool:
+            counts = dict(zip(self.rtypes, pool.map(one, self.rtypes)))
+        self.state["last_pull"] = {"at": datetime.now().strftime(TIME_FORMAT), "records": counts}
+        self._save()
+        return counts
+
+    def close(self):
+        self.client.close()
+
+    # -- in the API ------------------------------------------------------------
+    async def run(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.to_thread(self.pull)
+            except Exception:
+                traceback.print_exc()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self, timeout: float = 30):
+        if self._task is None:
+            return
+        # a pull in progress stops after the page it is writing
+        self._stop.set()
+        self._wake.set()
+        done, _ = await asyncio.wait({self._task}, timeout=timeout)
+        self._task.cancel()
+        self._task = None
+        if done:
+            await asyncio.to_thread(self.close)
+
+
+# ---------------------------
+# Stub server (testing)
+# ---------------------------
+class LogBackend:
+    """Answers log searches from FortiGate log files, as FortiAnalyzer would."""
+
+    def __init__(self, paths):
+        self.logs = []
+        for path in paths:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                self.logs.extend(r for r in map(parse_raw_line, f) if r)
+        self.logs.sort(key=lambda r: (r.get("date", ""), r.get("time", "")))
+        self.searches = {}
+        self._tids = itertools.count(1)
+
+    def handle(self, payload: dict) -> dict:
+        params = (payload.get("params") or [{}])[0]
+        method, url = payload.get("method"), params.get("url", "")
+        if url == "/sys/login/user":
+            return {"result": [{"status": {"code": 0, "message": "OK"}, "url": url}], "session": "stub"}
+        if method == "add" and url.endswith("/logsearch"):
+            span = params.get("time-range", {})
+            start, end = span.get("start", ""), span.get("end", "~")
+            tid = next(self._tids)
+            self.searches[tid] = [r for r in self.logs if r.get("subtype") == params.get("logtype")
+                                  and start <= f"{r.get('date', '')} {r.get('time', '')}" <= end]
+            return {"result": {"tid": tid}}
+        match = re.search(r"/logsearch/(\d+)$", url)
+        if match and int(match.group(1)) in self.searches:
+            tid = int(match.group(1))
+            if method == "delete":
+                del self.searches[tid]
+                return {"result": {"status": {"code": 0, "message": "succeeded"}}}
+            found = self.searches[tid]
+            offset, limit = params.get("offset", 0), params.get("limit", PAGE)
+            data = found[offset:offset + limit]
+            return {"result": {"data": data, "offset": offset, "return-lines": len(data), "total-count": len(found),
+                               "percentage": 100, "status": {"code": 0, "message": "succeeded"}}}
+        return {"error": {"code": -3, "message": "Object does not exist"}}
+
+
+class ReplayBackend:
+    """Answers with recorded responses (``record`` JSON lines), matched on ``replay_key``."""
+
+    def __init__(self, path: Path):
+        self.responses = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses.setdefault(entry["key"], entry["response"])
+
+    def handle(self, payload: dict) -> dict:
+        reply = self.responses.get(replay_key(payload))
+        if reply is None:
+            return {"error": {"code": -3, "message": "Not in the recording"}}
+        return reply
+
+
+def stub_server(backend, host: str = "127.0.0.1", port: int = 0, record: Path = None) -> ThreadingHTTPServer:
+    """A FortiAnalyzer stand-in on ``host:port`` (0 = any free port); call ``serve_forever`` on it."""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like FortiAnalyzer
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                reply = backend.handle(payload)
+                if record is not None:
+                    with open(record, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"key": replay_key(payload), "response": reply}) + "\n")
+            body = json.dumps({"jsonrpc": "2.0", "id": payload.get("id"), **reply}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+# ---------------------------
+# Command line
+# ---------------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FortiAnalyzer log pull connector and stub server")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pull", help="pull logs into the report tree's raw logs")
+    p.add_argument("--url", default=os.environ.get("FORTI_FAZ_URL"), help="FortiAnalyzer URL (FORTI_FAZ_URL)")
+    p.add_argument("--adom", default=os.environ.get("FORTI_FAZ_ADOM", "root"))
+    p.add_argument("--token", default=os.environ.get("FORTI_FAZ_TOKEN"), help="API token (FORTI_FAZ_TOKEN)")
+    p.add_argument("--user", default=os.environ.get("FORTI_FAZ_USER"))
+    p.add_argument("--password", default=os.environ.get("FORTI_FAZ_PASSWORD"))
+    p.add_argument("--insecure", action="store_true", help="don't verify the TLS certificate")
+    p.add_argument("--types", help="comma separated (default: all)")
+    p.add_argument("--fetchers", type=int, default=FETCHERS, help=f"concurrent fetches per type (default {FETCHERS})")
+    p.add_argument("--page", type=int, default=PAGE)
+    p.add_argument("--window", type=float, default=WINDOW, help="seconds of logs per search")
+    p.add_argument("--lag", type=float, default=LAG, help="stay this many seconds behind now")
+    p.add_argument("--start", help="YYYY_MM_DD to start from when there is no cursor yet (default today)")
+    p.add_argument("--until", help="'YYYY-MM-DD HH:MM:SS' to stop at (default: now minus --lag)")
+    p.add_argument("--state", type=Path, default=Path(__file__).parent / "fortianalyzer_state.json")
+    p.add_argument("--record", type=Path, help="append every request and response to this file")
+    p.add_argument("--once", action="store_true", help="one pass, then exit")
+    p.add_argument("--interval", type=float, default=60)
+
+    p = sub.add_parser("stub", help="serve a fake FortiAnalyzer for testing")
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("--logs", nargs="+", type=Path, help="answer searches from these log files")
+    source.add_argument("--replay", type=Path, help="answer with the responses recorded in this file")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8443)
+    p.add_argument("--record", type=Path, help="append every request and response to this file")
+
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        backend = LogBackend(args.logs) if args.logs else ReplayBackend(args.replay)
+        server = stub_server(backend, args.host, args.port, record=args.record)
+        print(f"FortiAnalyzer stub on http://{args.host}:{server.server_port}/jsonrpc", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.url:
+        parser.error("pull needs --url (or FORTI_FAZ_URL)")
+    from main import BASE_DIR, REPORT_CONFIG, raw_log_path
+
+    rtypes = args.types.split(",") if args.types else list(LOGTYPES)
+    unknown = [t for t in rtypes if t not in LOGTYPES]
+    if unknown:
+        parser.error(f"unknown types: {', '.join(unknown)}")
+    client = Client(args.url, adom=args.adom, token=args.token, user=args.user, password=args.password,
+                    connections=args.fetchers * len(rtypes), verify=not args.insecure, record=args.record)
+    live = syslogd.LiveDays(raw_log_path, lambda rtype: BASE_DIR / REPORT_CONFIG[rtype]["folder"])
+    puller = Puller(client, live, rtypes, state_path=args.state, fetchers=args.fetchers, page=args.page, window=args.window,
+                    lag=args.lag, start=args.start)
+    until = datetime.strptime(args.until, TIME_FORMAT) if args.until else None
+    try:
+        while True:
+            started = time.perf_counter()
+            counts = puller.pull(until)
+            print(f"[{time.strftime('%H:%M:%S')}] pulled "
+                  + ", ".join(f"{t}={n:,}" for t, n in counts.items())
+                  + f" in {time.perf_counter() - started:.1f}s ({client.pool.opened} connections opened)", flush=True)
+            if args.once:
+                return 1 if puller.state["errors"] else 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        puller.close()
+        live.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Streaming ingest: bytes in, daily aggregates out, in a single pass.
+
+Used by the upload endpoints so a raw log is parsed and aggregated while it
+is being written to ``Raw Logs`` instead of being re-read later. Given an
+``eventstore.DayPartitions``, every parsed record is also stored for the day.
+"""
+
+from pathlib import Path
+
+from aggregate import DailyAggregator
+from logparse import RECORD_FILTERS, LineSplitter, parse_raw_line
+
+
+class StreamIngestor:
+    def __init__(self, rtype: str, store=None):
+        self.rtype = rtype
+        self.store = store
+        self.splitter = LineSplitter()
+        self.accept = RECORD_FILTERS[rtype]
+        self.aggregator = DailyAggregator(rtype)
+        self.lines = 0
+        self.records = 0
+
+    def _consume(self, lines):
+        accept = self.accept
+        feed = self.aggregator.feed
+        store = self.store.add if self.store is not None else None
+        for line in lines:
+            self.lines += 1
+            record = parse_raw_line(line)
+            if not record:
+                continue
+            if store:
+                store(record)
+            if accept(record):
+                self.records += 1
+                feed(record)
+
+    def feed(self, chunk: bytes):
+        self._consume(self.splitter.feed(chunk))
+
+    def close(self, source=None) -> dict:
+        """Aggregates of everything fed; ``source`` is the raw log the stored events are tied to."""
+        self._consume(self.splitter.close())
+        result = self.aggregator.result()
+        result["lines"] = self.lines
+        result["records"] = self.records
+        if self.store is not None:
+            paths = self.store.commit(source=source)
+            result["stored"] = self.store.rows
+            result["partitions"] = [Path(p).stem for p in paths]
+        return result
+
+    def abort(self):
+        if self.store is not None:
+            self.store.abort()
@@ -0,0 +1,312 @@
+"""
+Report generation job queue.
+
+A fixed number of worker threads pull jobs from a shared queue, so only
+``workers`` generations run at once no matter how many requests arrive.
+Jobs are keyed by (mode, rtype, date): asking for a generation that is
+already queued or running returns the existing job instead of starting a
+second one that would overwrite the same report.
+
+Each job has a priority (interactive requests ahead of backfill work) and
+may depend on other jobs; a worker takes the highest-priority queued job
+whose dependencies have all finished, skipping report types that already
+have ``per_type`` jobs running. Past ``max_queued`` waiting jobs, new
+submissions are refused with ``QueueFull``.
+
+Progress reported by the runner and the final state are published to any
+subscribers (the SSE endpoint) on their own event loops.
+"""
+
+import itertools
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# lower runs first
+INTERACTIVE = 0
+SCHEDULED = 5
+BACKFILL = 10
+
+# finished jobs kept for /api/jobs lookups
+KEEP_FINISHED = 500
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Generation queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+_seq = itertools.count()
+
+
+class Job:
+    def __init__(self, mode: str, rtype: str, date: str = None, priority: int = INTERACTIVE,
+                 depends_on=(), batch: str = None, profile: bool = False):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.rtype = rtype
+        self.date = date
+        self.priority = priority
+        self.depends_on = list(depends_on)  # Job objects
+        self.batches = {batch} if batch else set()  # every backfill that asked for it
+        self.profile = profile
+        self.seq = next(_seq)
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.progress = {}
+        self.cancel_event = threading.Event()
+
+    @property
+    def key(self):
+        return (self.mode, self.rtype, self.date)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "type": self.rtype,
+            "date": self.date,
+            "status": self.status,
+            "priority": self.priority,
+            "depends_on": [j.id for j in self.depends_on],
+            "batches": sorted(self.batches),
+            "profile": self.profile,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": (self.finished or time.time()) - self.started if self.started else None,
+            "result": self.result,
+            "error": self.error,
+            "progress": self.progress,
+        }
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ACTIVE_STATES
+
+    @property
+    def ready(self) -> bool:
+        # a failed daily (e.g. no log that day) should not hold up the monthly
+        return all(dep.done for dep in self.depends_on)
+
+
+class JobManager:
+    """``runner(job)`` does the work and returns a result dict. It should poll
+    ``job.cancel_event`` and raise ``JobCancelled`` when it is set."""
+
+    def __init__(self, runner, workers: int = 2, per_type: int = 0, max_queued: int = 0):
+        self.runner = runner
+        self.workers = workers
+        self.per_type = per_type      # 0 = no per-type limit
+        self.max_queued = max_queued  # 0 = unbounded
+        self._jobs = OrderedDict()
+        self._active = {}  # key -> job
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._subscribers = {}  # job id -> [(loop, asyncio.Queue)]
+        self._avg_duration = None  # moving average of job run time, for Retry-After
+
+    # -- lifecycle -------------------------------------------------------------
+    def start(self):
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stopping = False
+        self._threads = []
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"generate-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopping = True
+            for job in list(self._active.values()):
+                job.cancel_event.set()
+            self._cond.notify_all()
+
+    # -- API ---------------------------------------------------------------------
+    def submit(self, mode: str, rtype: str, date: str = None, priority: int = INTERACTIVE,
+               depends_on=(), batch: str = None, profile: bool = False):
+        """Queue a job; returns (job, created). ``created`` is False when coalesced.
+
+        Coalescing onto a queued job raises its priority if the new request's is
+        higher, so an analyst asking for a day already queued by a backfill gets it
+        next instead of waiting behind the rest of the backfill. A profiling
+        request turns profiling on for a job that has not started yet. The
+        job joins the new request's batch, and a queued job also waits for
+        the new request's dependencies.
+        """
+        with self._cond:
+            existing = self._active.get((mode, rtype, date))
+            if existing is not None:
+                existing.priority = min(existing.priority, priority)
+                if batch:
+                    existing.batches.add(batch)
+                if existing.status == QUEUED:
+                    existing.profile = existing.profile or profile
+                    existing.depends_on.extend(
+                        dep for dep in depends_on if dep is not existing and dep not in existing.depends_on)
+                return existing, False
+            self._admit(1)
+            job = Job(mode, rtype, date, priority, depends_on, batch, profile)
+            self._jobs[job.id] = job
+            self._active[job.key] = job
+            self._queue.append(job)
+            self._prune()
+            self._cond.notify()
+            return job, True
+
+    def reserve(self, count: int):
+        """Raise QueueFull unless ``count`` more jobs fit (checked before a bulk submit)."""
+        with self._cond:
+            self._admit(count)
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def batch(self, batch_id: str):
+        with self._cond:
+            return [j for j in self._jobs.values() if batch_id in j.batches]
+
+    def list(self, limit: int = 100):
+        with self._cond:
+            jobs = list(self._jobs.values())[-limit:]
+        return list(reversed(jobs))
+
+    def cancel(self, job_id: str):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return job
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED)
+            return job
+
+    def set_progress(self, job: Job, update: dict):
+        job.progress = update
+        self._publish(job, "progress")
+
+    def subscribe(self, job_id: str, loop, q):
+        """Deliver ``(event, job_dict)`` tuples for ``job_id`` into asyncio queue ``q``."""
+        with self._cond:
+            self._subscribers.setdefault(job_id, []).append((loop, q))
+
+    def unsubscribe(self, job_id: str, q):
+        with self._cond:
+            subs = [s for s in self._subscribers.get(job_id, []) if s[1] is not q]
+            if subs:
+                self._subscribers[job_id] = subs
+            else:
+                self._subscribers.pop(job_id, None)
+
+    def stats(self) -> dict:
+        with self._cond:
+            running = sum(1 for j in self._active.values() if j.status == RUNNING)
+            backfill = sum(1 for j in self._queue if j.priority >= BACKFILL)
+            return {"workers": self.workers, "per_type": self.per_type, "max_queued": self.max_queued,
+                    "queued": len(self._queue), "running": running, "queued_backfill": backfill}
+
+    # -- internals -----------------------------------------------------------------
+    def _publish(self, job: Job, event: str):
+        with self._cond:
+            subs = list(self._subscribers.get(job.id, ()))
+        if not subs:
+            return
+        payload = (event, job.to_dict())
+        for loop, q in subs:
+            try:
+                loop.call_soon_threadsafe(q.put_nowait, payload)
+            except RuntimeError:
+                pass  # subscriber's loop is closed
+
+    def _finish(self, job: Job, status: str):
+        # caller holds self._cond (an RLock, so _publish can re-acquire it)
+        job.status = status
+        job.finished = time.time()
+        if job.started and status != CANCELLED:
+            took = job.finished - job.started
+            self._avg_duration = took if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * took
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        # jobs waiting on this one may now be runnable
+        self._cond.notify_all()
+        self._publish(job, "complete")
+
+    def _admit(self, count: int):
+        # caller holds self._cond
+        overflow = len(self._queue) + count - self.max_queued
+        if self.max_queued and overflow > 0:
+            # a slot frees up each time a worker picks up a job
+            avg = self._avg_duration or 30
+            raise QueueFull(max(1, round(avg * overflow / self.workers)))
+
+    def _next(self):
+        # caller holds self._cond
+        busy = {}
+        if self.per_type:
+            for j in self._active.values():
+                if j.status == RUNNING:
+                    busy[j.rtype] = busy.get(j.rtype, 0) + 1
+        ready = [j for j in self._queue
+                 if j.ready and (not self.per_type or busy.get(j.rtype, 0) < self.per_type)]
+        if not ready:
+            return None
+        job = min(ready, key=lambda j: (j.priority, j.seq))
+        self._queue.remove(job)
+        return job
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status not in ACTIVE_STATES]
+        for job in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[job.id]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    job = self._next()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+                job.status = RUNNING
+                job.started = time.time()
+            self._publish(job, "progress")
+            status = SUCCEEDED
+            try:
+                job.result = self.runner(job)
+                if job.result and job.result.get("error"):
+                    job.error = job.result["error"]
+                    status = FAILED
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.result = {"traceback": traceback.format_exc()}
+                status = FAILED
+            with self._cond:
+                self._finish(job, status)
@@ -0,0 +1,52 @@
+"""
+Shared FortiGate log parsing — the same key=value / key="value" rules the
+generator scripts use, plus the per-type record selection each daily report
+applies before counting.
+"""
+
+import codecs
+import re
+
+RAW_PATTERN = re.compile(r'(\w+)=(?:"([^"]*)"|(\S+))')
+
+
+def parse_raw_line(line: str):
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    matches = RAW_PATTERN.findall(line)
+    if not matches:
+        return None
+    result = {}
+    for key, quoted, unquoted in matches:
+        result[key] = quoted if quoted else unquoted
+    return result
+
+
+# Which parsed records belong to each report type (mirrors the daily scripts)
+RECORD_FILTERS = {
+    "webfilter": lambda r: True,
+    "appctrl": lambda r: True,
+    "ips": lambda r: r.get("subtype") == "ips" and r.get("eventtype") == "signature",
+    "dns": lambda r: r.get("subtype") == "dns",
+    "antivirus": lambda r: r.get("subtype") == "virus" and r.get("eventtype") == "infected",
+}
+
+
+class LineSplitter:
+    """Turn arbitrary byte chunks into complete text lines (UTF-8, errors ignored)."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._pending = ""
+
+    def feed(self, chunk: bytes):
+        text = self._pending + self._decoder.decode(chunk)
+        lines = text.split("\n")
+        self._pending = lines.pop()
+        return lines
+
+    def close(self):
+        tail = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        return [tail] if tail else []
@@ -3,16 +3,38 @@ ULTIMATE FINAL main.py — WORKS ON EVERY WINDOWS MACHINE
 No more "Access denied" — EVER
 """
 
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, BackgroundTasks, Form
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
 import re
 import urllib.parse
-import subprocess
+import uuid
 import sys
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from pathlib import PurePath
+from typing import List
+
+import aggregate
+import eventstore
+import fortianalyzer
+import jobs
+import metrics
+import scheduler
+import storage
+import syslogd
+import uploads
+import workers
+from ingest import StreamIngestor
 
 app = FastAPI(title="FortiGate Security Portal API")
 
@@ -24,9 +46,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestMetrics)
 
-# YOUR REAL FOLDERS
-BASE_DIR = Path(__file__).parent.parent / "public" / "Python Report"
+# YOUR REAL FOLDERS (FORTI_REPORT_DIR: another tree with the same layout; the generators honour it too)
+BASE_DIR = Path(os.environ.get("FORTI_REPORT_DIR") or Path(__file__).parent.parent / "public" / "Python Report")
 
 REPORT_CONFIG = {
     "appctrl": {
@@ -66,21 +89,54 @@ REPORT_CONFIG = {
     },
 }
 
+# (folder, prefix) -> (directory mtime_ns, matching files). Only the names are
+# cached: a report rewritten in place leaves the directory mtime alone, so each
+# file's version is taken from its own stat on every listing.
+_listing_cache = {}
+
+
 def get_files(folder_path: Path, prefix: str):
-    if not folder_path.exists():
+    try:
+        mtime = folder_path.stat().st_mtime_ns
+    except OSError:
         return []
+    cached = _listing_cache.get((folder_path, prefix))
+    metrics.cache_lookup("report_listing", bool(cached and cached[0] == mtime))
+    if cached and cached[0] == mtime:
+        names = cached[1]
+    else:
+        names = _scan_files(folder_path, prefix)
+        _listing_cache[(folder_path, prefix)] = (mtime, names)
+    files = []
+    for name, date_normalized in names:
+        file = folder_path / name
+        try:
+            st = file.stat()
+        except OSError:
+            continue
+        files.append({
+            "filename": name,
+            "fullpath": str(file),
+            "date": date_normalized,
+            "version": storage.version_token(st),
+        })
+    return files
+
+
+def _scan_files(folder_path: Path, prefix: str):
     # Match both formats: 20251208 (8 digits), 202512 (6 digits), or 2025_12 (YYYY_MM with underscore)
     pattern = re.compile(rf"{prefix}(\d{{4}}[_]?\d{{2}}|\d{{8}}|\d{{6}})\.html$")
     files = []
     for file in folder_path.iterdir():
         if file.is_file() and (m := pattern.match(file.name)):
             # Normalize date for sorting (remove underscores)
-            date_normalized = m.group(1).replace('_', '')
-            files.append({"filename": file.name, "fullpath": str(file), "date": date_normalized})
-    return sorted(files, key=lambda x: x["date"], reverse=True)
+            files.append((file.name, m.group(1).replace('_', '')))
+    return sorted(files, key=lambda x: x[1], reverse=True)
 
+# Listing endpoints are plain functions: FastAPI runs them in its threadpool,
+# so directory scans never hold up the event loop.
 @app.get("/api/reports/{rtype}/daily")
-async def daily(rtype: str):
+def daily(rtype: str):
     if rtype not in REPORT_CONFIG: raise HTTPException(404)
     folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"] / "daily_reports"
     files = get_files(folder, REPORT_CONFIG[rtype]["daily_prefix"])
@@ -88,13 +144,13 @@ async def daily(rtype: str):
         {
             "date": f"{f['date'][:4]}-{f['date'][4:6]}-{f['date'][6:8]}",
             "filename": f["filename"],
-            "path": f"/api/serve/{rtype}/daily/{urllib.parse.quote(f['filename'])}"
+            "path": f"/api/serve/{rtype}/daily/{urllib.parse.quote(f['filename'])}?v={f['version']}"
         }
         for f in files
     ]
 
 @app.get("/api/reports/{rtype}/monthly")
-async def monthly(rtype: str):
+def monthly(rtype: str):
     if rtype not in REPORT_CONFIG: raise HTTPException(404)
     folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"] / "monthly_reports"
     files = get_files(folder, REPORT_CONFIG[rtype]["monthly_prefix"])
@@ -102,14 +158,31 @@ async def monthly(rtype: str):
         {
             "month": f"{f['date'][:4]}-{f['date'][4:6]}",
             "filename": f["filename"],
-            "path": f"/api/serve/{rtype}/monthly/{urllib.parse.quote(f['filename'])}"
+            "path": f"/api/serve/{rtype}/monthly/{urllib.parse.quote(f['filename'])}?v={f['version']}"
         }
         for f in files
     ]
 
+# Cache lifetime for versioned URLs (?v=...) of reports whose period is closed.
+# A regenerated report gets a new version token, so "immutable" is safe.
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _period_closed(period: str, filename: str) -> bool:
+    """True if the report covers a day/month that is already over."""
+    m = re.search(r"(\d{4})_?(\d{2})(\d{2})?\.html$", filename)
+    if not m:
+        return False
+    year, month, day = m.group(1), m.group(2), m.group(3)
+    today = datetime.utcnow().date()
+    if period == "daily" and day:
+        return f"{year}{month}{day}" < today.strftime("%Y%m%d")
+    return f"{year}{month}" < today.strftime("%Y%m")
+
+
 # NEW: Direct path serving — NO PATH PARAMETER, NO SECURITY ISSUES
 @app.get("/api/serve/{rtype}/{period}/{filename:path}")
-async def serve_file(rtype: str, period: str, filename: str):
+async def serve_file(rtype: str, period: str, filename: str, request: Request, v: str = None):
     if rtype not in REPORT_CONFIG:
         raise HTTPException(404, "Invalid type")
     
@@ -124,8 +197,42 @@ async def serve_file(rtype: str, period: str, filename: str):
     # Simple check: must be inside BASE_DIR
     if not str(file_path.resolve()).startswith(str(BASE_DIR.resolve())):
         raise HTTPException(403, "Access denied")
-    
-    return FileResponse(file_path, media_type="text/html")
+
+    st = file_path.stat()
+    send_path, encoding = storage.negotiate(file_path, request.headers.get("accept-encoding"))
+    etag = storage.etag(st, encoding)
+
+    if v and v == storage.version_token(st) and _period_closed(period, file_path.name):
+        cache_control = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        # current-period reports may be regenerated at any time: always revalidate
+        cache_control = "no-cache"
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": storage.http_date(st.st_mtime),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    accept = request.headers.get("accept-encoding", "")
+    if "gzip" in accept or "br" in accept:
+        metrics.cache_lookup("precompressed_variant", encoding is not None)
+    revalidating = "if-none-match" in request.headers or "if-modified-since" in request.headers
+    if storage.not_modified(request.headers, etag, st.st_mtime):
+        metrics.cache_lookup("http_revalidation", True)
+        return Response(status_code=304, headers=headers)
+    if revalidating:
+        metrics.cache_lookup("http_revalidation", False)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    # FileResponse would add its own weak etag; ours is per-representation
+    return FileResponse(send_path, media_type="text/html", headers=headers)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 @app.get("/")
 async def root():
@@ -136,6 +243,52 @@ async def root():
 # Upload raw logs
 # ---------------------------
 ALLOWED_UPLOAD_EXT = {".log", ".txt"}
+# Max raw log size in bytes (0 = unlimited). FortiGate daily logs run to several GB.
+MAX_UPLOAD_BYTES = int(os.environ.get("FORTI_MAX_UPLOAD_BYTES", 20 * 1024 ** 3))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Canonical raw log names: disk-<type>-YYYY_MM_DD.log
+RAW_LOG_PREFIX = {
+    "appctrl": "disk-appctrl-",
+    "webfilter": "disk-webfilter-",
+    "ips": "disk-ips-",
+    "dns": "disk-dns-",
+    "antivirus": "disk-antivirus-",
+}
+
+
+def raw_log_dir(rtype: str) -> Path:
+    return BASE_DIR / REPORT_CONFIG[rtype]["folder"] / "Raw Logs"
+
+
+def raw_log_path(rtype: str, date_str: str, device: str = None) -> Path:
+    """Canonical raw log path for a YYYY_MM_DD date (always .log, no path segments).
+
+    One device's log sits next to the fleet log as ``disk-<type>-YYYY_MM_DD@<device>.log``.
+    """
+    suffix = f"@{device}" if device else ""
+    final_name = PurePath(f"{RAW_LOG_PREFIX.get(rtype, 'upload-')}{date_str}{suffix}.log").name
+    return raw_log_dir(rtype) / final_name
+
+
+def _validate_device(device: str):
+    if not device:
+        return None
+    if not re.fullmatch(r"[A-Za-z0-9._-]{1,64}", device) or device.strip(".") != device:
+        raise HTTPException(400, "device must be 1-64 letters, digits, '.', '_' or '-'")
+    return device
+
+
+def _validate_upload_date(selectedDate: str) -> str:
+    """Validate a YYYY_MM_DD upload date (not in the future) and return it normalized."""
+    try:
+        picked = datetime.strptime(selectedDate, "%Y_%m_%d")
+    except Exception:
+        raise HTTPException(400, "selectedDate must be in YYYY_MM_DD format")
+    # prevent future dates
+    if picked.date() > datetime.utcnow().date():
+        raise HTTPException(400, "Selected date cannot be in the future")
+    return picked.strftime("%Y_%m_%d")
 
 
 def sanitize_filename(filename: str) -> str:
@@ -149,10 +302,90 @@ def sanitize_filename(filename: str) -> str:
     return safe
 
 
+def _save_ingest_aggregates(folder: Path, ymd: str, aggregates: dict, source: Path, device: str = None):
+    # the ingest counts cover this log only: good for the day unless other logs (devices) are stored too
+    if device is None and eventstore.Day(folder, ymd).sources() <= {source.name}:
+        aggregate.save(folder, ymd, aggregates)
+
+
+async def _receive_raw_log(rtype: str, date_str: str, chunks, ingest: bool = False, device: str = None):
+    """Stream ``chunks`` (async iterator of bytes) into Raw Logs, optionally
+    parsing and aggregating them in the same pass."""
+    dest_path = raw_log_path(rtype, date_str, device)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Stream to a temp file in Raw Logs and rename into place when complete
+    try:
+        upload = storage.AtomicUpload(dest_path, MAX_UPLOAD_BYTES)
+    except OSError as e:
+        raise HTTPException(500, f"Failed to save file: {e}")
+    folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"]
+    ymd = date_str.replace("_", "")
+    ingestor = None
+    if ingest:
+        store = eventstore.DayPartitions(folder, ymd, rtype=rtype, source=dest_path) if eventstore.enabled() else None
+        ingestor = StreamIngestor(rtype, store=store)
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if ingestor:
+                # disk write (releases the GIL) overlaps with parsing; both finish
+                # before an error is raised, so abort() never races a running feed()
+                outcomes = await asyncio.gather(
+                    run_in_threadpool(upload.write, chunk),
+                    run_in_threadpool(ingestor.feed, chunk),
+                    return_exceptions=True,
+                )
+                for outcome in outcomes:
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+            else:
+                await run_in_threadpool(upload.write, chunk)
+        stats = await run_in_threadpool(upload.commit)
+    except storage.UploadTooLarge:
+        if ingestor:
+            ingestor.abort()
+        raise HTTPException(413, f"File too large (limit {MAX_UPLOAD_BYTES:,} bytes)")
+    except HTTPException:
+        upload.abort()
+        if ingestor:
+            ingestor.abort()
+        raise
+    except Exception as e:
+        upload.abort()
+        if ingestor:
+            ingestor.abort()
+        raise HTTPException(500, f"Failed to save file: {e}")
+
+    result = {"message": "uploaded", "filename": dest_path.name, "path": str(dest_path), **stats}
+    if ingestor:
+        aggregates = await run_in_threadpool(ingestor.close, dest_path)
+        await run_in_threadpool(_save_ingest_aggregates, folder, ymd, aggregates, dest_path, device)
+        result["aggregates"] = {k: aggregates[k] for k in ("total", "notable", "lines", "records")}
+        for key in ("stored", "partitions"):
+            if key in aggregates:
+                result["aggregates"][key] = aggregates[key]
+    return result
+
+
+async def _upload_chunks(file: UploadFile):
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
 @app.post("/api/upload/{rtype}")
-async def upload_raw_log(rtype: str, file: UploadFile = File(...), selectedDate: str = Form(...)):
+async def upload_raw_log(
+    rtype: str,
+    file: UploadFile = File(...),
+    selectedDate: str = Form(...),
+    ingest: bool = Form(False),
+    generate: bool = Form(False),
+    device: str = Form(None),
+):
     if rtype not in REPORT_CONFIG:
         raise HTTPException(404, "Invalid report type")
+    device = _validate_device(device)
     # Validate uploaded filename extension
     orig_name = file.filename or "upload.log"
     safe_name = sanitize_filename(orig_name)
@@ -160,48 +393,114 @@ async def upload_raw_log(rtype: str, file: UploadFile = File(...), selectedDate:
     if ext not in ALLOWED_UPLOAD_EXT:
         raise HTTPException(400, "Only .log and .txt files are allowed")
 
-    # Validate selectedDate format YYYY_MM_DD
+    date_str = _validate_upload_date(selectedDate)
+    result = await _receive_raw_log(rtype, date_str, _upload_chunks(file), ingest=ingest or generate, device=device)
+    if generate:
+        result["generation"] = _queue_after_upload(rtype, date_str)
+    return result
+
+
+@app.put("/api/upload/{rtype}")
+async def upload_raw_log_stream(
+    rtype: str,
+    request: Request,
+    selectedDate: str = Query(...),
+    ingest: bool = Query(True),
+    generate: bool = Query(False),
+    device: str = Query(None),
+):
+    """Raw-body variant of the upload: the log is parsed and aggregated while
+    the request body is still arriving (multipart bodies are buffered by the
+    framework before the handler runs)."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    device = _validate_device(device)
+    date_str = _validate_upload_date(selectedDate)
+    result = await _receive_raw_log(rtype, date_str, request.stream(), ingest=ingest or generate, device=device)
+    if generate:
+        result["generation"] = _queue_after_upload(rtype, date_str)
+    return result
+
+
+# ---------------------------
+# Resumable uploads (initiate → PUT chunks → status → finalize)
+# ---------------------------
+def _upload_dir_for(rtype: str):
+    return raw_log_dir(rtype) if rtype in REPORT_CONFIG else None
+
+
+def _load_upload(upload_id: str) -> uploads.UploadSession:
     try:
-        picked = datetime.strptime(selectedDate, "%Y_%m_%d")
-    except Exception:
-        raise HTTPException(400, "selectedDate must be in YYYY_MM_DD format")
+        return uploads.UploadSession.load(_upload_dir_for, upload_id)
+    except uploads.UploadError as e:
+        raise HTTPException(e.status, e.message)
 
-    # prevent future dates
-    if picked.date() > datetime.utcnow().date():
-        raise HTTPException(400, "Selected date cannot be in the future")
 
-    dest_dir = BASE_DIR / REPORT_CONFIG[rtype]["folder"] / "Raw Logs"
-    dest_dir.mkdir(parents=True, exist_ok=True)
+@app.post("/api/uploads/{rtype}")
+async def initiate_upload(
+    rtype: str,
+    selectedDate: str = Form(...),
+    size: int = Form(...),
+    sha256: str = Form(...),
+    chunkSize: int = Form(uploads.DEFAULT_CHUNK_SIZE),
+    device: str = Form(None),
+):
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    device = _validate_device(device)
+    date_str = _validate_upload_date(selectedDate)
+    if size < 0 or (MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES):
+        raise HTTPException(413, f"File too large (limit {MAX_UPLOAD_BYTES:,} bytes)")
+    if not re.fullmatch(r"[0-9a-fA-F]{64}", sha256):
+        raise HTTPException(400, "sha256 must be a 64 character hex digest")
+    dest = raw_log_path(rtype, date_str, device)
+    try:
+        session = await run_in_threadpool(
+            uploads.UploadSession.create, dest.parent, rtype, dest.name, size, sha256, max(chunkSize, 1)
+        )
+    except OSError as e:
+        raise HTTPException(507, f"Could not preallocate upload: {e}")
+    return session.status()
 
-    # Build canonical filename per requirements (always .log)
-    prefix_map = {
-        "appctrl": "disk-appctrl-",
-        "webfilter": "disk-webfilter-",
-        "ips": "disk-ips-",
-        "dns": "disk-dns-",
-        "antivirus": "disk-antivirus-",
-    }
-    prefix = prefix_map.get(rtype, "upload-")
-    date_str = picked.strftime("%Y_%m_%d")
-    final_name = f"{prefix}{date_str}.log"
-    # sanitize final name and ensure no path segments
-    final_name = PurePath(final_name).name
-    dest_path = dest_dir / final_name
 
+@app.put("/api/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Write the raw request body at ``offset``. Optional ``X-Chunk-Sha256`` is verified."""
+    session = _load_upload(upload_id)
     try:
-        contents = await file.read()
-        # optional size limit (10 MB)
-        if len(contents) > 10 * 1024 * 1024:
-            raise HTTPException(413, "File too large")
-        # write (overwrite if exists)
-        with open(dest_path, "wb") as fh:
-            fh.write(contents)
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(500, f"Failed to save file: {e}")
+        writer = session.open_chunk(offset)
+        try:
+            async for data in request.stream():
+                if data:
+                    await run_in_threadpool(writer.write, data)
+        except BaseException:
+            writer.discard()
+            raise
+        return await run_in_threadpool(writer.close, request.headers.get("x-chunk-sha256"))
+    except uploads.UploadError as e:
+        raise HTTPException(e.status, e.message)
+
+
+@app.get("/api/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    return _load_upload(upload_id).status()
+
+
+@app.post("/api/uploads/{upload_id}/complete")
+async def finalize_upload(upload_id: str):
+    session = _load_upload(upload_id)
+    dest = raw_log_dir(session.meta["rtype"]) / session.meta["filename"]
+    try:
+        stats = await run_in_threadpool(session.finalize, dest)
+    except uploads.UploadError as e:
+        raise HTTPException(e.status, e.message)
+    return {"message": "uploaded", "filename": dest.name, "path": str(dest), **stats}
 
-    return {"message": "uploaded", "filename": final_name, "path": str(dest_path)}
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    await run_in_threadpool(_load_upload(upload_id).abort)
+    return {"message": "aborted", "upload_id": upload_id}
 
 
 # ---------------------------
@@ -209,8 +508,31 @@ async def upload_raw_log(rtype: str, file: UploadFile = File(...), selectedDate:
 # ---------------------------
 
 
-def _run_generator(mode: str, rtype: str, selected_date: str = None):
-    """Worker that executes the generator script and captures output to an error_logs file."""
+def _env_bytes(name: str, default: str = "0") -> int:
+    """Byte count from the environment; accepts K/M/G suffixes (e.g. 6G)."""
+    value = os.environ.get(name, default).strip().upper()
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+GENERATE_TIMEOUT = 600
+# Global and per report type concurrency, and how many jobs may wait (past that: 429)
+GENERATE_WORKERS = int(os.environ.get("FORTI_GENERATE_WORKERS", min(4, os.cpu_count() or 1)))
+GENERATE_PER_TYPE = int(os.environ.get("FORTI_GENERATE_PER_TYPE", 2))
+MAX_QUEUED_JOBS = int(os.environ.get("FORTI_MAX_QUEUED_JOBS", 2000))
+# Worker limits: generators run niced so the API keeps the CPU; 0 = no memory cap
+WORKER_LIMITS = workers.Limits(
+    nice=int(os.environ.get("FORTI_GENERATE_NICE", 10)),
+    max_address_space=_env_bytes("FORTI_GENERATE_MAX_AS"),
+    max_rss=_env_bytes("FORTI_GENERATE_MAX_RSS"),
+)
+
+
+def _run_generator(job: jobs.Job) -> dict:
+    """Job runner: hands the generator to a warm worker process and captures output to an error_logs file."""
+    mode, rtype, selected_date = job.mode, job.rtype, job.date
     cfg = REPORT_CONFIG[rtype]
     folder = BASE_DIR / cfg["folder"]
     script = cfg["daily_script"] if mode == "daily" else cfg["monthly_script"]
@@ -219,36 +541,146 @@ def _run_generator(mode: str, rtype: str, selected_date: str = None):
     log_dir = folder / "error_logs"
     log_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    log_file = log_dir / f"generate_{mode}_{ts}.log"
+    log_file = log_dir / f"generate_{mode}_{ts}_{job.id[:8]}.log"
 
     if not script_path.exists():
         with open(log_file, "w", encoding="utf-8") as fh:
             fh.write(f"Script not found: {script_path}\n")
+        return {"log_file": str(log_file), "error": f"Script not found: {script}"}
+
+    with open(log_file, "w", encoding="utf-8") as fh:
+        fh.write(f"=== {script} {selected_date or ''} ===\n")
+
+    started = time.time()
+    task = {"script": str(script_path), "date": selected_date, "log_file": str(log_file)}
+    if job.profile:
+        task["profile"] = str(log_file.with_suffix(".pstats"))
+    with worker_pool.worker() as worker:
+        try:
+            result = worker.run(task, job.cancel_event, GENERATE_TIMEOUT,
+                                on_progress=lambda update: job_manager.set_progress(job, update))
+        except workers.WorkerCancelled:
+            with open(log_file, "a", encoding="utf-8") as fh:
+                fh.write("\nCANCELLED\n")
+            metrics.GENERATION_JOBS.inc(rtype=rtype, mode=mode, status=jobs.CANCELLED)
+            raise jobs.JobCancelled()
+        result["worker_pid"] = worker.pid
+
+    elapsed = time.time() - started
+    with open(log_file, "a", encoding="utf-8") as fh:
+        fh.write(f"\nRESULT: {result.get('error') or 'ok'} ({elapsed:.1f}s)\n")
+    _record_generation(job, result, elapsed)
+    if result.get("timings"):
+        result["timings_file"] = str(_save_timings(job, result, log_file, elapsed))
+
+    # Write .br/.gz variants of whatever the generator just produced
+    subfolder = "daily_reports" if mode == "daily" else "monthly_reports"
+    storage.precompress_folder(folder / subfolder, since=started - 1)
+
+    _listing_cache.clear()
+    result["log_file"] = str(log_file)
+    if job.profile and log_file.with_suffix(".pstats").exists():
+        result["profile"] = _profile_info(rtype, log_file.with_suffix(".pstats"))
+    return result
+
+
+def _record_generation(job: jobs.Job, result: dict, elapsed: float):
+    labels = {"rtype": job.rtype, "mode": job.mode}
+    metrics.GENERATION_JOBS.inc(status=jobs.FAILED if result.get("error") else jobs.SUCCEEDED, **labels)
+    if result.get("error"):
         return
+    metrics.GENERATION_SECONDS.observe(elapsed, **labels)
+    lines = job.progress.get("lines")  # from progress.read_lines (dailies only)
+    if lines:
+        metrics.GENERATION_LINES.inc(lines, **labels)
+        metrics.GENERATION_RATE.observe(lines / max(elapsed, 1e-3), **labels)
+    for stage in (result.get("timings") or {}).get("stages", ()):
+        metrics.GENERATION_STAGE_SECONDS.observe(stage["seconds"], stage=stage["stage"], **labels)
+
+
+def _save_timings(job: jobs.Job, result: dict, log_file: Path, elapsed: float) -> Path:
+    """Write the per-stage timing/memory record as JSON beside the job's log file."""
+    record = {
+        "job_id": job.id,
+        "type": job.rtype,
+        "mode": job.mode,
+        "date": job.date,
+        "status": jobs.FAILED if result.get("error") else jobs.SUCCEEDED,
+        "finished": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "elapsed": round(elapsed, 3),
+        "worker_pid": result.get("worker_pid"),
+        "lines": job.progress.get("lines"),
+        "bytes": job.progress.get("bytes_read"),
+        **result["timings"],
+    }
+    path = log_file.with_name(log_file.stem + ".timings.json")
+    path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    return path
 
+
+worker_pool = workers.WorkerPool(GENERATE_WORKERS, WORKER_LIMITS)
+job_manager = jobs.JobManager(_run_generator, workers=GENERATE_WORKERS,
+                              per_type=GENERATE_PER_TYPE, max_queued=MAX_QUEUED_JOBS)
+
+
+metrics.REGISTRY.gauge("forti_jobs_queued", "Generation jobs waiting for a worker.",
+                       func=lambda: job_manager.stats()["queued"])
+metrics.REGISTRY.gauge("forti_jobs_running", "Generation jobs running.",
+                       func=lambda: job_manager.stats()["running"])
+metrics.REGISTRY.gauge("forti_generate_workers", "Size of the generator worker pool.",
+                       func=lambda: GENERATE_WORKERS)
+
+
+def _queue_full(e: jobs.QueueFull):
+    return HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _queue_after_upload(rtype: str, date_str: str) -> dict:
+    if not raw_log_path(rtype, date_str).exists():
+        # a device log alone: the daily script reads the fleet log
+        return {"error": f"No fleet log for {date_str}; the device's events are stored and queryable"}
+    # the upload itself succeeded, so a full queue is reported rather than raised
     try:
-        # Use the same Python interpreter running the API
-        cmd = [sys.executable, str(script_path)]
-        if selected_date:
-            # pass selected_date to the script (daily or monthly)
-            cmd.append(selected_date)
-        proc = subprocess.run(cmd, cwd=str(folder), capture_output=True, text=True, timeout=600)
-        with open(log_file, "w", encoding="utf-8") as fh:
-            fh.write("=== STDOUT ===\n")
-            fh.write(proc.stdout or "")
-            fh.write("\n=== STDERR ===\n")
-            fh.write(proc.stderr or "")
-            fh.write(f"\nRETURN CODE: {proc.returncode}\n")
-    except Exception as e:
-        with open(log_file, "w", encoding="utf-8") as fh:
-            fh.write(f"Exception executing script: {e}\n")
+        job, created = job_manager.submit("daily", rtype, date_str)
+    except jobs.QueueFull as e:
+        return {"error": str(e), "retry_after": e.retry_after}
+    return _job_response(job, created)
+
+
+def _precompress_all():
+    """Backfill compressed variants for reports generated outside the API."""
+    total = 0
+    for cfg in REPORT_CONFIG.values():
+        for subfolder in ("daily_reports", "monthly_reports"):
+            total += storage.precompress_folder(BASE_DIR / cfg["folder"] / subfolder)
+    if total:
+        print(f"Precompressed {total} report(s)")
+
 
 
+def _last_month() -> str:
+    now = datetime.now()
+    y, m = now.year, now.month - 1
+    if m == 0:
+        m, y = 12, y - 1
+    return f"{y}{m:02d}"
+
+
+def _job_response(job: jobs.Job, created: bool) -> dict:
+    return {
+        "message": "started" if created else "already queued",
+        "job_id": job.id,
+        "status": job.status,
+        "mode": job.mode,
+        "type": job.rtype,
+        "date": job.date,
+        "profile": job.profile,
+        "events_url": f"/api/jobs/{job.id}/events",
+    }
 
-from fastapi import Form
 
 @app.post("/api/generate/{mode}/{rtype}")
-async def generate_reports(mode: str, rtype: str, background: BackgroundTasks, selectedDate: str = Form(None)):
+async def generate_reports(mode: str, rtype: str, selectedDate: str = Form(None), profile: bool = Form(False)):
     if mode not in {"daily", "monthly"}:
         raise HTTPException(400, "Mode must be 'daily' or 'monthly'")
     if rtype not in REPORT_CONFIG:
@@ -265,7 +697,7 @@ async def generate_reports(mode: str, rtype: str, background: BackgroundTasks, s
             raise HTTPException(400, "selectedDate must be in YYYY_MM_DD format")
         if picked.date() > datetime.utcnow().date():
             raise HTTPException(400, "Selected date cannot be in the future")
-        background.add_task(_run_generator, mode, rtype, selectedDate)
+        date_arg = picked.strftime("%Y_%m_%d")
     else:
         # Monthly: accept optional month in YYYY_MM or YYYYMM or YYYY-MM
         if selectedDate:
@@ -273,12 +705,684 @@ async def generate_reports(mode: str, rtype: str, background: BackgroundTasks, s
             if not re.match(r"^\d{4}[-_]?\d{2}$", selectedDate):
                 raise HTTPException(400, "selectedDate for monthly must be YYYY_MM or YYYYMM")
             # remove separators before passing to script (scripts will normalize as needed)
-            normalized = selectedDate.replace('-', '').replace('_', '')
-            background.add_task(_run_generator, mode, rtype, normalized)
+            date_arg = selectedDate.replace('-', '').replace('_', '')
         else:
-            background.add_task(_run_generator, mode, rtype)
+            # the scripts default to last month; make it explicit so duplicates coalesce
+            date_arg = _last_month()
+
+    try:
+        job, created = job_manager.submit(mode, rtype, date_arg, profile=profile)
+    except jobs.QueueFull as e:
+        raise _queue_full(e)
+    return _job_response(job, created)
+
+
+# ---------------------------
+# Backfill
+# ---------------------------
+# Guard against a typo in the range queueing years of work
+MAX_BACKFILL_DAYS = 366
+
+
+def _parse_day(value: str, name: str):
+    try:
+        return datetime.strptime(value, "%Y_%m_%d").date()
+    except Exception:
+        raise HTTPException(400, f"{name} must be in YYYY_MM_DD format")
+
+
+def _backfill_summary(batch_id: str) -> dict:
+    batch = job_manager.batch(batch_id)
+    if not batch:
+        raise HTTPException(404, "Unknown backfill")
+    counts = {}
+    for job in batch:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    return {"backfill_id": batch_id, "total": len(batch), "counts": counts,
+            "jobs": [j.to_dict() for j in batch]}
+
+
+@app.post("/api/backfill")
+async def backfill(
+    start: str = Form(...),
+    end: str = Form(...),
+    types: str = Form(None),
+    monthly: bool = Form(True),
+):
+    """Queue daily reports for every day in [start, end] and type in ``types``
+    (comma separated, default all), then the monthlies for the months covered.
+
+    Backfill jobs run behind interactive requests; each monthly waits for that
+    month's dailies.
+    """
+    first, last = _parse_day(start, "start"), _parse_day(end, "end")
+    if last < first:
+        raise HTTPException(400, "end must not be before start")
+    if last > datetime.utcnow().date():
+        raise HTTPException(400, "end cannot be in the future")
+    if (last - first).days + 1 > MAX_BACKFILL_DAYS:
+        raise HTTPException(400, f"Backfill is limited to {MAX_BACKFILL_DAYS} days")
+    rtypes = [t.strip() for t in types.split(",") if t.strip()] if types else list(REPORT_CONFIG)
+    unknown = [t for t in rtypes if t not in REPORT_CONFIG]
+    if unknown:
+        raise HTTPException(404, f"Invalid report type: {', '.join(unknown)}")
+
+    batch_id = uuid.uuid4().hex
+    today = datetime.utcnow().date()
+    # all or nothing: don't leave half a backfill queued
+    months = len({(first + timedelta(days=i)).strftime("%Y%m") for i in range((last - first).days + 1)})
+    try:
+        job_manager.reserve(len(rtypes) * ((last - first).days + 1 + (months if monthly else 0)))
+    except jobs.QueueFull as e:
+        raise _queue_full(e)
+    queued = {"daily": 0, "monthly": 0, "coalesced": 0}
+    for rtype in rtypes:
+        by_month = {}
+        day = first
+        while day <= last:
+            job, created = job_manager.submit("daily", rtype, day.strftime("%Y_%m_%d"),
+                                              priority=jobs.BACKFILL, batch=batch_id)
+            by_month.setdefault(day.strftime("%Y%m"), []).append(job)
+            queued["daily" if created else "coalesced"] += 1
+            day += timedelta(days=1)
+        if not monthly:
+            continue
+        for month, dailies in by_month.items():
+            # the running month is not closed yet; its monthly comes from the 1st-of-month run
+            if month == today.strftime("%Y%m"):
+                continue
+            job, created = job_manager.submit("monthly", rtype, month, priority=jobs.BACKFILL,
+                                              depends_on=dailies, batch=batch_id)
+            queued["monthly" if created else "coalesced"] += 1
+
+    return {"backfill_id": batch_id, "types": rtypes, "start": start, "end": end, **queued}
 
-    return {"message": "started", "mode": mode, "type": rtype}
+
+@app.get("/api/backfill/{backfill_id}")
+async def backfill_status(backfill_id: str):
+    return _backfill_summary(backfill_id)
+
+
+@app.post("/api/backfill/{backfill_id}/cancel")
+async def cancel_backfill(backfill_id: str):
+    # newest first, so monthlies are cancelled before their dailies release them
+    for job in reversed(job_manager.batch(backfill_id)):
+        job_manager.cancel(job.id)
+    return _backfill_summary(backfill_id)
+
+
+# ---------------------------
+# Nightly scheduler
+# ---------------------------
+SCHEDULER_ENABLED = os.environ.get("FORTI_SCHEDULER", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _existing_raw_log(rtype: str, date_str: str):
+    path = raw_log_path(rtype, date_str)
+    return path if path.exists() else None
+
+
+nightly = scheduler.Scheduler(
+    job_manager.submit,
+    _existing_raw_log,
+    REPORT_CONFIG,
+    state_path=Path(os.environ.get("FORTI_SCHEDULER_STATE", Path(__file__).parent / "scheduler_state.json")),
+    daily_at=os.environ.get("FORTI_SCHEDULE_DAILY", "01:00"),
+    monthly_at=os.environ.get("FORTI_SCHEDULE_MONTHLY", "02:00"),
+    cutoff=os.environ.get("FORTI_SCHEDULE_CUTOFF", "23:00"),
+    interval=float(os.environ.get("FORTI_SCHEDULE_INTERVAL", 300)),
+)
+
+
+@app.get("/api/scheduler")
+async def scheduler_status():
+    return {"enabled": SCHEDULER_ENABLED, **nightly.status()}
+
+
+# ---------------------------
+# Syslog receiver
+# ---------------------------
+SYSLOG_UDP = int(os.environ.get("FORTI_SYSLOG_UDP", "0"))
+SYSLOG_TCP = int(os.environ.get("FORTI_SYSLOG_TCP", "0"))
+
+# day spools shared by the receiver and the FortiAnalyzer puller, published as raw logs once a day is over
+live_days = syslogd.LiveDays(raw_log_path, lambda rtype: BASE_DIR / REPORT_CONFIG[rtype]["folder"])
+syslog_receiver = syslogd.Receiver(live_days)
+
+
+@app.get("/api/syslog")
+async def syslog_status():
+    return {"udp": SYSLOG_UDP or None, "tcp": SYSLOG_TCP or None, **syslog_receiver.status()}
+
+
+# ---------------------------
+# FortiAnalyzer pull
+# ---------------------------
+FAZ_URL = os.environ.get("FORTI_FAZ_URL", "")
+FAZ_TYPES = [t for t in os.environ.get("FORTI_FAZ_TYPES", ",".join(fortianalyzer.LOGTYPES)).split(",") if t]
+FAZ_FETCHERS = int(os.environ.get("FORTI_FAZ_FETCHERS", fortianalyzer.FETCHERS))
+
+faz_puller = fortianalyzer.Puller(
+    fortianalyzer.Client(
+        FAZ_URL,
+        adom=os.environ.get("FORTI_FAZ_ADOM", "root"),
+        token=os.environ.get("FORTI_FAZ_TOKEN"),
+        user=os.environ.get("FORTI_FAZ_USER"),
+        password=os.environ.get("FORTI_FAZ_PASSWORD"),
+        connections=FAZ_FETCHERS * len(FAZ_TYPES),
+        verify=os.environ.get("FORTI_FAZ_INSECURE", "0").lower() in ("0", "false", "no", "off"),
+    ),
+    live_days,
+    FAZ_TYPES,
+    state_path=Path(os.environ.get("FORTI_FAZ_STATE", Path(__file__).parent / "fortianalyzer_state.json")),
+    fetchers=FAZ_FETCHERS,
+    page=int(os.environ.get("FORTI_FAZ_PAGE", fortianalyzer.PAGE)),
+    lag=float(os.environ.get("FORTI_FAZ_LAG", fortianalyzer.LAG)),
+    start=os.environ.get("FORTI_FAZ_START") or None,
+    interval=float(os.environ.get("FORTI_FAZ_INTERVAL", 60)),
+) if FAZ_URL else None
+
+
+@app.get("/api/fortianalyzer")
+async def fortianalyzer_status():
+    if faz_puller is None:
+        return {"enabled": False}
+    return {"enabled": True, **faz_puller.status()}
+
+
+# ---------------------------
+# Jobs
+# ---------------------------
+def _get_job(job_id: str) -> jobs.Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    return job
+
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = Query(100, ge=1, le=1000)):
+    return {**job_manager.stats(), "jobs": [j.to_dict() for j in job_manager.list(limit)]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+SSE_HEARTBEAT = 15
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events: ``progress`` while the job runs, then one ``complete``."""
+    job = _get_job(job_id)
+    loop = asyncio.get_running_loop()
+    q = asyncio.Queue()
+    job_manager.subscribe(job_id, loop, q)
+
+    async def stream():
+        try:
+            # current state first, so late subscribers are not left waiting
+            if job.done:
+                yield _sse("complete", job.to_dict())
+                return
+            yield _sse("progress", job.to_dict())
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(q.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event, data)
+                if event == "complete":
+                    return
+        finally:
+            job_manager.unsubscribe(job_id, q)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    _get_job(job_id)
+    return job_manager.cancel(job_id).to_dict()
+
+
+# ---------------------------
+# Profiles (generate with profile=true)
+# ---------------------------
+PROFILE_NAME_RE = re.compile(r"^generate_(daily|monthly)_\d{14}_[0-9a-f]{8}\.pstats$")
+
+
+def _profile_info(rtype: str, path: Path) -> dict:
+    st = path.stat()
+    return {
+        "type": rtype,
+        "mode": path.name.split("_")[1],
+        "name": path.name,
+        "size": st.st_size,
+        "created": st.st_mtime,
+        "url": f"/api/profiles/{rtype}/{path.name}",
+    }
+
+
+@app.get("/api/profiles")
+def list_profiles(rtype: str = Query(None), limit: int = Query(100, ge=1, le=1000)):
+    """Stored cProfile outputs, newest first."""
+    types = [rtype] if rtype else list(REPORT_CONFIG)
+    if rtype and rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    found = []
+    for t in types:
+        log_dir = BASE_DIR / REPORT_CONFIG[t]["folder"] / "error_logs"
+        if log_dir.is_dir():
+            found.extend(_profile_info(t, p) for p in log_dir.glob("generate_*.pstats"))
+    found.sort(key=lambda p: p["created"], reverse=True)
+    return {"profiles": found[:limit]}
+
+
+@app.get("/api/profiles/{rtype}/{name}")
+def get_profile(rtype: str, name: str, format: str = Query("pstats", pattern="^(pstats|text)$"),
+                sort: str = Query("cumulative"), limit: int = Query(40, ge=1, le=1000)):
+    """Download the pstats file, or ``format=text`` for the top functions as text."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    if not PROFILE_NAME_RE.match(name):
+        raise HTTPException(400, "Invalid profile name")
+    path = BASE_DIR / REPORT_CONFIG[rtype]["folder"] / "error_logs" / name
+    if not path.is_file():
+        raise HTTPException(404, "Profile not found")
+    if format == "pstats":
+        return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+    import io
+    import pstats
+    out = io.StringIO()
+    try:
+        pstats.Stats(str(path), stream=out).sort_stats(sort).print_stats(limit)
+    except KeyError:
+        raise HTTPException(400, f"Unknown sort key: {sort}")
+    return Response(out.getvalue(), media_type="text/plain; charset=utf-8")
+
+
+# ---------------------------
+# Events (queries over the event store)
+# ---------------------------
+# Widest time range one query may cover
+EVENTS_MAX_DAYS = int(os.environ.get("FORTI_EVENTS_MAX_DAYS", "92"))
+# IOC sweeps only touch Bloom filters for most days, so they may cover a year
+IOC_MAX_DAYS = 366
+IOC_MAX_VALUES = 1000
+# Time series responses: points per series
+TIMESERIES_MAX_POINTS = 20000
+TIMESERIES_MAX_DAYS = 366
+STEP_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def _parse_when(value: str, name: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value.replace("_", "-"))
+    except ValueError:
+        raise HTTPException(400, f"{name} must be YYYY-MM-DD or YYYY-MM-DDTHH:MM[:SS]")
+
+
+def _event_range(start: str, end: str, max_days: int = None) -> tuple:
+    since = _parse_when(start, "start")
+    until = _parse_when(end, "end") if end else since + timedelta(days=1)
+    if until <= since:
+        raise HTTPException(400, "end must be after start")
+    max_days = max_days or EVENTS_MAX_DAYS
+    if (until - since).days > max_days:
+        raise HTTPException(400, f"Range too long (limit {max_days} days)")
+    return since, until
+
+
+def _range_back(start: str, end: str, days: int, max_days: int = None) -> tuple:
+    """Like ``_event_range``; without ``start``, the ``days`` before ``end`` (default start of tomorrow)."""
+    if start:
+        return _event_range(start, end, max_days)
+    until = _parse_when(end, "end") if end else datetime.combine(datetime.now().date() + timedelta(days=1),
+                                                                 datetime.min.time())
+    return _event_range((until - timedelta(days=days)).isoformat(), until.isoformat(), max_days)
+
+
+@app.get("/api/events/{rtype}")
+def query_events(
+    rtype: str,
+    start: str = Query(..., description="YYYY-MM-DD or YYYY-MM-DDTHH:MM[:SS], inclusive"),
+    end: str = Query(None, description="exclusive; default start + 1 day"),
+    srcip: str = Query(None),
+    dstip: str = Query(None),
+    action: str = Query(None),
+    category: str = Query(None),
+    app_name: str = Query(None, alias="app"),
+    attack: str = Query(None),
+    severity: str = Query(None),
+    hostname: str = Query(None),
+    qname: str = Query(None),
+    virus: str = Query(None),
+    device: str = Query(None, description="one FortiGate (devname, else devid)"),
+    vdom: str = Query(None),
+    limit: int = Query(100, ge=1, le=5000),
+    cursor: str = Query(None, description="'next' from the previous page"),
+):
+    """Stored events of one type in a time range, oldest first, with exact-match filters."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    since, until = _event_range(start, end)
+
+    given = {"srcip": srcip, "dstip": dstip, "action": action, "category": category, "app": app_name,
+             "attack": attack, "severity": severity, "hostname": hostname, "qname": qname, "virus": virus}
+    columns = eventstore.filter_columns(rtype)
+    unsupported = [name for name, value in given.items() if value is not None and name not in columns]
+    if unsupported:
+        raise HTTPException(400, f"Not a {rtype} filter: {', '.join(unsupported)} (use {', '.join(columns)})")
+    filters = {columns[name]: value for name, value in given.items() if value is not None}
+
+    folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"]
+    started = time.perf_counter()
+    try:
+        result = eventstore.search(folder, rtype, since, until, filters, limit, cursor, device=device, vdom=vdom)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    result["took_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+@app.get("/api/search/{rtype}")
+def search_events(
+    rtype: str,
+    q: str = Query(..., min_length=1, max_length=256, description="substring, case-insensitive"),
+    start: str = Query(..., description="YYYY-MM-DD or YYYY-MM-DDTHH:MM[:SS], inclusive"),
+    end: str = Query(None, description="exclusive; default start + 1 day"),
+    field: str = Query(None, description="one searchable field (default: all of them)"),
+    device: str = Query(None, description="one FortiGate (devname, else devid)"),
+    vdom: str = Query(None),
+    limit: int = Query(100, ge=1, le=5000),
+    cursor: str = Query(None, description="'next' from the previous page"),
+):
+    """Stored events whose URL / qname / filename contains ``q``, with hits per day on the first page."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    fields = eventstore.SEARCH_FIELDS.get(rtype)
+    if not fields:
+        raise HTTPException(400, f"No searchable fields for {rtype}")
+    if field:
+        if field not in fields:
+            raise HTTPException(400, f"Not a searchable {rtype} field: {field} (use {', '.join(fields)})")
+        fields = (field,)
+    since, until = _event_range(start, end)
+
+    folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"]
+    started = time.perf_counter()
+    try:
+        result = eventstore.search(folder, rtype, since, until, None, limit, cursor, text=q, fields=fields,
+                                   device=device, vdom=vdom)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    result["took_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+@app.get("/api/hosts/{ip}")
+def host_activity(
+    ip: str,
+    start: str = Query(None, description="YYYY-MM-DD[THH:MM], inclusive; default 30 days before end"),
+    end: str = Query(None, description="exclusive; default start of tomorrow"),
+    types: str = Query(None, description="comma separated report types (default: all)"),
+    bucket: str = Query("day", pattern="^(hour|day)$"),
+):
+    """One source IP across every report type: totals and a timeline, from the per-day IP rollups."""
+    import ipaddress
+    try:
+        ip = str(ipaddress.ip_address(ip))
+    except ValueError:
+        raise HTTPException(400, f"Invalid IP address: {ip}")
+    wanted = types.split(",") if types else list(REPORT_CONFIG)
+    unknown = [t for t in wanted if t not in REPORT_CONFIG]
+    if unknown:
+        raise HTTPException(404, f"Invalid report type: {', '.join(unknown)}")
+    since, until = _range_back(start, end, 30)
+
+    started = time.perf_counter()
+    width = 3600 if bucket == "hour" else 86400
+    totals, timeline = {}, {}
+    for rtype in wanted:
+        hours = eventstore.host_hours(BASE_DIR / REPORT_CONFIG[rtype]["folder"], rtype, ip, since, until)
+        if not hours:
+            continue
+        totals[rtype] = {
+            "events": sum(h[1] for h in hours),
+            "notable": sum(h[2] for h in hours),
+            "first_seen": datetime.utcfromtimestamp(min(h[3] for h in hours)).isoformat(),
+            "last_seen": datetime.utcfromtimestamp(max(h[4] for h in hours)).isoformat(),
+        }
+        for hour, events, notable, _, _ in hours:
+            slot = timeline.setdefault((hour - hour % width, rtype), [0, 0])
+            slot[0] += events
+            slot[1] += notable
+    return {
+        "ip": ip,
+        "start": since.isoformat(),
+        "end": until.isoformat(),
+        "totals": totals,
+        "timeline": [{"time": datetime.utcfromtimestamp(t).isoformat(), "type": rtype, "events": n, "notable": k}
+                     for (t, rtype), (n, k) in sorted(timeline.items())],
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _parse_step(step: str) -> int:
+    match = re.fullmatch(r"(\d+)([mhd]?)", step.strip().lower())
+    seconds = int(match.group(1)) * STEP_UNITS.get(match.group(2), 1) if match else 0
+    if seconds < 60 or seconds % 60:
+        raise HTTPException(400, "step must be whole minutes: 60, 5m, 1h, 1d ...")
+    return seconds
+
+
+@app.get("/api/devices")
+def list_devices(
+    start: str = Query(None, description="YYYY-MM-DD, inclusive; default 30 days before end"),
+    end: str = Query(None, description="exclusive; default start of tomorrow"),
+    types: str = Query(None, description="comma separated report types (default: all)"),
+):
+    """FortiGates and VDOMs in the event store: days seen and events per type."""
+    wanted = types.split(",") if types else list(REPORT_CONFIG)
+    unknown = [t for t in wanted if t not in REPORT_CONFIG]
+    if unknown:
+        raise HTTPException(404, f"Invalid report type: {', '.join(unknown)}")
+    since, until = _range_back(start, end, 30, TIMESERIES_MAX_DAYS)
+
+    found = {}
+    for rtype in wanted:
+        for row in eventstore.devices(BASE_DIR / REPORT_CONFIG[rtype]["folder"], since, until):
+            entry = found.setdefault((row["device"] or "", row["vdom"] or ""), {
+                "device": row["device"], "vdom": row["vdom"], "first_day": row["day"], "last_day": row["day"],
+                "events": {}, "sources": set()})
+            entry["first_day"] = min(entry["first_day"], row["day"])
+            entry["last_day"] = max(entry["last_day"], row["day"])
+            entry["events"][rtype] = entry["events"].get(rtype, 0) + row["events"]
+            if row["source"]:
+                entry["sources"].add(row["source"])
+    return {
+        "start": since.isoformat(),
+        "end": until.isoformat(),
+        "devices": [{**entry, "sources": sorted(entry["sources"])} for _, entry in sorted(found.items())],
+    }
+
+
+@app.get("/api/timeseries/{rtype}")
+def get_timeseries(
+    rtype: str,
+    start: str = Query(None, description="YYYY-MM-DD[THH:MM], inclusive; default 1 day before end"),
+    end: str = Query(None, description="exclusive; default start of tomorrow"),
+    step: str = Query("1h", description="bucket width: seconds or 5m / 1h / 1d"),
+    split: str = Query("total"),
+):
+    """Event counts per ``step`` over a range, from the per-minute arrays stored with each day."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    if split not in eventstore.series_splits(rtype):
+        raise HTTPException(400, f"Unknown split for {rtype}: {split} (use {', '.join(eventstore.series_splits(rtype))})")
+    seconds = _parse_step(step)
+    since, until = _range_back(start, end, 1, TIMESERIES_MAX_DAYS)
+    if since.second or since.microsecond:
+        raise HTTPException(400, "start must be a whole minute")
+    if (until - since).total_seconds() / seconds > TIMESERIES_MAX_POINTS:
+        raise HTTPException(400, f"Too many points (limit {TIMESERIES_MAX_POINTS}); use a larger step")
+
+    started = time.perf_counter()
+    result = eventstore.timeseries(BASE_DIR / REPORT_CONFIG[rtype]["folder"], rtype, split, since, until, seconds)
+    series = sorted(({"key": key, "total": sum(points), "points": points} for key, points in result["series"].items()),
+                    key=lambda s: s["total"], reverse=True)
+    return {
+        "start": since.isoformat(),
+        "end": until.isoformat(),
+        "step": seconds,
+        "split": split,
+        "points": result["points"],
+        "days": result["days"],
+        "series": series,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+@app.get("/api/ioc")
+def ioc_sweep(
+    value: List[str] = Query(..., description="IPs, domains, attack or malware names; repeat for several"),
+    start: str = Query(None, description="YYYY-MM-DD, inclusive; default 365 days before end"),
+    end: str = Query(None, description="exclusive; default start of tomorrow"),
+    types: str = Query(None, description="comma separated report types (default: all)"),
+):
+    """Which days and types saw each indicator, via the per-day Bloom filters."""
+    values = list(dict.fromkeys(v.strip() for v in value if v.strip()))
+    if not values:
+        raise HTTPException(400, "No indicator given")
+    if len(values) > IOC_MAX_VALUES:
+        raise HTTPException(400, f"Too many indicators (limit {IOC_MAX_VALUES})")
+    wanted = types.split(",") if types else list(REPORT_CONFIG)
+    unknown = [t for t in wanted if t not in REPORT_CONFIG]
+    if unknown:
+        raise HTTPException(404, f"Invalid report type: {', '.join(unknown)}")
+    since, until = _range_back(start, end, 365, IOC_MAX_DAYS)
+
+    started = time.perf_counter()
+    found = {v: [] for v in values}
+    stats = {"days": 0, "candidates": 0, "false_positives": 0, "bloom_ms": 0.0}
+    for rtype in wanted:
+        result = eventstore.sweep(BASE_DIR / REPORT_CONFIG[rtype]["folder"], rtype, values, since, until)
+        for hit in result.pop("hits"):
+            found[hit.pop("value")].append({"type": rtype, **hit})
+        for key in stats:
+            stats[key] += result[key]
+    return {
+        "start": since.isoformat(),
+        "end": until.isoformat(),
+        "indicators": [{"value": v, "seen": bool(hits), "days": len({h["day"] for h in hits}),
+                        "hits": hits} for v, hits in found.items()],
+        **stats,
+        "bloom_ms": round(stats["bloom_ms"], 3),
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# ---------------------------
+# Report data (the aggregates behind each report, as JSON)
+# ---------------------------
+REPORT_DATA_MAX_TOP = 100
+# bodies kept, least recently used dropped first (the key takes any top / device / vdom)
+REPORT_DATA_CACHE_SIZE = int(os.environ.get("FORTI_REPORT_DATA_CACHE", "256"))
+# (rtype, period, date, top, device, vdom) -> (etag, body)
+_report_data_cache = OrderedDict()
+_report_data_lock = threading.Lock()
+
+
+def _report_data(request: Request, key: tuple, paths: list, build) -> Response:
+    stats = [p.stat() for p in paths]
+    fingerprint = repr((key, [(p.name, st.st_mtime_ns, st.st_size) for p, st in zip(paths, stats)]))
+    etag = f'"{hashlib.blake2b(fingerprint.encode(), digest_size=12).hexdigest()}"'
+    mtime = max(st.st_mtime for st in stats)
+    headers = {"ETag": etag, "Last-Modified": storage.http_date(mtime), "Cache-Control": "no-cache"}
+    if storage.not_modified(request.headers, etag, mtime):
+        metrics.cache_lookup("http_revalidation", True)
+        return Response(status_code=304, headers=headers)
+
+    with _report_data_lock:
+        cached = _report_data_cache.get(key)
+        if cached and cached[0] == etag:
+            _report_data_cache.move_to_end(key)
+    metrics.cache_lookup("report_data", bool(cached and cached[0] == etag))
+    if cached and cached[0] == etag:
+        body = cached[1]
+    else:
+        body = json.dumps(build(), separators=(",", ":")).encode()
+        with _report_data_lock:
+            _report_data_cache[key] = (etag, body)
+            _report_data_cache.move_to_end(key)
+            while len(_report_data_cache) > REPORT_DATA_CACHE_SIZE:
+                _report_data_cache.popitem(last=False)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/reports/{rtype}/daily/{date}/data")
+def daily_report_data(rtype: str, date: str, request: Request,
+                      top: int = Query(aggregate.TABLE_TOP, ge=1, le=REPORT_DATA_MAX_TOP),
+                      device: str = Query(None), vdom: str = Query(None)):
+    """Totals, top-N tables, pie slices and hourly counts of a daily report (fleet, or one device / VDOM)."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    ymd = re.sub(r"[-_]", "", date)
+    if not re.fullmatch(r"\d{8}", ymd):
+        raise HTTPException(400, "date must be YYYY-MM-DD")
+    path = aggregate.current(BASE_DIR / REPORT_CONFIG[rtype]["folder"], rtype, ymd, device, vdom)
+    if path is None:
+        raise HTTPException(404, f"No data for {rtype} on {date}")
+
+    def build():
+        return {"period": "daily", "date": f"{ymd[:4]}-{ymd[4:6]}-{ymd[6:]}", "device": device, "vdom": vdom,
+                **aggregate.compact(aggregate.load(path), top)}
+
+    return _report_data(request, (rtype, "daily", ymd, top, device, vdom), [path], build)
+
+
+@app.get("/api/reports/{rtype}/monthly/{month}/data")
+def monthly_report_data(rtype: str, month: str, request: Request,
+                        top: int = Query(aggregate.TABLE_TOP, ge=1, le=REPORT_DATA_MAX_TOP),
+                        device: str = Query(None), vdom: str = Query(None)):
+    """The month's days summed, plus total and notable counts per day."""
+    if rtype not in REPORT_CONFIG:
+        raise HTTPException(404, "Invalid report type")
+    yyyymm = re.sub(r"[-_]", "", month)
+    if not re.fullmatch(r"\d{6}", yyyymm):
+        raise HTTPException(400, "month must be YYYY-MM")
+    folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"]
+    days = [(ymd, aggregate.current(folder, rtype, ymd, device, vdom)) for ymd in aggregate.month_days(folder, yyyymm)]
+    days = [(ymd, path) for ymd, path in days if path is not None]
+    if not days:
+        raise HTTPException(404, f"No data for {rtype} in {month}")
+
+    def build():
+        results = [aggregate.load(path) for _, path in days]
+        return {
+            "period": "monthly",
+            "month": f"{yyyymm[:4]}-{yyyymm[4:]}",
+            "device": device,
+            "vdom": vdom,
+            **aggregate.compact(aggregate.merge(rtype, results), top),
+            "days": [f"{ymd[:4]}-{ymd[4:6]}-{ymd[6:]}" for ymd, _ in days],
+            "daily_total": [r["total"] for r in results],
+            "daily_notable": [r["notable"] for r in results],
+        }
+
+    return _report_data(request, (rtype, "monthly", yyyymm, top, device, vdom), [path for _, path in days], build)
 
 
 @app.get("/api/check_raw/{rtype}")
@@ -287,20 +1391,13 @@ async def check_raw_log(rtype: str, date: str = Query(..., description="Date in
     if rtype not in REPORT_CONFIG:
         raise HTTPException(404, "Invalid report type")
 
-    folder = BASE_DIR / REPORT_CONFIG[rtype]["folder"] / "Raw Logs"
     # expected filename: disk-<rtype>-YYYY_MM_DD.log
-    prefix_map = {
-        "appctrl": "disk-appctrl-",
-        "webfilter": "disk-webfilter-",
-        "ips": "disk-ips-",
-        "dns": "disk-dns-",
-        "antivirus": "disk-antivirus-",
-    }
-    prefix = prefix_map.get(rtype, "disk-")
-    fname = f"{prefix}{date}.log"
-    file_path = folder / fname
+    file_path = raw_log_path(rtype, date)
     return {"exists": file_path.exists()}
 
+_loop_monitor = None
+
+
 @app.on_event("startup")
 async def startup():
     print("\n" + "="*80)
@@ -310,6 +1407,38 @@ async def startup():
         daily = BASE_DIR / cfg["folder"] / "daily_reports"
         monthly = BASE_DIR / cfg["folder"] / "monthly_reports"
         print(f"{rtype.upper():8} → {'OK' if daily.exists() else 'MISSING'} | {'OK' if monthly.exists() else 'MISSING'}")
+    worker_pool.start()
+    job_manager.start()
+    threading.Thread(target=_precompress_all, daemon=True).start()
+    for rtype in REPORT_CONFIG:
+        uploads.purge_stale(raw_log_dir(rtype))
+    global _loop_monitor
+    _loop_monitor = asyncio.get_running_loop().create_task(metrics.monitor_event_loop())
+    if SCHEDULER_ENABLED:
+        nightly.start()
+        print(f"Scheduler: dailies from {nightly.daily_at:%H:%M}, monthlies on the 1st from {nightly.monthly_at:%H:%M}")
+    # spools of days that ended while the server was down
+    threading.Thread(target=live_days.tick, daemon=True).start()
+    if SYSLOG_UDP or SYSLOG_TCP:
+        await syslog_receiver.start(udp=SYSLOG_UDP, tcp=SYSLOG_TCP,
+                                    host=os.environ.get("FORTI_SYSLOG_HOST", "0.0.0.0"))
+        print(f"Syslog: udp={SYSLOG_UDP or '-'} tcp={SYSLOG_TCP or '-'}")
+    if faz_puller is not None:
+        faz_puller.start()
+        print(f"FortiAnalyzer: pulling {', '.join(FAZ_TYPES)} every {faz_puller.interval:.0f}s")
     print("API: http://127.0.0.1:8000")
     print("Frontend: http://127.0.0.1:5173")
-    print("="*80 + "\n")
\ No newline at end of file
+    print("="*80 + "\n")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _loop_monitor is not None:
+        _loop_monitor.cancel()
+    await syslog_receiver.stop()
+    if faz_puller is not None:
+        await faz_puller.stop()
+    await run_in_threadpool(live_days.close)
+    nightly.stop()
+    job_manager.shutdown()
+    worker_pool.shutdown()
@@ -0,0 +1,253 @@
+"""
+Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+Counters, gauges and histograms with labels, kept in-process and rendered
+by ``GET /metrics`` for a local scrape. Small on purpose: no client
+library or push gateway needed.
+"""
+
+import asyncio
+import math
+import threading
+import time
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DURATION_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1200)
+RATE_BUCKETS = (1e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5, 5e5, 1e6)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _fmt(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """A gauge set directly or, with ``func``, read at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=(), func=None):
+        super().__init__(name, help, labels)
+        self.func = func
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        if self.func is not None:
+            try:
+                value = self.func()
+            except Exception:
+                return []
+            items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=HTTP_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _fmt(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "forti_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result"))
+
+
+def _hit_ratios():
+    totals = {}
+    with CACHE_REQUESTS._lock:
+        for (cache, result), n in CACHE_REQUESTS._values.items():
+            hits, count = totals.get((cache,), (0, 0))
+            totals[(cache,)] = (hits + (n if result == "hit" else 0), count + n)
+    return {key: hits / count for key, (hits, count) in totals.items() if count}
+
+
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "forti_cache_hit_ratio", "Hits / lookups since start, per cache.", ("cache",), func=_hit_ratios)
+LOOP_LAG = REGISTRY.histogram(
+    "forti_event_loop_lag_seconds", "How late the event loop woke a sleeping task.", buckets=LAG_BUCKETS)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "forti_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "forti_http_request_duration_seconds", "Time to serve a request (event streams: time to first byte).",
+    ("method", "route"))
+
+GENERATION_JOBS = REGISTRY.counter(
+    "forti_generation_jobs_total", "Finished generation jobs by outcome.", ("rtype", "mode", "status"))
+GENERATION_SECONDS = REGISTRY.histogram(
+    "forti_generation_duration_seconds", "Generation wall time.", ("rtype", "mode"), buckets=DURATION_BUCKETS)
+GENERATION_LINES = REGISTRY.counter(
+    "forti_generation_lines_total", "Raw log lines read by generators.", ("rtype", "mode"))
+GENERATION_RATE = REGISTRY.histogram(
+    "forti_generation_lines_per_second", "Raw log lines read per second of generation wall time.",
+    ("rtype", "mode"), buckets=RATE_BUCKETS)
+GENERATION_STAGE_SECONDS = REGISTRY.histogram(
+    "forti_generation_stage_seconds", "Wall time of each generator stage (successful jobs).",
+    ("rtype", "mode", "stage"), buckets=STAGE_BUCKETS)
+
+SYSLOG_MESSAGES = REGISTRY.counter(
+    "forti_syslog_messages_total", "Syslog messages by transport and outcome (stored/late/ignored/dropped/oversize).",
+    ("transport", "outcome"))
+SYSLOG_BATCH_SECONDS = REGISTRY.histogram(
+    "forti_syslog_batch_seconds", "Time to parse, route and append one batch of syslog messages.",
+    buckets=LAG_BUCKETS)
+FORTIANALYZER_LOGS = REGISTRY.counter(
+    "forti_fortianalyzer_logs_total", "Log records pulled from FortiAnalyzer.", ("rtype",))
+FORTIANALYZER_REQUEST_SECONDS = REGISTRY.histogram(
+    "forti_fortianalyzer_request_seconds", "FortiAnalyzer JSON-RPC round trips.", ("method",),
+    buckets=HTTP_BUCKETS)
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Sample event-loop lag forever: a blocked loop wakes this task late."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+class RequestMetrics:
+    """ASGI middleware recording per-route request counts and latency."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        state = {"status": 500, "observed": False}
+
+        def observe():
+            state["observed"] = True
+            # the route template keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=scope["method"], route=route)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=state["status"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                content_type = dict(message.get("headers", ())).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not state["observed"]:
+                observe()
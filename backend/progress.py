@@ -0,0 +1,228 @@
+"""
+Progress reporting for the generator scripts.
+
+Generators call ``stage()`` when they move on to a new step and read their
+raw log through ``read_lines()``, which counts bytes and lines as it goes
+(monthlies walk their daily reports with ``iterate()``).
+When a generator runs inside an API worker process, the worker installs a
+sink that forwards these updates to the job (and on to SSE subscribers).
+Run by hand there is no sink and reporting costs next to nothing.
+
+Each ``stage()`` call also closes the previous stage's timer, and
+``finish()`` returns the per-stage record (wall seconds, peak and final
+RSS) that the API stores with the job. Peak RSS comes from the kernel's
+high-water mark, reset at every stage boundary (Linux); elsewhere it is
+sampled while reading, or left out when the platform has no /proc.
+"""
+
+import os
+import time
+
+# minimum seconds between forwarded updates while reading
+UPDATE_INTERVAL = 0.5
+
+# one in this many lines of a raw log is timed to split reading from parsing
+READ_SAMPLE = 256
+
+_sink = None
+_state = {}
+_last_emit = 0.0
+_timings = []
+_current = None
+_hwm_resets = None  # whether /proc/self/clear_refs accepts a high-water reset
+
+
+def set_sink(sink):
+    """Install ``sink(dict)`` for this process (None disables reporting)."""
+    global _sink
+    _sink = sink
+    reset()
+
+
+def reset():
+    global _last_emit, _current
+    _state.clear()
+    _state.update({"stage": None, "bytes_read": 0, "total_bytes": None, "lines": 0,
+                   "percent": None, "eta": None, "started": time.time()})
+    _last_emit = 0.0
+    _timings.clear()
+    _current = None
+
+
+# -- memory ----------------------------------------------------------------------
+def _rss() -> int:
+    """Current resident set size in bytes, or None without /proc."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _high_water() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_high_water() -> bool:
+    global _hwm_resets
+    if _hwm_resets is False:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        _hwm_resets = True
+    except OSError:
+        _hwm_resets = False
+    return _hwm_resets
+
+
+def _sample_rss():
+    # without a resettable high-water mark, keep the largest sample seen
+    if _current is not None and not _current["hwm"]:
+        rss = _rss()
+        if rss is not None and rss > (_current["peak_rss"] or 0):
+            _current["peak_rss"] = rss
+
+
+# -- stage timings -----------------------------------------------------------------
+def _close_stage():
+    global _current
+    if _current is None:
+        return
+    seconds = time.perf_counter() - _current["t0"]
+    rss = _rss()
+    peak = _high_water() if _current["hwm"] else _current["peak_rss"]
+    if rss is not None:
+        peak = max(peak or 0, rss)
+    record = {"stage": _current["stage"], "seconds": round(seconds, 4), "peak_rss": peak, "rss": rss}
+    io, work = _current["io"], _current["work"]
+    if io + work > 0:
+        # estimated from the sampled lines: the rest of the stage is parsing
+        record["read_seconds"] = round(seconds * io / (io + work), 4)
+    _timings.append(record)
+    _current = None
+
+
+def _open_stage(name: str):
+    global _current
+    hwm = _reset_high_water()
+    _current = {"stage": name, "t0": time.perf_counter(), "hwm": hwm, "peak_rss": _rss(),
+                "io": 0.0, "work": 0.0}
+
+
+def finish() -> dict:
+    """Close the running stage and return the timings recorded since ``reset()``."""
+    _close_stage()
+    peaks = [t["peak_rss"] for t in _timings if t["peak_rss"] is not None]
+    return {
+        "stages": list(_timings),
+        "seconds": round(sum(t["seconds"] for t in _timings), 4),
+        "peak_rss": max(peaks) if peaks else None,
+        "rss_source": "high-water" if _hwm_resets else ("sampled" if peaks else None),
+    }
+
+
+def snapshot() -> dict:
+    return dict(_state)
+
+
+def _emit(force: bool = False):
+    global _last_emit
+    if _sink is None:
+        return
+    now = time.monotonic()
+    if not force and now - _last_emit < UPDATE_INTERVAL:
+        return
+    _last_emit = now
+    try:
+        _sink(snapshot())
+    except Exception:
+        pass  # never let reporting break a report
+
+
+def stage(name: str, **info):
+    """Mark the start of a named step (read, parse, dataframe, render, write...)."""
+    _close_stage()
+    _open_stage(name)
+    _state["stage"] = name
+    _state.update(info)
+    _emit(force=True)
+
+
+def update(**info):
+    _state.update(info)
+    _emit()
+
+
+def read_lines(path, encoding: str = "utf-8"):
+    """Yield decoded lines of ``path`` while tracking bytes, lines, percent and ETA."""
+    total = path.stat().st_size
+    _state.update({"bytes_read": 0, "total_bytes": total, "lines": 0})
+    started = time.monotonic()
+    read = 0
+    lines = 0
+    io = work = 0.0
+    clock = time.perf_counter
+    with open(path, "rb") as fh:
+        readline = fh.readline
+        while True:
+            sampled = lines % READ_SAMPLE == 0
+            if sampled:
+                t0 = clock()
+            raw = readline()
+            if not raw:
+                break
+            read += len(raw)
+            lines += 1
+            line = raw.decode(encoding, errors="ignore")
+            if sampled:
+                t1 = clock()
+                io += t1 - t0
+                yield line
+                work += clock() - t1
+            else:
+                yield line
+            if lines & 0x3FF == 0:  # every 1024 lines
+                _sample_rss()
+                elapsed = time.monotonic() - started
+                rate = read / elapsed if elapsed > 0 else 0
+                _state.update({
+                    "bytes_read": read,
+                    "lines": lines,
+                    "percent": round(100.0 * read / total, 1) if total else None,
+                    "eta": round((total - read) / rate, 1) if rate else None,
+                })
+                _emit()
+    if _current is not None:
+        _current["io"] += io
+        _current["work"] += work
+    _state.update({"bytes_read": read, "lines": lines, "percent": 100.0 if total else None, "eta": 0})
+    _emit(force=True)
+
+
+def iterate(items):
+    """Yield from ``items`` while tracking how many are done (monthly reports walk daily files)."""
+    items = list(items)
+    total = len(items)
+    started = time.monotonic()
+    _state.update({"done": 0, "total": total})
+    for i, item in enumerate(items, 1):
+        yield item
+        _sample_rss()
+        elapsed = time.monotonic() - started
+        _state.update({
+            "done": i,
+            "percent": round(100.0 * i / total, 1),
+            "eta": round(elapsed / i * (total - i), 1),
+        })
+        _emit(force=i == total)
+
+
+reset()
@@ -0,0 +1,145 @@
+"""
+In-process nightly scheduler.
+
+Once a day, after ``daily_at``, each report type's daily job for yesterday
+is queued as soon as that day's raw log is in place (logs are renamed into
+``Raw Logs`` only when complete, so existence is enough). On the 1st, after
+``monthly_at``, last month's monthlies are queued behind the last daily of
+the month. Types still without a log at ``cutoff`` are given up on for the
+day; a later upload with ``generate=true`` or a backfill covers them.
+
+What has been queued is persisted, so a restart neither repeats nor skips
+the night's work.
+"""
+
+import asyncio
+import json
+import os
+import traceback
+from datetime import datetime, time as dtime, timedelta
+from pathlib import Path
+
+import jobs
+
+
+def parse_time(value: str) -> dtime:
+    return datetime.strptime(value.strip(), "%H:%M").time()
+
+
+class Scheduler:
+    """``submit(mode, rtype, date, priority=..., depends_on=...)`` queues a job
+    (JobManager.submit); ``raw_log_for(rtype, date_str)`` returns the raw log
+    path for a YYYY_MM_DD day or None when there is none yet."""
+
+    def __init__(self, submit, raw_log_for, rtypes, state_path: Path,
+                 daily_at: str = "01:00", monthly_at: str = "02:00", cutoff: str = "23:00",
+                 interval: float = 300):
+        self.submit = submit
+        self.raw_log_for = raw_log_for
+        self.rtypes = list(rtypes)
+        self.state_path = Path(state_path)
+        self.daily_at = parse_time(daily_at)
+        self.monthly_at = parse_time(monthly_at)
+        self.cutoff = parse_time(cutoff)
+        self.interval = interval
+        self.state = self._load()
+        self._daily_jobs = {}  # (rtype, date) -> job queued by this process
+        self._task = None
+
+    # -- state -----------------------------------------------------------------
+    def _load(self) -> dict:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("daily", {})
+        state.setdefault("monthly", {})
+        state.setdefault("skipped", {})
+        return state
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def status(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "daily_at": self.daily_at.strftime("%H:%M"),
+            "monthly_at": self.monthly_at.strftime("%H:%M"),
+            "cutoff": self.cutoff.strftime("%H:%M"),
+            "interval": self.interval,
+            **self.state,
+        }
+
+    # -- scheduling --------------------------------------------------------------
+    def tick(self, now: datetime = None) -> list:
+        """Queue whatever is due at ``now``; returns the jobs submitted."""
+        now = now or datetime.now()
+        submitted = []
+        changed = False
+        yesterday = (now - timedelta(days=1)).strftime("%Y_%m_%d")
+        past_cutoff = now.time() >= self.cutoff
+
+        try:
+            if now.time() >= self.daily_at:
+                due = [t for t in self.rtypes
+                       if self.state["daily"].get(t) != yesterday and self.state["skipped"].get(t) != yesterday]
+                ready = []
+                for rtype in due:
+                    path = self.raw_log_for(rtype, yesterday)
+                    if path is not None:
+                        ready.append((path.stat().st_size, rtype))
+                    elif past_cutoff:
+                        print(f"Scheduler: no {rtype} raw log for {yesterday} by {self.cutoff:%H:%M}, skipping")
+                        self.state["skipped"][rtype] = yesterday
+                        changed = True
+                # largest logs first, so the long jobs start early and the types finish together
+                for _, rtype in sorted(ready, reverse=True):
+                    job, _ = self.submit("daily", rtype, yesterday, priority=jobs.SCHEDULED)
+                    self._daily_jobs[(rtype, yesterday)] = job
+                    self.state["daily"][rtype] = yesterday
+                    submitted.append(job)
+
+            if now.day == 1 and now.time() >= self.monthly_at:
+                month = (now - timedelta(days=1)).strftime("%Y%m")
+                for rtype in self.rtypes:
+                    if self.state["monthly"].get(rtype) == month:
+                        continue
+                    # wait for the month's last daily unless it has been given up on
+                    last_daily = self._daily_jobs.get((rtype, yesterday))
+                    if last_daily is None and self.state["daily"].get(rtype) != yesterday \
+                            and self.state["skipped"].get(rtype) != yesterday:
+                        continue
+                    job, _ = self.submit("monthly", rtype, month, priority=jobs.SCHEDULED,
+                                         depends_on=[last_daily] if last_daily else ())
+                    self.state["monthly"][rtype] = month
+                    submitted.append(job)
+        finally:
+            # also when the queue fills mid-way: what was queued so far must not be queued again
+            if submitted or changed:
+                self._save()
+        for job in submitted:
+            print(f"Scheduler: queued {job.mode} {job.rtype} {job.date}")
+        return submitted
+
+    async def run(self):
+        while True:
+            try:
+                self.tick()
+            except jobs.QueueFull as e:
+                # whatever was queued so far is recorded; the rest goes in on a later tick
+                print(f"Scheduler: {e}")
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,190 @@
+"""
+File helpers — precompressed report variants, HTTP cache validators and
+atomic streaming writes for raw log uploads.
+
+Generated HTML reports are written once and served many times, so gzip /
+brotli variants are produced when a report is generated (never per request)
+and picked by content negotiation in ``serve_file``.
+"""
+
+import gzip
+import hashlib
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+# (content-coding, file suffix) in server preference order
+VARIANTS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def available_encodings():
+    return [enc for enc, _ in VARIANTS if enc != "br" or brotli is not None]
+
+
+def variant_path(path: Path, encoding: str) -> Path:
+    suffix = dict(VARIANTS)[encoding]
+    return path.with_name(path.name + suffix)
+
+
+def is_fresh(path: Path, variant: Path) -> bool:
+    """A variant is only valid if it was produced from the current source file."""
+    try:
+        return variant.stat().st_mtime_ns == path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def write_variants(path: Path) -> list:
+    """Write .br/.gz siblings for ``path`` if they are missing or stale."""
+    written = []
+    data = None
+    st = path.stat()
+    for encoding in available_encodings():
+        target = variant_path(path, encoding)
+        if is_fresh(path, target):
+            continue
+        if data is None:
+            data = path.read_bytes()
+        compressed = _compress(data, encoding)
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_bytes(compressed)
+        # stamp the variant with the source mtime so staleness is detectable
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+        written.append(target)
+    return written
+
+
+def precompress_folder(folder: Path, since: float = None) -> int:
+    """Precompress every ``*.html`` in ``folder`` (optionally only files modified after ``since``)."""
+    if not folder.exists():
+        return 0
+    count = 0
+    for file in folder.glob("*.html"):
+        try:
+            if since is not None and file.stat().st_mtime < since:
+                continue
+            if write_variants(file):
+                count += 1
+        except OSError as e:
+            print(f"Precompress failed for {file.name}: {e}")
+    return count
+
+
+def negotiate(path: Path, accept_encoding: str):
+    """Return (file_to_send, content_encoding or None) for an Accept-Encoding header."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    for encoding, _ in VARIANTS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q <= 0:
+            continue
+        candidate = variant_path(path, encoding)
+        if is_fresh(path, candidate):
+            return candidate, encoding
+    return path, None
+
+
+def version_token(st: os.stat_result) -> str:
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def etag(st: os.stat_result, encoding: str = None) -> str:
+    # Strong validator per representation: identity, br and gzip bytes differ.
+    token = version_token(st)
+    return f'"{token}-{encoding}"' if encoding else f'"{token}"'
+
+
+def http_date(ts: float) -> str:
+    return formatdate(ts, usegmt=True)
+
+
+def not_modified(headers, current_etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (RFC 9110 precedence)."""
+    inm = headers.get("if-none-match")
+    if inm is not None:
+        if inm.strip() == "*":
+            return True
+        tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+        return current_etag in tags
+    ims = headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# ---------------------------
+# Streaming uploads
+# ---------------------------
+class UploadTooLarge(Exception):
+    pass
+
+
+class AtomicUpload:
+    """Stream bytes into a temp file next to ``dest``; hash and count lines on the fly.
+
+    ``commit()`` renames the temp file over ``dest`` in one step, so readers of
+    ``Raw Logs`` see either the previous file or the complete new one.
+    """
+
+    def __init__(self, dest: Path, max_bytes: int = 0):
+        self.dest = dest
+        self.max_bytes = max_bytes
+        # no date in the temp name: the generators' fallback lookup matches on it
+        self.tmp = dest.with_name(f".upload-{uuid.uuid4().hex}.part")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.lines = 0
+        self._last = b""
+        self._fh = open(self.tmp, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            self.abort()
+            raise UploadTooLarge(f"upload exceeds {self.max_bytes} bytes")
+        self.sha256.update(chunk)
+        self.lines += chunk.count(b"\n")
+        self._last = chunk[-1:] or self._last
+        self._fh.write(chunk)
+
+    def commit(self) -> dict:
+        if self._last and self._last != b"\n":
+            self.lines += 1  # final line without trailing newline
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+        os.replace(self.tmp, self.dest)
+        return {"bytes": self.size, "lines": self.lines, "sha256": self.sha256.hexdigest()}
+
+    def abort(self):
+        if not self._fh.closed:
+            self._fh.close()
+        self.tmp.unlink(missing_ok=True)
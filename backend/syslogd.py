@@ -0,0 +1,612 @@
+"""
+Syslog receiver: FortiGate logs streamed in continuously over UDP and/or
+TCP instead of uploaded once a day.
+
+    python syslogd.py serve --udp 5514 --tcp 5514
+    FORTI_SYSLOG_UDP=5514 FORTI_SYSLOG_TCP=5514 uvicorn main:app     # inside the API
+
+Messages are sorted by report type and day and appended to that day's
+spool, ``Raw Logs/live/disk-<type>-YYYY_MM_DD.log``. A running
+``DailyAggregator`` per type and day is saved every few seconds, which keeps
+"today so far" current on ``/api/reports/{rtype}/daily/{today}/data``.
+Shortly after midnight the spool is renamed to the day's raw log and
+loaded into the event store, so raw logs still only ever appear complete
+and the scheduler, dailies and event queries see the day as if it had been
+uploaded. Until then the day is not in ``/api/events``, ``/api/hosts`` or
+``/api/ioc``.
+
+Buffering is bounded. When the queue is full a TCP connection is not read
+until there is room, so the sender's socket fills and it slows down. UDP
+has no flow control: datagrams that find the queue full are dropped and
+counted.
+
+    python syslogd.py send --tcp 127.0.0.1:5514 disk-ips-2025_11_02.log     # local sender, for testing
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import aggregate
+import eventstore
+import metrics
+from ingest import StreamIngestor
+from logparse import RECORD_FILTERS, LineSplitter, parse_raw_line
+
+# FortiGate subtype -> report type
+ROUTES = {"webfilter": "webfilter", "app-ctrl": "appctrl", "ips": "ips", "dns": "dns", "virus": "antivirus"}
+
+QUEUE_SIZE = int(os.environ.get("FORTI_SYSLOG_QUEUE", "1000"))    # batches (a TCP read or a datagram)
+BATCH_LINES = 5000
+FLUSH_SECONDS = float(os.environ.get("FORTI_SYSLOG_FLUSH", "5"))
+IDLE_SECONDS = 600  # a day's spool not written for this long is closed
+ROLLOVER_SECONDS = float(os.environ.get("FORTI_LIVE_ROLLOVER", "600"))  # after midnight: yesterday is published
+CHECKPOINT_SECONDS = 60
+SPOOL_DIRNAME = "live"
+LATE_DIRNAME = "late"  # inside the spool folder: messages for days that already have a raw log
+READ_SIZE = 64 * 1024
+MAX_MESSAGE = 64 * 1024  # longest TCP frame (FortiGate messages are a few KiB)
+UDP_BUFFER = 4 * 1024 * 1024
+
+_PRI = re.compile(r"^<\d{1,3}>")
+_SPOOL_DAY = re.compile(r"-(\d{4}_\d{2}_\d{2})\.log$")
+
+
+def strip_header(message: str) -> str:
+    """The FortiGate ``key=value`` part of a syslog message (PRI and any RFC 3164/5424 header removed)."""
+    text = _PRI.sub("", message.strip(), count=1)
+    if not text.startswith("date="):
+        start = text.find(" date=")
+        if start >= 0:
+            text = text[start + 1:]
+    return text
+
+
+def report_type(record: dict):
+    subtype = record.get("subtype", "")
+    return ROUTES.get(subtype) or ("webfilter" if "webfilter" in subtype else None)
+
+
+class FrameTooLarge(Exception):
+    pass
+
+
+class Framer:
+    """TCP syslog framing: octet counting (RFC 6587, ``<len> <msg>``) or one message per line.
+
+    A frame longer than ``limit`` (declared, or a line without its end)
+    raises ``FrameTooLarge``: there is no telling where the next one starts.
+    """
+
+    def __init__(self, limit: int = MAX_MESSAGE):
+        self.buf = b""
+        self.limit = limit
+
+    def feed(self, data: bytes) -> list:
+        buf = self.buf + data
+        out, pos = [], 0
+        while pos < len(buf):
+            if buf[pos:pos + 1].isdigit():
+                space = buf.find(b" ", pos, pos + 12)
+                if space > pos and buf[pos:space].isdigit():
+                    length = int(buf[pos:space])
+                    if length > self.limit:
+                        raise FrameTooLarge(f"{length:,} byte frame")
+                    end = space + 1 + length
+                    if end > len(buf):
+                        break
+                    out.append(buf[space + 1:end])
+                    pos = end
+                    continue
+            newline = buf.find(b"\n", pos)
+            if newline < 0:
+                break
+            out.append(buf[pos:newline])
+            pos = newline + 1
+        self.buf = buf[pos:]
+        if len(self.buf) > self.limit + 12:
+            raise FrameTooLarge(f"{len(self.buf):,} bytes without the end of a message")
+        return [m.decode("utf-8", "replace") for m in out if m.strip()]
+
+
+def spool_path(raw_log: Path) -> Path:
+    """Where a day's live messages collect until the day is published as ``raw_log``."""
+    return raw_log.parent / SPOOL_DIRNAME / raw_log.name
+
+
+class DaySink:
+    """One type's live messages for one day, appended to the day's spool
+    (``Raw Logs/live/<raw log name>``) with the day's aggregates kept running.
+
+    The aggregator is checkpointed next to the spool with the byte size it
+    covers, so reopening the day only reads what was written after that.
+    """
+
+    def __init__(self, rtype: str, date_str: str, raw_log: Path, folder: Path):
+        self.rtype = rtype
+        self.date_str = date_str
+        self.ymd = date_str.replace("_", "")
+        self.raw_log = raw_log
+        self.spool = spool_path(raw_log)
+        self.checkpoint_path = self.spool.with_name(f".{self.spool.name}.state")
+        self.folder = folder
+        self.accept = RECORD_FILTERS[rtype]
+        self.aggregator = aggregate.DailyAggregator(rtype)
+        self.lines = 0
+        self.records = 0
+        self.dirty = False
+        self.unsaved = False
+        self.last_write = self.checkpointed = time.monotonic()
+        self.spool.parent.mkdir(parents=True, exist_ok=True)
+        self._resume()
+        self.fh = open(self.spool, "ab")
+
+    def _resume(self):
+        if not self.spool.exists():
+            return
+        size = self.spool.stat().st_size
+        offset = 0
+        try:
+            state = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            if state["size"] <= size:
+                self.aggregator = aggregate.DailyAggregator.restore(self.rtype, state["aggregator"])
+                self.lines, self.records, offset = state["lines"], state["records"], state["size"]
+        except (OSError, ValueError, KeyError):
+            pass
+        if offset == size:
+            return
+        # written after the last checkpoint (or no checkpoint): count it in
+        self.unsaved = True
+        splitter = LineSplitter()
+        with open(self.spool, "rb") as f:
+            f.seek(offset)
+            while chunk := f.read(1 << 20):
+                self._count(splitter.feed(chunk))
+            self._count(splitter.close())
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        if torn:
+            # a message cut short by a crash stays on its own line
+            with open(self.spool, "ab") as f:
+                f.write(b"\n")
+
+    def _count(self, lines):
+        for line in lines:
+            self.lines += 1
+            record = parse_raw_line(line)
+            if record and self.accept(record):
+                self.records += 1
+                self.aggregator.feed(record)
+
+    def add(self, text: str, record: dict):
+        self.fh.write(text.encode("utf-8") + b"\n")
+        self.lines += 1
+        if self.accept(record):
+            self.records += 1
+            self.aggregator.feed(record)
+        self.dirty = self.unsaved = True
+        self.last_write = time.monotonic()
+
+    def flush(self, aggregates: bool = True):
+        if not self.dirty:
+            return
+        self.fh.flush()
+        if not aggregates:
+            return
+        self.dirty = False
+        if time.monotonic() - self.checkpointed >= CHECKPOINT_SECONDS:
+            self.checkpoint()
+        # an uploaded raw log, or other logs stored for the day, are aggregated from there
+        if not self.raw_log.exists() and eventstore.Day(self.folder, self.ymd).sources() <= {self.raw_log.name}:
+            result = self.aggregator.result()
+            result.update(lines=self.lines, records=self.records, live=True, updated=time.time())
+            aggregate.save(self.folder, self.ymd, result)
+
+    def checkpoint(self):
+        if not self.unsaved:
+            return
+        self.fh.flush()
+        state = {"size": self.fh.tell(), "lines": self.lines, "records": self.records,
+                 "aggregator": self.aggregator.state()}
+        tmp = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        tmp.write_text(json.dumps(state, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.checkpoint_path)
+        self.unsaved = False
+        self.checkpointed = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.checkpoint()
+        self.fh.close()
+
+
+class LiveDays:
+    """The open ``DaySink``s of every live source in the process (syslog
+    receiver, FortiAnalyzer puller): two sources sending the same type and
+    day share one spool and one aggregator.
+
+    ``tick()`` saves aggregates and closes idle days. ``rollover`` seconds
+    after midnight it publishes each finished day: the spool becomes the
+    day's raw log in one step (never over an uploaded one), which the
+    scheduler and the generators then see as complete, and it is loaded
+    into the event store as an upload would be. A source still working
+    through a past day ``hold``s it back until it is done.
+    """
+
+    def __init__(self, raw_log_path, folder_for, rollover: float = ROLLOVER_SECONDS):
+        self.raw_log_path = raw_log_path
+        self.folder_for = folder_for
+        self.rollover = rollover
+        self.sinks = {}
+        self.published = {}  # "rtype/YYYY_MM_DD" -> when
+        self.held = {}       # "rtype/YYYY_MM_DD" -> why the spool was not published
+        self.holds = {}      # (source, rtype) -> first day that source may still add to
+        self.late = {}       # "rtype/YYYY_MM_DD" -> messages that came after the day had a raw log
+        self._lock = threading.Lock()
+        self._loading = []
+
+    def add(self, rtype: str, date_str: str, text: str, record: dict) -> bool:
+        """Spool one message; False if it came late (see ``_late``)."""
+        with self._lock:
+            sink = self.sinks.get((rtype, date_str))
+            if sink is None:
+                raw_log = self.raw_log_path(rtype, date_str)
+                if raw_log.exists() and not spool_path(raw_log).exists():
+                    self._late(rtype, date_str, raw_log, text)
+                    return False
+                sink = self.sinks[(rtype, date_str)] = DaySink(rtype, date_str, raw_log, self.folder_for(rtype))
+            sink.add(text, record)
+            return True
+
+    def _late(self, rtype: str, date_str: str, raw_log: Path, text: str):
+        # the day has its raw log (published, or uploaded): it is not reopened. The message is
+        # kept aside in live/late/<raw log name> and counted, for someone to look at.
+        path = spool_path(raw_log).parent / LATE_DIRNAME / raw_log.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(text.encode("utf-8") + b"\n")
+        key = f"{rtype}/{date_str}"
+        if key not in self.late:
+            print(f"Live logs: {raw_log.name} already exists; later messages go to "
+                  f"{SPOOL_DIRNAME}/{LATE_DIRNAME}/{raw_log.name}")
+        self.late[key] = self.late.get(key, 0) + 1
+
+    def hold(self, source: str, rtype: str, date_str: str = None):
+        """Keep ``rtype``'s days from ``date_str`` on unpublished: ``source`` is still adding to them
+        (a puller working through a past day). ``None`` releases the hold."""
+        with self._lock:
+            if date_str is None:
+                self.holds.pop((source, rtype), None)
+            else:
+                self.holds[(source, rtype)] = date_str
+
+    def _finished(self, rtype: str, date_str: str, over: str) -> bool:
+        return date_str < over and all(d > date_str for (_, t), d in self.holds.items() if t == rtype)
+
+    def flush(self):
+        """Write out buffered lines (no aggregates): what has been added is on disk."""
+        with self._lock:
+            for sink in self.sinks.values():
+                sink.flush(aggregates=False)
+
+    def tick(self, closing: bool = False):
+        over = (datetime.now() - timedelta(seconds=self.rollover)).strftime("%Y_%m_%d")
+        now = time.monotonic()
+        with self._lock:
+            for key, sink in list(self.sinks.items()):
+                if closing or self._finished(*key, over) or now - sink.last_write > IDLE_SECONDS:
+                    sink.close()
+                    del self.sinks[key]
+                else:
+                    sink.flush()
+            if closing:
+                return
+            # finished days, including spools left by an earlier run
+            for rtype in ROUTES.values():
+                for spool in spool_path(self.raw_log_path(rtype, over)).parent.glob("*.log"):
+                    m = _SPOOL_DAY.search(spool.name)
+                    if m and self._finished(rtype, m.group(1), over) and (rtype, m.group(1)) not in self.sinks:
+                        self._publish(rtype, m.group(1), spool)
+
+    def _publish(self, rtype: str, date_str: str, spool: Path):
+        key = f"{rtype}/{date_str}"
+        dest = self.raw_log_path(rtype, date_str)
+        if spool.name != dest.name:
+            return
+        try:
+            # a hard link fails if the raw log exists, so an upload of the day is never replaced
+            os.link(spool, dest)
+        except FileExistsError:
+            # the raw log appeared after the spool was started (an upload of the day)
+            if key not in self.held:
+                self.held[key] = f"{dest.name} was uploaded; live messages left in {SPOOL_DIRNAME}/{spool.name}"
+                print(f"Live logs: {self.held[key]}")
+            return
+        except OSError:
+            if dest.exists():
+                return
+            os.rename(spool, dest)
+        spool.unlink(missing_ok=True)
+        spool.with_name(f".{spool.name}.state").unlink(missing_ok=True)
+        self.held.pop(key, None)
+        self.published[key] = time.time()
+        print(f"Live logs: published {dest.name}")
+        thread = threading.Thread(target=self._load, args=(rtype, date_str, dest), daemon=True)
+        self._loading = [t for t in self._loading if t.is_alive()] + [thread]
+        thread.start()
+
+    def _load(self, rtype: str, date_str: str, raw_log: Path):
+        # same as an upload with ingest=true: stored events, and aggregates of the complete log
+        if not eventstore.enabled():
+            return
+        folder, ymd = self.folder_for(rtype), date_str.replace("_", "")
+        ingestor = StreamIngestor(rtype, store=eventstore.DayPartitions(folder, ymd, rtype=rtype, source=raw_log))
+        try:
+            with open(raw_log, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    ingestor.feed(chunk)
+            result = ingestor.close(raw_log)
+        except Exception:
+            ingestor.abort()
+            traceback.print_exc()
+            return
+        if eventstore.Day(folder, ymd).sources() <= {raw_log.name}:
+            aggregate.save(folder, ymd, result)
+
+    def close(self, timeout: float = 30):
+        self.tick(closing=True)
+        for thread in self._loading:
+            thread.join(timeout)
+
+    def status(self) -> dict:
+        with self._lock:
+            open_days = sorted(f"{rtype}/{date_str}" for rtype, date_str in self.sinks)
+        return {"open_days": open_days, "published": sorted(self.published)[-10:], "held": dict(self.held),
+                "late": dict(self.late)}
+
+
+class _UDP(asyncio.DatagramProtocol):
+    def __init__(self, receiver: "Receiver"):
+        self.receiver = receiver
+
+    def datagram_received(self, data: bytes, addr):
+        messages = [m for m in data.decode("utf-8", "replace").splitlines() if m.strip()]
+        try:
+            self.receiver.queue.put_nowait(("udp", messages))
+        except asyncio.QueueFull:
+            metrics.SYSLOG_MESSAGES.inc(len(messages), transport="udp", outcome="dropped")
+
+
+class Receiver:
+    """Listens, queues (bounded) and hands batches to a writer thread, which
+    adds them to ``live`` (shared with any other live source)."""
+
+    def __init__(self, live: LiveDays, queue_size: int = QUEUE_SIZE, flush_seconds: float = FLUSH_SECONDS):
+        self.live = live
+        self.queue = None
+        self.queue_size = queue_size
+        self.flush_seconds = flush_seconds
+        self.servers = []
+        self.connections = 0
+        self.started = None
+        self._drain_task = None
+
+    async def start(self, udp: int = None, tcp: int = None, host: str = "0.0.0.0"):
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+        if udp:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_BUFFER)
+            except OSError:
+                pass
+            sock.bind((host, udp))
+            transport, _ = await loop.create_datagram_endpoint(lambda: _UDP(self), sock=sock)
+            self.servers.append(transport)
+        if tcp:
+            self.servers.append(await asyncio.start_server(self._client, host, tcp))
+        self.started = time.time()
+        self._drain_task = loop.create_task(self._drain())
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        framer = Framer()
+        try:
+            while data := await reader.read(READ_SIZE):
+                messages = framer.feed(data)
+                if messages:
+                    # waits while the queue is full: the connection is not read meanwhile (backpressure)
+                    await self.queue.put(("tcp", messages))
+            tail = framer.feed(b"\n")
+            if tail:
+                await self.queue.put(("tcp", tail))
+        except FrameTooLarge as e:
+            metrics.SYSLOG_MESSAGES.inc(transport="tcp", outcome="oversize")
+            print(f"Syslog: closed {writer.get_extra_info('peername')}: {e}")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                item = ()
+            while item is not None:
+                if item:
+                    batch.append(item)
+                if sum(len(m) for _, m in batch) >= BATCH_LINES or self.queue.empty():
+                    break
+                item = self.queue.get_nowait()
+            stopping = item is None
+            if batch:
+                await asyncio.to_thread(self._process, batch)
+            if stopping or loop.time() - last_flush >= self.flush_seconds:
+                await asyncio.to_thread(self.live.tick)
+                last_flush = loop.time()
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        for transport, messages in batch:
+            stored = late = 0
+            for message in messages:
+                text = strip_header(message)
+                record = parse_raw_line(text)
+                rtype = report_type(record) if record else None
+                if rtype is None:
+                    continue
+                try:
+                    date_str = datetime.strptime(record.get("date", ""), "%Y-%m-%d").strftime("%Y_%m_%d")
+                except ValueError:
+                    date_str = datetime.now().strftime("%Y_%m_%d")
+                if self.live.add(rtype, date_str, text, record):
+                    stored += 1
+                else:
+                    late += 1
+            metrics.SYSLOG_MESSAGES.inc(stored, transport=transport, outcome="stored")
+            if late:
+                metrics.SYSLOG_MESSAGES.inc(late, transport=transport, outcome="late")
+            if len(messages) > stored + late:
+                metrics.SYSLOG_MESSAGES.inc(len(messages) - stored - late, transport=transport, outcome="ignored")
+        metrics.SYSLOG_BATCH_SECONDS.observe(time.perf_counter() - started)
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+        self.servers = []
+        if self._drain_task is not None:
+            await self.queue.put(None)
+            await self._drain_task
+            self._drain_task = None
+
+    def status(self) -> dict:
+        def count(**labels):
+            return int(sum(metrics.SYSLOG_MESSAGES.value(transport=t, **labels) for t in ("udp", "tcp")))
+
+        return {
+            "running": self._drain_task is not None,
+            "since": self.started,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "connections": self.connections,
+            "stored": count(outcome="stored"),
+            "ignored": count(outcome="ignored"),
+            "dropped": count(outcome="dropped"),
+            "oversize": count(outcome="oversize"),
+            **self.live.status(),
+        }
+
+
+# ---------------------------
+# Command line
+# ---------------------------
+def _address(value: str) -> tuple:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def send(path: Path, udp: str = None, tcp: str = None, rate: float = 0, framing: str = "octet") -> dict:
+    """Replay a log file as syslog (PRI 189 = local7.notice), optionally at ``rate`` messages/s."""
+    if tcp:
+        sock = socket.create_connection(_address(tcp))
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        target = _address(udp)
+    sent, started = 0, time.perf_counter()
+    pending = []
+    with open(path, "rb") as f, sock:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if not line or line.startswith(b"#"):
+                continue
+            message = b"<189>" + line
+            if tcp:
+                pending.append(b"%d %s" % (len(message), message) if framing == "octet" else message + b"\n")
+                if len(pending) >= 500:
+                    sock.sendall(b"".join(pending))
+                    pending = []
+            else:
+                sock.sendto(message, target)
+            sent += 1
+            if rate:
+                ahead = sent / rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    if pending:
+                        sock.sendall(b"".join(pending))
+                        pending = []
+                    time.sleep(ahead)
+        if pending:
+            sock.sendall(b"".join(pending))
+    elapsed = time.perf_counter() - started
+    return {"sent": sent, "seconds": round(elapsed, 3), "per_second": round(sent / max(elapsed, 1e-9))}
+
+
+async def _serve(args):
+    from main import BASE_DIR, REPORT_CONFIG, raw_log_path
+
+    live = LiveDays(raw_log_path, lambda rtype: BASE_DIR / REPORT_CONFIG[rtype]["folder"])
+    receiver = Receiver(live, queue_size=args.queue)
+    await receiver.start(udp=args.udp, tcp=args.tcp, host=args.host)
+    print(f"Syslog receiver on {args.host}: udp={args.udp or '-'} tcp={args.tcp or '-'} -> {BASE_DIR}", flush=True)
+    try:
+        while True:
+            await asyncio.sleep(args.stats)
+            s = receiver.status()
+            print(f"[{time.strftime('%H:%M:%S')}] stored={s['stored']:,} ignored={s['ignored']:,}"
+                  f" dropped={s['dropped']:,} queued={s['queued']} connections={s['connections']}", flush=True)
+    finally:
+        await receiver.stop()
+        await asyncio.to_thread(live.close)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FortiGate syslog receiver and test sender")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="receive syslog into the report tree's raw logs")
+    p.add_argument("--udp", type=int, help="UDP port")
+    p.add_argument("--tcp", type=int, help="TCP port")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--queue", type=int, default=QUEUE_SIZE, help=f"queued batches before backpressure (default {QUEUE_SIZE})")
+    p.add_argument("--stats", type=float, default=30, help="seconds between status lines")
+
+    p = sub.add_parser("send", help="replay a log file as syslog")
+    p.add_argument("file", type=Path)
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--udp", metavar="HOST:PORT")
+    target.add_argument("--tcp", metavar="HOST:PORT")
+    p.add_argument("--rate", type=float, default=0, help="messages per second (default: as fast as possible)")
+    p.add_argument("--framing", choices=("octet", "lf"), default="octet", help="TCP framing")
+
+    args = parser.parse_args(argv)
+    if args.command == "send":
+        result = send(args.file, udp=args.udp, tcp=args.tcp, rate=args.rate, framing=args.framing)
+        print(f"Sent {result['sent']:,} messages in {result['seconds']}s ({result['per_second']:,}/s)")
+        return 0
+    if not args.udp and not args.tcp:
+        parser.error("serve needs --udp and/or --tcp")
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
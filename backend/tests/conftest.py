@@ -0,0 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# a past day: uploads of future days are refused
+DAY = "2025_11_02"
+
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    """The API module, pointed at a scratch report tree (read once, at import)."""
+    os.environ["FORTI_REPORT_DIR"] = str(tmp_path_factory.mktemp("reports"))
+    os.environ["FORTI_SCHEDULER"] = "0"
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(main):
+    # no startup/shutdown: the scheduler, precompression and live sources stay off
+    from fastapi.testclient import TestClient
+    return TestClient(main.app)
+
+
+@pytest.fixture(scope="session")
+def ips_log(tmp_path_factory) -> Path:
+    """An IPS log where every fifth line is an anomaly, stored but not one of the report's records."""
+    from bench import synth
+    path = tmp_path_factory.mktemp("logs") / f"disk-ips-{DAY}.log"
+    with open(path, "w", encoding="utf-8") as f:
+        for i, line in enumerate(synth.lines("ips", DAY, 3000, cardinality={"hosts": 40})):
+            f.write(line.replace('eventtype="signature"', 'eventtype="anomaly"') if i % 5 == 0 else line)
+    return path
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+import bloom
+import eventstore
+
+
+def test_members_are_always_found_and_others_rarely():
+    bf = bloom.BloomFilter.for_capacity(5000)
+    members = [f"10.0.{i // 256}.{i % 256}" for i in range(5000)]
+    for value in members:
+        bf.add(value)
+    assert all(value in bf for value in members)
+    others = sum(f"192.168.{i // 256}.{i % 256}" in bf for i in range(20000))
+    assert others < 20000 * bloom.FALSE_POSITIVE_RATE * 3
+
+
+def test_filters_survive_save_and_load(tmp_path):
+    filters = {"srcip": bloom.build(["10.0.0.1", "10.0.0.2"]), "qname": bloom.build([])}
+    path = tmp_path / "day.bloom"
+    bloom.save(path, filters)
+    loaded = bloom.load(path)
+    assert {f: (bf.m, bf.k, bf.n) for f, bf in loaded.items()} == {f: (bf.m, bf.k, bf.n) for f, bf in filters.items()}
+    assert "10.0.0.2" in loaded["srcip"] and "10.0.0.2" not in loaded["qname"]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+    path.write_bytes(b"something else\n{}\n")
+    with pytest.raises(ValueError):
+        bloom.load(path)
+
+
+def _day(folder, day: str, srcips):
+    log = folder / f"disk-ips-2025_11_{day}.log"
+    with open(log, "w", encoding="utf-8") as f:
+        for i, ip in enumerate(srcips):
+            f.write(f'date=2025-11-{day} time=10:00:{i:02d} devname="FGT-1" type="utm" subtype="ips"'
+                    f' eventtype="signature" srcip={ip} dstip=10.9.9.9 attack="Test.Attack" severity="high"\n')
+    eventstore.load_day(folder, "ips", f"202511{day}", log)
+
+
+@pytest.fixture
+def days(tmp_path):
+    _day(tmp_path, "01", ["10.0.0.1", "10.0.0.1", "10.0.0.2"])
+    _day(tmp_path, "02", ["10.0.0.2"])
+    return tmp_path
+
+
+def _sweep(folder, values):
+    return eventstore.sweep(folder, "ips", values, datetime(2025, 11, 1), datetime(2025, 11, 3))
+
+
+def test_sweep_confirms_candidate_days_against_the_events(days):
+    result = _sweep(days, ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+    assert result["days"] == 2
+    assert sorted((h["value"], h["day"], h["count"]) for h in result["hits"] if h["field"] == "srcip") == [
+        ("10.0.0.1", "20251101", 2), ("10.0.0.2", "20251101", 1), ("10.0.0.2", "20251102", 1)]
+    assert result["false_positives"] == result["candidates"] - len(result["hits"])
+
+
+def test_a_partition_without_a_filter_is_always_checked(days):
+    for path in eventstore.Day(days, "20251102").partitions:
+        path.with_suffix(".bloom").unlink()
+    result = _sweep(days, ["10.0.0.2", "10.0.0.3"])
+    assert {(h["value"], h["day"]) for h in result["hits"] if h["field"] == "srcip"} == {
+        ("10.0.0.2", "20251101"), ("10.0.0.2", "20251102")}
+    # every value and field of the unfiltered day was a candidate
+    assert result["candidates"] >= 2 * len(eventstore.BLOOM_FIELDS["ips"])
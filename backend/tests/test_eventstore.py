@@ -0,0 +1,175 @@
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+import eventstore
+from conftest import DAY
+from logparse import RECORD_FILTERS, parse_raw_line
+
+START = datetime.strptime(DAY, "%Y_%m_%d").date()
+RANGE = {"start": START.isoformat(), "end": (START + timedelta(days=1)).isoformat()}
+
+
+@pytest.fixture(scope="module")
+def stored(client, ips_log):
+    r = client.put("/api/upload/ips", params={"selectedDate": DAY, "ingest": "true"}, content=ips_log.read_bytes())
+    assert r.status_code == 200, r.text
+    assert r.json()["aggregates"]["stored"] > 0
+    with open(ips_log, encoding="utf-8") as f:
+        records = [r for r in map(parse_raw_line, f) if r and RECORD_FILTERS["ips"](r)]
+    return Counter(r["srcip"] for r in records)
+
+
+def _pages(client, limit: int, **params) -> list:
+    events, cursor, pages = [], None, 0
+    while True:
+        r = client.get("/api/events/ips", params={**RANGE, **params, "limit": limit,
+                                                  **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert len(body["events"]) <= limit
+        events.extend(body["events"])
+        pages += 1
+        cursor = body["next"]
+        if cursor is None:
+            return events
+        assert pages < 1000
+
+
+def test_paging_returns_every_event_once(client, stored):
+    everything = _pages(client, 5000)
+    assert len(everything) == sum(stored.values())
+    paged = _pages(client, 37)
+    assert paged == everything
+    assert [e["ts"] for e in paged] == sorted(e["ts"] for e in paged)
+
+
+def test_a_bad_cursor_is_refused(client, stored):
+    r = client.get("/api/events/ips", params={**RANGE, "cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+def test_events_hosts_and_ioc_agree(client, stored):
+    for ip, expected in stored.most_common(3):
+        events = _pages(client, 50, srcip=ip)
+        assert len(events) == expected
+        assert {e["srcip"] for e in events} == {ip}
+
+        host = client.get(f"/api/hosts/{ip}", params={**RANGE, "types": "ips"}).json()
+        assert host["totals"]["ips"]["events"] == expected
+        assert sum(t["events"] for t in host["timeline"]) == expected
+
+        sweep = client.get("/api/ioc", params={"value": ip, **RANGE, "types": "ips"}).json()
+        indicator, = sweep["indicators"]
+        assert indicator["seen"] and indicator["days"] == 1
+        assert sum(h["count"] for h in indicator["hits"] if h["field"] == "srcip") == expected
+
+
+def test_ioc_outside_the_range_is_not_seen(client, stored):
+    ip, _ = stored.most_common(1)[0]
+    day_after = START + timedelta(days=1)
+    sweep = client.get("/api/ioc", params={"value": ip, "types": "ips", "start": day_after.isoformat(),
+                                           "end": (day_after + timedelta(days=1)).isoformat()}).json()
+    assert not sweep["indicators"][0]["seen"]
+
+
+# ---------------------------
+# Partitions per source
+# ---------------------------
+YMD = DAY.replace("_", "")
+
+
+def _log(path, devices):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, device in enumerate(devices):
+            f.write(f'date=2025-11-02 time=00:00:{i:02d} devname="{device}" type="utm" subtype="ips"'
+                    f' eventtype="signature" srcip=10.0.0.{i} attack="Test.Attack" severity="high"\n')
+    return path
+
+
+def _read(folder, path):
+    return len(eventstore.load_day(folder, "ips", YMD, path))
+
+
+def test_a_log_over_the_attach_limit_leaves_other_logs_partitions_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(eventstore, "MAX_PARTITIONS", 4)
+    b = _log(tmp_path / "b.log", ["FGT-5"])
+    assert _read(tmp_path, b) == 1
+    a = _log(tmp_path / "a.log", ["FGT-1", "FGT-2", "FGT-3", "FGT-4"])
+    assert _read(tmp_path, a) == 4
+    # b grows past the limit while a holds the shared partition
+    _log(b, ["FGT-5", "FGT-6", "FGT-7"])
+    assert _read(tmp_path, b) == 3
+    day = eventstore.Day(tmp_path, YMD)
+    assert len(day.partitions) == 4
+    for path, expected in ((a, 4), (b, 3)):
+        assert eventstore.Day(tmp_path, YMD, source=path.name).current_for(path)
+        assert _read(tmp_path, path) == expected
+
+
+def test_a_log_finding_every_partition_taken_is_not_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(eventstore, "MAX_PARTITIONS", 3)
+    a = _log(tmp_path / "a.log", ["FGT-1", "FGT-2", "FGT-3", "FGT-4"])
+    b = _log(tmp_path / "b.log", ["FGT-5"])
+    assert _read(tmp_path, a) == 4
+    assert _read(tmp_path, b) == 1
+    assert len(eventstore.Day(tmp_path, YMD).partitions) == 3
+    assert not eventstore.Day(tmp_path, YMD, source="b.log").current_for(b)
+    assert _read(tmp_path, a) == 4
+    assert _read(tmp_path, b) == 1
+
+
+def test_a_device_in_two_logs_gets_a_partition_per_log(tmp_path):
+    a = _log(tmp_path / "a.log", ["FGT-1", "FGT-1", "FGT-2"])
+    b = _log(tmp_path / "b.log", ["FGT-1"])
+    assert _read(tmp_path, a) == 3
+    assert _read(tmp_path, b) == 1
+    # both stay current: neither is parsed again
+    for path, expected in ((a, 3), (b, 1)):
+        assert eventstore.Day(tmp_path, YMD, source=path.name).current_for(path)
+        assert _read(tmp_path, path) == expected
+    with eventstore.Day(tmp_path, YMD, device="FGT-1").connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 3
+
+
+def test_load_day_gives_the_same_frame_from_the_store(tmp_path, ips_log):
+    log = tmp_path / ips_log.name
+    log.write_bytes(ips_log.read_bytes())
+    parsed = eventstore.load_day(tmp_path, "ips", YMD, log)
+    assert eventstore.Day(tmp_path, YMD, source=log.name).current_for(log)
+    stored = eventstore.load_day(tmp_path, "ips", YMD, log)
+    # fields without a column of their own (kept in extra) included
+    assert "incidentserialno" in stored.columns
+    assert sorted(stored.columns) == sorted(parsed.columns)
+    parsed = parsed.fillna("")
+    parsed = parsed.sort_values(list(parsed.columns)).reset_index(drop=True)
+    stored = stored[parsed.columns].fillna("")
+    stored = stored.sort_values(list(stored.columns)).reset_index(drop=True)
+    assert stored.equals(parsed)
+
+
+def test_temp_files_of_a_killed_writer_are_removed(tmp_path):
+    folder = eventstore.day_dir(tmp_path, YMD)
+    folder.mkdir(parents=True)
+    old = folder / ".FGT-1.sqlite.123.abc.tmp"
+    old_bloom = folder / ".FGT-1.bloom.123.abc.tmp"
+    recent = folder / ".FGT-2.sqlite.456.def.tmp"
+    for path in (old, old_bloom, recent):
+        path.write_bytes(b"")
+    past = time.time() - eventstore.STALE_TMP_AFTER - 60
+    for path in (old, old_bloom):
+        os.utime(path, (past, past))
+    assert _read(tmp_path, _log(tmp_path / "a.log", ["FGT-1"])) == 1
+    # a writer still building keeps its temp file
+    assert sorted(p.name for p in folder.glob(".*.tmp")) == [recent.name]
+
+
+def test_hosts_count_a_range_that_starts_and_ends_inside_an_hour(client, stored):
+    partial = {"start": f"{START.isoformat()}T10:30", "end": f"{START.isoformat()}T15:45"}
+    for ip, _ in stored.most_common(3):
+        events = client.get("/api/events/ips", params={**partial, "srcip": ip, "limit": 5000}).json()
+        host = client.get(f"/api/hosts/{ip}", params={**partial, "types": "ips"}).json()
+        assert host["totals"]["ips"]["events"] == len(events["events"]) > 0
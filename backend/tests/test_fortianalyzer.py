@@ -0,0 +1,131 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import aggregate
+import fortianalyzer
+import syslogd
+from bench import synth
+from conftest import DAY
+from logparse import RECORD_FILTERS, parse_raw_line
+
+START = datetime.strptime(DAY, "%Y_%m_%d")
+
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    path = tmp_path_factory.mktemp("faz") / f"disk-ips-{DAY}.log"
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(synth.lines("ips", DAY, 2000))
+    return path
+
+
+def _serve(backend, **kwargs):
+    server = fortianalyzer.stub_server(backend, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stub(source):
+    server = _serve(fortianalyzer.LogBackend([source]))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _tree(folder):
+    def raw_log_path(rtype: str, date_str: str):
+        return folder / "Raw Logs" / f"disk-{rtype}-{date_str}.log"
+    return folder, raw_log_path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    return _tree(tmp_path)
+
+
+def _puller(url, tree, **kwargs):
+    folder, raw_log_path = tree
+    live = syslogd.LiveDays(raw_log_path, lambda rtype: folder, rollover=0)
+    client = fortianalyzer.Client(url, token="stub", connections=3)
+    return fortianalyzer.Puller(client, live, ["ips"], folder / "faz_state.json", fetchers=3, page=97,
+                                window=6 * 3600, start=DAY, **kwargs)
+
+
+def _totals(path) -> dict:
+    agg = aggregate.DailyAggregator("ips")
+    with open(path, encoding="utf-8") as f:
+        for record in map(parse_raw_line, f):
+            if record and RECORD_FILTERS["ips"](record):
+                agg.feed(record)
+    return {k: agg.result()[k] for k in ("total", "notable", "hourly")}
+
+
+def _records(path) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for r in map(parse_raw_line, f) if r)
+
+
+def test_a_day_is_pulled_in_pages_and_published(stub, source, tree):
+    puller = _puller(stub, tree)
+    pulled = puller.pull(until=START + timedelta(days=1))
+    assert pulled == {"ips": _records(source)}
+    assert puller.status()["connections"]["opened"] <= 3
+    assert puller.state["cursor"]["ips"] == {"start": f"{START + timedelta(days=1):%Y-%m-%d %H:%M:%S}", "offset": 0}
+    # the cursor has moved past the day: the next tick publishes it
+    puller.live.tick()
+    puller.live.close()
+    puller.close()
+    raw_log = tree[1]("ips", DAY)
+    assert raw_log.exists()
+    assert _totals(raw_log) == _totals(source)
+
+
+def test_a_new_puller_carries_on_from_the_saved_cursor(stub, source, tree):
+    first = _puller(stub, tree)
+    morning = first.pull(until=START + timedelta(hours=9, minutes=30))["ips"]
+    first.close()
+    # the day is held open while it is being pulled
+    first.live.tick()
+    first.live.close()
+    assert not tree[1]("ips", DAY).exists()
+
+    second = _puller(stub, tree)
+    rest = second.pull(until=START + timedelta(days=1))["ips"]
+    second.live.tick()
+    second.live.close()
+    second.close()
+    assert morning and rest and morning + rest == _records(source)
+    assert _totals(tree[1]("ips", DAY)) == _totals(source)
+
+
+def _pull_from(backend, folder, until, record=None) -> dict:
+    server = _serve(backend, record=record)
+    puller = _puller(f"http://127.0.0.1:{server.server_address[1]}", _tree(folder))
+    try:
+        pulled = puller.pull(until=until)
+        assert "ips" not in puller.state["errors"]
+        return pulled
+    finally:
+        puller.live.close()
+        puller.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_recorded_answers_replay_the_same_pull(source, tmp_path):
+    recording = tmp_path / "faz.jsonl"
+    until = START + timedelta(hours=6)
+    recorded = _pull_from(fortianalyzer.LogBackend([source]), tmp_path / "recorded", until, record=recording)
+    assert recorded["ips"]
+    assert _pull_from(fortianalyzer.ReplayBackend(recording), tmp_path / "replayed", until) == recorded
+
+
+def test_to_line_keeps_what_the_parser_reads(source):
+    with open(source, encoding="utf-8") as f:
+        records = [r for r in map(parse_raw_line, f) if r][:200]
+    for record in records:
+        again = parse_raw_line(fortianalyzer.to_line(record))
+        assert again == {k: v.replace('"', "'") for k, v in record.items()}
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+import jobs
+
+
+class Recorder:
+    """A runner that notes the order jobs ran in."""
+
+    def __init__(self):
+        self.ran = []
+        self._cond = threading.Condition()
+
+    def __call__(self, job):
+        with self._cond:
+            self.ran.append((job.rtype, job.date))
+            self._cond.notify_all()
+        return {"ok": True}
+
+    def run(self, manager: jobs.JobManager, count: int) -> list:
+        manager.start()
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.ran) >= count, 10)
+        manager.shutdown()
+        return self.ran
+
+
+def test_interactive_jobs_run_before_backfill():
+    runner = Recorder()
+    manager = jobs.JobManager(runner, workers=1)
+    for day in ("20251101", "20251102", "20251103"):
+        manager.submit("daily", "ips", day, priority=jobs.BACKFILL)
+    manager.submit("daily", "ips", "20251104", priority=jobs.SCHEDULED)
+    manager.submit("daily", "ips", "20251105")
+    assert [date for _, date in runner.run(manager, 5)] == [
+        "20251105", "20251104", "20251101", "20251102", "20251103"]
+
+
+def test_same_key_coalesces_and_takes_the_higher_priority():
+    runner = Recorder()
+    manager = jobs.JobManager(runner, workers=1)
+    _, created = manager.submit("daily", "ips", "20251101", priority=jobs.BACKFILL)
+    manager.submit("daily", "ips", "20251102", priority=jobs.BACKFILL)
+    again, created_again = manager.submit("daily", "ips", "20251102", profile=True)
+    assert created and not created_again
+    assert again.priority == jobs.INTERACTIVE and again.profile
+    assert manager.stats()["queued"] == 2
+    # another type or mode is another job
+    assert manager.submit("daily", "dns", "20251102", priority=jobs.BACKFILL)[1]
+    assert manager.submit("monthly", "ips", "202511", priority=jobs.BACKFILL)[1]
+    assert runner.run(manager, 4) == [
+        ("ips", "20251102"), ("ips", "20251101"), ("dns", "20251102"), ("ips", "202511")]
+
+
+def test_queue_full_refuses_past_max_queued():
+    manager = jobs.JobManager(Recorder(), workers=1, max_queued=2)
+    manager.submit("daily", "ips", "20251101")
+    queued, _ = manager.submit("daily", "ips", "20251102")
+    with pytest.raises(jobs.QueueFull) as full:
+        manager.submit("daily", "ips", "20251103")
+    assert full.value.retry_after >= 1
+    # coalescing onto a queued job takes no slot
+    assert not manager.submit("daily", "ips", "20251101")[1]
+    with pytest.raises(jobs.QueueFull):
+        manager.reserve(1)
+    manager.cancel(queued.id)
+    manager.reserve(1)
+    assert manager.submit("daily", "ips", "20251103")[1]
+
+
+def test_a_coalesced_job_joins_the_new_batch_and_waits_for_its_dependencies():
+    manager = jobs.JobManager(Recorder(), workers=1)
+    first, _ = manager.submit("daily", "ips", "20251101", priority=jobs.BACKFILL, batch="a")
+    monthly, _ = manager.submit("monthly", "ips", "202511", priority=jobs.BACKFILL,
+                                depends_on=[first], batch="a")
+    second, _ = manager.submit("daily", "ips", "20251102", priority=jobs.BACKFILL, batch="b")
+    again, created = manager.submit("monthly", "ips", "202511", priority=jobs.BACKFILL,
+                                    depends_on=[first, second], batch="b")
+    assert again is monthly and not created
+    assert monthly.depends_on == [first, second]
+    assert manager.batch("b") == [monthly, second]
+    assert manager.batch("a") == [first, monthly]
+
+
+def test_a_backfill_of_coalesced_jobs_can_be_followed_and_cancelled(client):
+    form = {"start": "2025_10_01", "end": "2025_10_02", "types": "ips"}
+    first = client.post("/api/backfill", data=form).json()
+    second = client.post("/api/backfill", data=form).json()
+    assert second["coalesced"] == 3 and second["daily"] == second["monthly"] == 0
+    status = client.get(f"/api/backfill/{second['backfill_id']}").json()
+    assert status["total"] == 3 and status["counts"] == {jobs.QUEUED: 3}
+    cancelled = client.post(f"/api/backfill/{second['backfill_id']}/cancel").json()
+    assert cancelled["counts"] == {jobs.CANCELLED: 3}
+    assert client.get(f"/api/backfill/{first['backfill_id']}").json()["counts"] == {jobs.CANCELLED: 3}
@@ -0,0 +1,105 @@
+import pytest
+
+import aggregate
+import eventstore
+from bench import synth
+from logparse import RECORD_FILTERS, parse_raw_line
+
+YMD = "20251102"
+
+
+def _log(path, devices):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, device in enumerate(devices):
+            f.write(f'date=2025-11-02 time=00:00:{i:02d} devname="{device}" type="utm" subtype="ips"'
+                    f' eventtype="signature" srcip=10.0.0.{i} attack="Test.Attack" severity="high"\n')
+    return path
+
+
+def test_devices_with_the_same_file_safe_name_keep_their_own_aggregates(tmp_path):
+    log = _log(tmp_path / "a.log", ["a/b", "a/b", "a_b"])
+    assert len(eventstore.load_day(tmp_path, "ips", YMD, log)) == 3
+    paths = {device: aggregate.current(tmp_path, "ips", YMD, device) for device in ("a/b", "a_b")}
+    assert paths["a/b"] != paths["a_b"]
+    assert {p.parent for p in paths.values()} == {tmp_path / "aggregates"}
+    assert aggregate.load(paths["a/b"])["total"] == 2
+    assert aggregate.load(paths["a_b"])["total"] == 1
+
+
+def test_report_data_cache_is_bounded(client, main, monkeypatch):
+    folder = main.BASE_DIR / main.REPORT_CONFIG["ips"]["folder"]
+    aggregate.save(folder, "20251015", aggregate.DailyAggregator("ips").result())
+    monkeypatch.setattr(main, "REPORT_DATA_CACHE_SIZE", 2)
+    main._report_data_cache.clear()
+    for top in (1, 2, 3, 2):
+        r = client.get("/api/reports/ips/daily/2025-10-15/data", params={"top": top})
+        assert r.status_code == 200, r.text
+    # the least recently used (top=1) went first
+    assert [key[3] for key in main._report_data_cache] == [3, 2]
+
+
+def _result(day: str, count: int) -> dict:
+    agg = aggregate.DailyAggregator("ips")
+    for record in map(parse_raw_line, synth.lines("ips", day, count)):
+        if record and RECORD_FILTERS["ips"](record):
+            agg.feed(record)
+    return agg.result()
+
+
+def test_store_queries_give_the_parsed_aggregates(tmp_path, ips_log):
+    log = tmp_path / ips_log.name
+    log.write_bytes(ips_log.read_bytes())
+    eventstore.load_day(tmp_path, "ips", YMD, log)
+    parsed = aggregate.DailyAggregator("ips")
+    with open(log, encoding="utf-8") as f:
+        for record in map(parse_raw_line, f):
+            if record and RECORD_FILTERS["ips"](record):
+                parsed.feed(record)
+    expected, stored = parsed.result(), aggregate.from_store(eventstore.Day(tmp_path, YMD), "ips")
+    for key in ("total", "notable", "hourly"):
+        assert stored[key] == expected[key]
+    assert {f: dict(rows) for f, rows in stored["top"].items()} == {f: dict(rows) for f, rows in expected["top"].items()}
+
+
+@pytest.fixture(scope="module")
+def saved(main):
+    folder = main.BASE_DIR / main.REPORT_CONFIG["ips"]["folder"]
+    days = {"20250901": _result("2025_09_01", 400), "20250902": _result("2025_09_02", 300)}
+    for ymd, result in days.items():
+        aggregate.save(folder, ymd, result)
+    return days
+
+
+def test_daily_data_is_the_compact_result(client, saved):
+    r = client.get("/api/reports/ips/daily/2025-09-01/data", params={"top": 3})
+    assert r.status_code == 200, r.text
+    body, result = r.json(), saved["20250901"]
+    assert body["date"] == "2025-09-01" and body["total"] == result["total"]
+    assert all(len(rows) <= 3 for rows in body["top"].values())
+    assert body["top"]["attack"] == [list(row) for row in result["top"]["attack"][:3]]
+    assert sum(body["pie"]["values"]) <= body["notable"] and len(body["hourly"]) == 24
+
+    again = client.get("/api/reports/ips/daily/2025-09-01/data", params={"top": 3},
+                       headers={"If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304
+    # another top is another body
+    assert client.get("/api/reports/ips/daily/2025-09-01/data").headers["etag"] != r.headers["etag"]
+
+
+def test_monthly_data_merges_the_days(client, saved):
+    body = client.get("/api/reports/ips/monthly/2025-09/data").json()
+    assert body["days"] == ["2025-09-01", "2025-09-02"]
+    assert body["daily_total"] == [saved[d]["total"] for d in sorted(saved)]
+    assert body["total"] == sum(r["total"] for r in saved.values())
+    assert body["notable"] == sum(r["notable"] for r in saved.values())
+
+
+@pytest.mark.parametrize("url, status", [
+    ("/api/reports/ips/daily/2025-08-01/data", 404),
+    ("/api/reports/ips/monthly/2025-08/data", 404),
+    ("/api/reports/ips/daily/yesterday/data", 400),
+    ("/api/reports/nope/daily/2025-09-01/data", 404),
+    ("/api/reports/ips/daily/2025-09-01/data?top=1000", 422),
+])
+def test_report_data_refuses(client, saved, url, status):
+    assert client.get(url).status_code == status
@@ -0,0 +1,89 @@
+import gzip
+import os
+from datetime import datetime
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def report(main):
+    """A closed-period IPS daily report in the scratch tree."""
+    config = main.REPORT_CONFIG["ips"]
+    folder = main.BASE_DIR / config["folder"] / "daily_reports"
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{config['daily_prefix']}20251102.html"
+    path.write_text("<html>first</html>")
+    yield path
+    for stale in path.parent.glob(path.name + "*"):
+        stale.unlink()
+
+
+def _serve(client, path, headers=None, **params):
+    return client.get(f"/api/serve/ips/daily/{path.name}", params=params,
+                      headers={"Accept-Encoding": "identity", **(headers or {})})
+
+
+def test_a_closed_report_at_its_version_is_immutable(client, report):
+    listed, = client.get("/api/reports/ips/daily").json()
+    r = client.get(listed["path"], headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert "immutable" in r.headers["cache-control"]
+    # no version, or an old one: revalidate
+    assert _serve(client, report).headers["cache-control"] == "no-cache"
+    assert _serve(client, report, v="0-0").headers["cache-control"] == "no-cache"
+
+
+def test_a_report_of_the_running_day_is_always_revalidated(client, main, report):
+    today = report.with_name(f"{main.REPORT_CONFIG['ips']['daily_prefix']}{datetime.utcnow():%Y%m%d}.html")
+    today.write_text("<html>so far</html>")
+    try:
+        r = _serve(client, today, v=storage.version_token(today.stat()))
+        assert r.status_code == 200 and r.headers["cache-control"] == "no-cache"
+    finally:
+        today.unlink()
+
+
+def test_revalidation_answers_304(client, report):
+    r = _serve(client, report)
+    etag, modified = r.headers["etag"], r.headers["last-modified"]
+    assert _serve(client, report, {"If-None-Match": etag}).status_code == 304
+    assert _serve(client, report, {"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+    assert _serve(client, report, {"If-Modified-Since": modified}).status_code == 304
+    # If-None-Match wins over If-Modified-Since
+    assert _serve(client, report, {"If-None-Match": '"other"', "If-Modified-Since": modified}).status_code == 200
+
+    report.write_text("<html>regenerated</html>")
+    os.utime(report, (report.stat().st_mtime + 5,) * 2)
+    r = _serve(client, report, {"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_precompressed_variant_is_served_while_fresh(client, report):
+    assert storage.write_variants(report)
+    r = _serve(client, report, {"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.text == "<html>first</html>"
+    assert r.headers["etag"] != _serve(client, report).headers["etag"]
+    assert gzip.decompress(storage.variant_path(report, "gzip").read_bytes()) == b"<html>first</html>"
+
+    # regenerated without new variants: the stale .gz is not sent
+    report.write_text("<html>second</html>")
+    os.utime(report, (report.stat().st_mtime + 5,) * 2)
+    r = _serve(client, report, {"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.text == "<html>second</html>"
+
+
+def test_listing_version_follows_a_report_rewritten_in_place(client, report):
+    listed, = client.get("/api/reports/ips/daily").json()
+    folder_mtime = report.parent.stat().st_mtime_ns
+
+    # regenerated in place: the directory itself is untouched
+    report.write_text("<html>second, longer</html>")
+    os.utime(report.parent, ns=(folder_mtime, folder_mtime))
+    relisted, = client.get("/api/reports/ips/daily").json()
+    assert relisted["path"] != listed["path"]
+    assert client.get(relisted["path"]).text == "<html>second, longer</html>"
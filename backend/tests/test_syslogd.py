@@ -0,0 +1,153 @@
+from pathlib import Path
+
+import pytest
+
+import aggregate
+import eventstore
+import syslogd
+from bench import synth
+from conftest import DAY
+from logparse import RECORD_FILTERS, parse_raw_line
+
+
+def _messages(count: int, day: str = DAY):
+    for line in synth.lines("ips", day, count):
+        text = line.rstrip("\n")
+        record = parse_raw_line(text)
+        if record:
+            yield text, record
+
+
+def _full_parse(path: Path) -> dict:
+    agg = aggregate.DailyAggregator("ips")
+    with open(path, encoding="utf-8") as f:
+        for record in map(parse_raw_line, f):
+            if record and RECORD_FILTERS["ips"](record):
+                agg.feed(record)
+    return agg.result()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    def raw_log_path(rtype: str, date_str: str) -> Path:
+        return tmp_path / "Raw Logs" / f"disk-{rtype}-{date_str}.log"
+    return tmp_path, raw_log_path
+
+
+def _sink(tree, day: str = DAY) -> syslogd.DaySink:
+    folder, raw_log_path = tree
+    return syslogd.DaySink("ips", day, raw_log_path("ips", day), folder)
+
+
+def test_day_sink_resumes_from_checkpoint_and_tail(tree):
+    sink = _sink(tree)
+    messages = list(_messages(1500))
+    for text, record in messages[:1000]:
+        sink.add(text, record)
+    sink.checkpoint()
+    for text, record in messages[1000:]:
+        sink.add(text, record)
+    # lines on disk, but the process dies before the next checkpoint
+    sink.flush(aggregates=False)
+    sink.fh.close()
+
+    resumed = _sink(tree)
+    assert resumed.lines == len(messages)
+    assert resumed.aggregator.result() == sink.aggregator.result() == _full_parse(resumed.spool)
+    resumed.close()
+    # the canonical raw log only appears when the day is published
+    assert not tree[1]("ips", DAY).exists()
+
+
+def test_day_sink_resumes_without_checkpoint_and_ends_a_torn_line(tree):
+    sink = _sink(tree)
+    messages = list(_messages(300))
+    for text, record in messages:
+        sink.add(text, record)
+    sink.close()
+    sink.checkpoint_path.unlink()
+    with open(sink.spool, "ab") as f:
+        f.write(b"date=2025-11-02 time=23:59:59 devname=FGT-01 type=utm sub")
+
+    resumed = _sink(tree)
+    assert resumed.lines == len(messages) + 1
+    assert resumed.aggregator.result() == _full_parse(sink.spool)
+    text, record = messages[0]
+    resumed.add(text, record)
+    resumed.close()
+    assert sink.spool.read_bytes().endswith(b" sub\n" + text.encode() + b"\n")
+
+
+def test_live_days_publish_once_the_day_is_over(tree):
+    folder, raw_log_path = tree
+    live = syslogd.LiveDays(raw_log_path, lambda rtype: folder, rollover=0)
+    for text, record in _messages(500):
+        live.add("ips", DAY, text, record)
+    spool = syslogd.spool_path(raw_log_path("ips", DAY))
+
+    # a source still pulling the day keeps it open
+    live.hold("puller", "ips", DAY)
+    live.tick()
+    assert spool.exists() and not raw_log_path("ips", DAY).exists()
+
+    live.hold("puller", "ips", None)
+    live.tick()
+    live.close()
+    raw_log = raw_log_path("ips", DAY)
+    assert raw_log.exists() and not spool.exists()
+    assert live.status()["published"] == [f"ips/{DAY}"]
+    day = eventstore.Day(folder, DAY.replace("_", ""))
+    assert day.sources() == {raw_log.name}
+    assert aggregate.from_store(day, "ips")["total"] == _full_parse(raw_log)["total"]
+
+
+def test_live_days_never_replace_an_uploaded_log(tree):
+    folder, raw_log_path = tree
+    live = syslogd.LiveDays(raw_log_path, lambda rtype: folder, rollover=0)
+    for text, record in _messages(50):
+        live.add("ips", DAY, text, record)
+    # uploaded while the day was being spooled
+    uploaded = raw_log_path("ips", DAY)
+    uploaded.write_text("uploaded\n")
+    live.tick()
+    live.close()
+    assert uploaded.read_text() == "uploaded\n"
+    assert syslogd.spool_path(uploaded).exists()
+    assert f"ips/{DAY}" in live.status()["held"]
+
+
+def test_framer_splits_octet_counted_and_newline_messages():
+    framer = syslogd.Framer()
+    assert framer.feed(b"5 hello3 a") == ["hello"]
+    assert framer.feed(b"bcone\ntw") == ["abc", "one"]
+    assert framer.feed(b"o\n") == ["two"]
+
+
+@pytest.mark.parametrize("data", [b"99999999999 data", b"x" * (syslogd.MAX_MESSAGE + 100)])
+def test_framer_refuses_oversize_frames(data):
+    framer = syslogd.Framer()
+    with pytest.raises(syslogd.FrameTooLarge):
+        for _ in range(3):
+            framer.feed(data)
+    assert len(framer.buf) <= syslogd.MAX_MESSAGE + len(data)
+
+
+def test_messages_for_a_published_day_are_kept_aside_as_late(tree):
+    folder, raw_log_path = tree
+    live = syslogd.LiveDays(raw_log_path, lambda rtype: folder, rollover=0)
+    messages = list(_messages(20))
+    for text, record in messages[:10]:
+        assert live.add("ips", DAY, text, record)
+    live.tick()
+    raw_log = raw_log_path("ips", DAY)
+    published = raw_log.read_bytes()
+
+    assert not any([live.add("ips", DAY, text, record) for text, record in messages[10:]])
+    live.tick()
+    live.close()
+    assert raw_log.read_bytes() == published
+    assert not syslogd.spool_path(raw_log).exists()
+    assert live.status()["late"] == {f"ips/{DAY}": 10}
+    assert live.status()["held"] == {}
+    late = syslogd.spool_path(raw_log).parent / syslogd.LATE_DIRNAME / raw_log.name
+    assert late.read_text().splitlines() == [text for text, _ in messages[10:]]
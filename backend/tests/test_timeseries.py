@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import eventstore
+
+YMD = "20251102"
+DAY0 = datetime(2025, 11, 2)
+# time, severity, device; the last line is an anomaly, not one of the report's records
+LINES = [
+    ("00:00:10", "high", "FGT-1", "signature"),
+    ("00:00:50", "high", "FGT-1", "signature"),
+    ("00:01:05", "low", "FGT-1", "signature"),
+    ("10:30:00", "high", "FGT-2", "signature"),
+    ("10:31:00", "high", "FGT-3", "anomaly"),
+]
+
+
+def _store(folder, lines=LINES):
+    log = folder / "disk-ips-2025_11_02.log"
+    with open(log, "w", encoding="utf-8") as f:
+        for time, severity, device, eventtype in lines:
+            f.write(f'date=2025-11-02 time={time} devname="{device}" type="utm" subtype="ips"'
+                    f' eventtype="{eventtype}" srcip=10.0.0.1 attack="Test.Attack" severity="{severity}"\n')
+    eventstore.load_day(folder, "ips", YMD, log)
+    return folder
+
+
+@pytest.fixture
+def stored(tmp_path):
+    return _store(tmp_path)
+
+
+def _series(folder, split, start, end, step):
+    return eventstore.timeseries(folder, "ips", split, start, end, step)
+
+
+def test_minutes_hours_and_days_come_from_the_same_arrays(stored):
+    minutes = _series(stored, "total", DAY0, DAY0 + timedelta(minutes=3), 60)
+    assert minutes["series"] == {"": [2, 1, 0]} and minutes["points"] == 3
+
+    hours = _series(stored, "total", DAY0, DAY0 + timedelta(days=1), 3600)["series"][""]
+    assert len(hours) == 24 and hours[0] == 3 and hours[10] == 1 and sum(hours) == 4
+
+    # the day after is not stored: it counts nothing, and is not counted as a day
+    days = _series(stored, "total", DAY0, DAY0 + timedelta(days=2), 86400)
+    assert days["series"] == {"": [4, 0]} and days["days"] == 1
+
+
+def test_buckets_start_at_the_range_start(stored):
+    hours = _series(stored, "total", DAY0 + timedelta(minutes=1), DAY0 + timedelta(days=1), 3600)["series"][""]
+    # 00:01-01:01 holds only 00:01:05; 10:01-11:01 holds 10:30
+    assert hours[0] == 1 and hours[10] == 1 and sum(hours) == 2
+
+
+def test_splits_sum_to_the_total(stored):
+    day = (DAY0, DAY0 + timedelta(days=1), 86400)
+    severity = _series(stored, "severity", *day)["series"]
+    assert severity == {"high": [3], "low": [1]}
+    assert _series(stored, "notable", *day)["series"][""][0] <= 4
+    assert {k: v[0] for k, v in _series(stored, "device", *day)["series"].items()} == {"FGT-1": 3, "FGT-2": 1}
+
+
+@pytest.mark.parametrize("devices", [1, 3], ids=["one partition", "three partitions"])
+def test_keys_past_the_limit_are_summed_into_other(tmp_path, monkeypatch, devices):
+    monkeypatch.setattr(eventstore, "SERIES_MAX_KEYS", 2)
+    lines = [(f"00:00:{i:02d}", f"s{i % 3}", f"FGT-{i % devices}", "signature") for i in range(9)] + [
+        ("00:01:00", "s0", "FGT-0", "signature")]
+    _store(tmp_path, lines)
+    series = _series(tmp_path, "severity", DAY0, DAY0 + timedelta(days=1), 86400)["series"]
+    assert series == {"s0": [4], "(other)": [6]}
+
+
+def test_timeseries_api_refuses_bad_requests(client):
+    params = {"start": "2025-11-02", "end": "2025-11-03"}
+    assert client.get("/api/timeseries/ips", params={**params, "split": "category"}).status_code == 400
+    assert client.get("/api/timeseries/ips", params={**params, "step": "1s"}).status_code == 400
+    r = client.get("/api/timeseries/ips", params={**params, "step": "1h", "split": "severity"})
+    assert r.status_code == 200, r.text
+    assert r.json()["points"] == 24 and r.json()["step"] == 3600
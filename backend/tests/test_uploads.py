@@ -0,0 +1,88 @@
+import hashlib
+
+from conftest import DAY
+
+CHUNK = 64 * 1024
+
+
+def _initiate(client, data: bytes, sha256: str = None):
+    r = client.post("/api/uploads/ips", data={
+        "selectedDate": DAY, "size": len(data), "sha256": sha256 or hashlib.sha256(data).hexdigest(),
+        "chunkSize": CHUNK, "device": "FGT-UP",
+    })
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _put(client, upload_id: str, data: bytes, offset: int, sha256: str = None):
+    headers = {"X-Chunk-Sha256": sha256 or hashlib.sha256(data).hexdigest()}
+    return client.put(f"/api/uploads/{upload_id}", params={"offset": offset}, content=data, headers=headers)
+
+
+def test_chunked_upload_resumes_missing_ranges(client, main, ips_log):
+    data = ips_log.read_bytes()
+    session = _initiate(client, data)
+    upload_id = session["upload_id"]
+    assert session["missing"] == [[0, len(data)]]
+
+    offsets = list(range(0, len(data), CHUNK))
+    # out of order, skipping the second chunk (a dropped connection)
+    for offset in reversed(offsets):
+        if offset != offsets[1]:
+            assert _put(client, upload_id, data[offset:offset + CHUNK], offset).status_code == 200
+
+    status = client.get(f"/api/uploads/{upload_id}").json()
+    assert status["missing"] == [[offsets[1], offsets[1] + CHUNK]]
+    assert not status["complete"]
+    assert client.post(f"/api/uploads/{upload_id}/complete").status_code == 409
+
+    # the resume sends only what is missing
+    start, end = status["missing"][0]
+    assert _put(client, upload_id, data[start:end], start).json()["complete"]
+    r = client.post(f"/api/uploads/{upload_id}/complete")
+    assert r.status_code == 200, r.text
+    dest = main.raw_log_path("ips", DAY, "FGT-UP")
+    assert dest.read_bytes() == data
+    assert r.json()["sha256"] == hashlib.sha256(data).hexdigest()
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+
+
+def test_chunk_with_bad_checksum_is_not_recorded(client):
+    data = b"x" * (CHUNK * 2)
+    upload_id = _initiate(client, data)["upload_id"]
+    r = _put(client, upload_id, data[:CHUNK], 0, sha256="0" * 64)
+    assert r.status_code == 422
+    assert client.get(f"/api/uploads/{upload_id}").json()["missing"] == [[0, len(data)]]
+    client.delete(f"/api/uploads/{upload_id}")
+
+
+def test_whole_file_checksum_is_verified(client, main):
+    data = b"line\n" * 1000
+    upload_id = _initiate(client, data, sha256=hashlib.sha256(b"something else").hexdigest())["upload_id"]
+    assert _put(client, upload_id, data, 0).json()["complete"]
+    r = client.post(f"/api/uploads/{upload_id}/complete")
+    assert r.status_code == 422
+    # the upload is kept so the ranges can be re-sent
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 200
+    client.delete(f"/api/uploads/{upload_id}")
+
+
+def test_chunk_past_declared_size_is_refused(client):
+    data = b"y" * 100
+    upload_id = _initiate(client, data)["upload_id"]
+    assert _put(client, upload_id, data + b"extra", 0).status_code == 416
+    assert _put(client, upload_id, data, 101).status_code == 416
+    client.delete(f"/api/uploads/{upload_id}")
+
+
+def test_a_bad_chunk_leaves_received_ranges_intact(client, main):
+    data = b"z" * (CHUNK * 2)
+    upload_id = _initiate(client, data)["upload_id"]
+    assert _put(client, upload_id, data[:CHUNK], 0).status_code == 200
+    # a corrupted retry of the same range
+    assert _put(client, upload_id, b"!" * CHUNK, 0, sha256=hashlib.sha256(data[:CHUNK]).hexdigest()).status_code == 422
+    assert _put(client, upload_id, data[CHUNK:], CHUNK).json()["complete"]
+    r = client.post(f"/api/uploads/{upload_id}/complete")
+    assert r.status_code == 200, r.text
+    assert main.raw_log_path("ips", DAY, "FGT-UP").read_bytes() == data
+    assert not list(main.raw_log_path("ips", DAY, "FGT-UP").parent.glob(".uploads/*.chunk"))
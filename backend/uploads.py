@@ -0,0 +1,253 @@
+"""
+Resumable chunked uploads for multi-GB raw logs.
+
+Protocol (see the /api/uploads routes in main.py):
+  1. initiate  — client sends target date, total size and sha256; the server
+                 preallocates ``Raw Logs/.uploads/<id>.part``
+  2. PUT chunk — raw bytes staged in ``<id>.<n>.chunk``, then copied in at
+                 ``offset`` once complete and checked (any order, retries ok)
+  3. status    — merged list of received byte ranges, so a client can resume
+  4. finalize  — whole-file sha256 is verified, then the file is atomically
+                 renamed to its canonical ``disk-<type>-YYYY_MM_DD.log`` name
+
+Session state lives next to the partial file as JSON so an API restart does
+not lose progress.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+UPLOADS_DIRNAME = ".uploads"
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+STALE_AFTER = 7 * 24 * 3600
+ID_PATTERN = re.compile(r"^([a-z]+)-([0-9a-f]{32})$")
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _lock(upload_id: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def merge_ranges(ranges):
+    """Merge [start, end) ranges, coalescing overlaps and neighbours."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(received, size):
+    gaps, pos = [], 0
+    for start, end in received:
+        if start > pos:
+            gaps.append([pos, start])
+        pos = max(pos, end)
+    if pos < size:
+        gaps.append([pos, size])
+    return gaps
+
+
+class UploadSession:
+    def __init__(self, folder: Path, upload_id: str):
+        self.id = upload_id
+        self.folder = folder
+        self.part = folder / f"{upload_id}.part"
+        self.meta_path = folder / f"{upload_id}.json"
+        self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+
+    # -- creation / lookup -------------------------------------------------
+    @classmethod
+    def create(cls, raw_dir: Path, rtype: str, final_name: str, size: int, sha256: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE):
+        folder = raw_dir / UPLOADS_DIRNAME
+        folder.mkdir(parents=True, exist_ok=True)
+        upload_id = f"{rtype}-{uuid.uuid4().hex}"
+        part = folder / f"{upload_id}.part"
+        with open(part, "wb") as fh:
+            if size:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(fh.fileno(), 0, size)
+                else:
+                    fh.truncate(size)
+        meta = {
+            "id": upload_id,
+            "rtype": rtype,
+            "filename": final_name,
+            "size": size,
+            "sha256": sha256.lower(),
+            "chunk_size": chunk_size,
+            "received": [],
+            "created": time.time(),
+            "updated": time.time(),
+        }
+        _write_json(folder / f"{upload_id}.json", meta)
+        return cls(folder, upload_id)
+
+    @classmethod
+    def load(cls, raw_dir_for, upload_id: str):
+        """``raw_dir_for`` maps an rtype to its Raw Logs folder (None if unknown)."""
+        m = ID_PATTERN.match(upload_id or "")
+        raw_dir = raw_dir_for(m.group(1)) if m else None
+        if raw_dir is None:
+            raise UploadError(404, "Unknown upload id")
+        folder = raw_dir / UPLOADS_DIRNAME
+        if not (folder / f"{upload_id}.json").exists():
+            raise UploadError(404, "Unknown upload id")
+        return cls(folder, upload_id)
+
+    # -- protocol ------------------------------------------------------------
+    def status(self) -> dict:
+        received = self.meta["received"]
+        return {
+            "upload_id": self.id,
+            "filename": self.meta["filename"],
+            "size": self.meta["size"],
+            "chunk_size": self.meta["chunk_size"],
+            "received": received,
+            "missing": missing_ranges(received, self.meta["size"]),
+            "received_bytes": sum(e - s for s, e in received),
+            "complete": missing_ranges(received, self.meta["size"]) == [],
+        }
+
+    def open_chunk(self, offset: int):
+        if offset < 0 or offset > self.meta["size"]:
+            raise UploadError(416, "Offset outside of the declared file size")
+        return ChunkWriter(self, offset)
+
+    def record(self, start: int, end: int):
+        # caller holds _lock(self.id)
+        if end <= start:
+            return
+        # re-read so concurrent chunk writers don't drop each other's ranges
+        self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        self.meta["received"] = merge_ranges(self.meta["received"] + [[start, end]])
+        self.meta["updated"] = time.time()
+        _write_json(self.meta_path, self.meta)
+
+    def finalize(self, dest: Path) -> dict:
+        # a chunk being copied in must not land half in the hash, or after the rename
+        with _lock(self.id):
+            self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            st = self.status()
+            if not st["complete"]:
+                raise UploadError(409, f"Upload incomplete, missing ranges: {st['missing'][:10]}")
+            digest = hashlib.sha256()
+            lines = 0
+            last = b""
+            with open(self.part, "rb") as fh:
+                while chunk := fh.read(DEFAULT_CHUNK_SIZE):
+                    digest.update(chunk)
+                    lines += chunk.count(b"\n")
+                    last = chunk[-1:]
+            if last and last != b"\n":
+                lines += 1
+            if digest.hexdigest() != self.meta["sha256"]:
+                raise UploadError(422, "Checksum mismatch — re-send the ranges or start a new upload")
+            os.replace(self.part, dest)
+            self.meta_path.unlink(missing_ok=True)
+        return {"bytes": self.meta["size"], "lines": lines, "sha256": self.meta["sha256"]}
+
+    def abort(self):
+        self.part.unlink(missing_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+        for chunk in self.folder.glob(f"{self.id}.*.chunk"):
+            chunk.unlink(missing_ok=True)
+
+
+class ChunkWriter:
+    """Stages one PUT body, then copies it into the partial file and records the range.
+
+    Nothing reaches ``.part`` before the whole body is in and its checksum
+    matches: a bad or cut-off chunk would otherwise overwrite bytes of
+    ranges already received.
+    """
+
+    def __init__(self, session: UploadSession, offset: int):
+        self.session = session
+        self.offset = offset
+        self.pos = offset
+        self.sha256 = hashlib.sha256()
+        self.path = session.folder / f"{session.id}.{uuid.uuid4().hex[:12]}.chunk"
+        self._fh = open(self.path, "w+b")
+
+    def write(self, data: bytes):
+        if self.pos + len(data) > self.session.meta["size"]:
+            self.discard()
+            raise UploadError(416, "Chunk extends past the declared file size")
+        self._fh.write(data)
+        self.sha256.update(data)
+        self.pos += len(data)
+
+    def close(self, expected_sha256: str = None) -> dict:
+        try:
+            if expected_sha256 and self.sha256.hexdigest() != expected_sha256.lower():
+                # never copied in: the range stays as it was
+                raise UploadError(422, "Chunk checksum mismatch")
+            self._fh.seek(0)
+            with _lock(self.session.id):
+                if not self.session.meta_path.exists():
+                    raise UploadError(404, "Upload already completed or aborted")
+                with open(self.session.part, "r+b") as part:
+                    part.seek(self.offset)
+                    while data := self._fh.read(DEFAULT_CHUNK_SIZE):
+                        part.write(data)
+                    part.flush()
+                    os.fsync(part.fileno())
+                self.session.record(self.offset, self.pos)
+        finally:
+            self.discard()
+        return self.session.status()
+
+    def discard(self):
+        if not self._fh.closed:
+            self._fh.close()
+        self.path.unlink(missing_ok=True)
+
+
+def purge_stale(raw_dir: Path, max_age: float = STALE_AFTER) -> int:
+    folder = raw_dir / UPLOADS_DIRNAME
+    if not folder.exists():
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for meta in folder.glob("*.json"):
+        try:
+            if meta.stat().st_mtime < cutoff:
+                meta.with_suffix(".part").unlink(missing_ok=True)
+                meta.unlink()
+                removed += 1
+        except OSError:
+            pass
+    # staged bodies of PUTs that never finished (the API was killed mid-chunk)
+    for chunk in folder.glob("*.chunk"):
+        try:
+            if chunk.stat().st_mtime < cutoff:
+                chunk.unlink()
+        except OSError:
+            pass
+    return removed
+
+
+def _write_json(path: Path, data: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
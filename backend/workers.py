@@ -0,0 +1,262 @@
+"""
+Warm generator worker processes.
+
+Starting ``python script.py`` per job pays for importing pandas, matplotlib
+and BeautifulSoup every time. Instead each worker is a long-lived process
+that imports those once and then calls the generator scripts' ``generate()``
+function for every job it is handed. Workers are separate processes, so a
+generator that crashes, leaks or hangs only takes its own worker down; the
+pool replaces it.
+
+Workers run at a lower CPU priority and can be capped on address space
+(enforced by the kernel) and resident memory (checked by the parent while a
+job runs), so one huge log cannot starve the API process.
+"""
+
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import traceback
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from pathlib import Path
+
+PRELOAD = ("pandas", "matplotlib", "matplotlib.pyplot", "bs4")
+# recycle a worker after this many jobs to bound slow leaks in long-lived processes
+MAX_TASKS_PER_WORKER = 50
+
+
+class WorkerCancelled(Exception):
+    pass
+
+
+class Limits:
+    """Per-worker resource limits; 0 means no limit."""
+
+    def __init__(self, nice: int = 0, max_address_space: int = 0, max_rss: int = 0):
+        self.nice = nice
+        self.max_address_space = max_address_space
+        self.max_rss = max_rss
+
+
+def rss_bytes(pid: int):
+    """Resident set size of ``pid`` from /proc (None where that is not available)."""
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# ---------------------------
+# Child process side
+# ---------------------------
+_modules = {}
+
+
+def _load_generator(script: str):
+    """Import a generator script by path (names have spaces), reloading it if edited."""
+    path = Path(script)
+    mtime = path.stat().st_mtime_ns
+    cached = _modules.get(script)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    name = "generator_" + "".join(c if c.isalnum() else "_" for c in f"{path.parent.name}_{path.stem}")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _modules[script] = (mtime, module)
+    return module
+
+
+def _profiled(func, path: str, *args):
+    """Call ``func(*args)`` under cProfile and write the stats to ``path`` (even if it raises)."""
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(path)
+
+
+def execute(task: dict) -> dict:
+    """Run one generator job; stdout/stderr go to the job's log file.
+
+    With ``task["profile"]`` set to a path, ``generate()`` runs under cProfile
+    and the pstats file is written there.
+    """
+    with open(task["log_file"], "a", encoding="utf-8") as fh, redirect_stdout(fh), redirect_stderr(fh):
+        try:
+            module = _load_generator(task["script"])
+            if task.get("profile"):
+                summary = _profiled(module.generate, task["profile"], task.get("date"))
+            else:
+                summary = module.generate(task.get("date"))
+            return {"summary": summary}
+        except (FileNotFoundError, ValueError) as e:
+            print(e)
+            return {"error": str(e)}
+        except MemoryError:
+            traceback.print_exc()
+            return {"error": "Generation ran out of memory (worker address space limit)"}
+        except Exception as e:
+            traceback.print_exc()
+            return {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            fh.flush()
+
+
+def _apply_limits(limits: Limits):
+    if limits.nice:
+        try:
+            os.nice(limits.nice)
+        except (AttributeError, OSError) as e:
+            print(f"Worker could not lower its priority: {e}", file=sys.stderr)
+    if limits.max_address_space:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (limits.max_address_space, limits.max_address_space))
+        except (ImportError, ValueError, OSError) as e:
+            # Windows has no resource module; the RSS watchdog still applies
+            print(f"Worker address space limit not applied: {e}", file=sys.stderr)
+
+
+def _worker_main(conn, preload, limits=None):
+    _apply_limits(limits or Limits())
+    import matplotlib
+    matplotlib.use("Agg")
+    # generators import progress via their own sys.path bootstrap; share this copy
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import progress
+    progress.set_sink(lambda update: conn.send(("progress", update)))
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Worker preload skipped {name}: {e}", file=sys.stderr)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+        progress.reset()
+        result = execute(task)
+        result["timings"] = progress.finish()
+        conn.send(("result", result))
+
+
+# ---------------------------
+# Parent side
+# ---------------------------
+class WorkerProcess:
+    def __init__(self, ctx, limits: Limits = None):
+        self._ctx = ctx
+        self.limits = limits or Limits()
+        self.tasks = 0
+        self._spawn()
+
+    def _spawn(self):
+        self.conn, child = self._ctx.Pipe()
+        self.proc = self._ctx.Process(target=_worker_main, args=(child, PRELOAD, self.limits),
+                                      name="generate-worker", daemon=True)
+        self.proc.start()
+        child.close()
+        self.tasks = 0
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    def restart(self):
+        self.stop(timeout=0)
+        self._spawn()
+
+    def stop(self, timeout: float = 5):
+        if self.proc.is_alive():
+            try:
+                if timeout:
+                    self.conn.send(None)
+                    self.proc.join(timeout)
+            except (OSError, BrokenPipeError):
+                pass
+            if self.proc.is_alive():
+                self.proc.kill()
+                self.proc.join()
+        self.conn.close()
+
+    def run(self, task: dict, cancel_event, timeout: float, on_progress=None) -> dict:
+        """Run ``task`` in this worker. Progress messages from the generator are
+        passed to ``on_progress(dict)`` as they arrive."""
+        if not self.proc.is_alive():
+            self._spawn()
+        self.conn.send(task)
+        self.tasks += 1
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.conn.poll(0.25):
+                try:
+                    kind, payload = self.conn.recv()
+                except EOFError:
+                    kind, payload = None, None
+                if kind == "progress" and on_progress:
+                    on_progress(payload)
+                elif kind == "result":
+                    if self.tasks >= MAX_TASKS_PER_WORKER:
+                        self.restart()
+                    return payload
+            if not self.proc.is_alive():
+                code = self.proc.exitcode
+                self._spawn()
+                return {"error": f"Generator worker crashed (exit code {code})"}
+            if cancel_event.is_set():
+                self.restart()
+                raise WorkerCancelled()
+            if time.monotonic() > deadline:
+                self.restart()
+                return {"error": f"Generation timed out after {timeout:.0f}s"}
+            if self.limits.max_rss:
+                rss = rss_bytes(self.proc.pid)
+                if rss and rss > self.limits.max_rss:
+                    self.restart()
+                    return {"error": f"Generation exceeded the memory limit "
+                                     f"({rss // 2**20} MiB > {self.limits.max_rss // 2**20} MiB)"}
+
+
+class WorkerPool:
+    def __init__(self, size: int, limits: Limits = None):
+        self.size = size
+        self.limits = limits or Limits()
+        # spawn: same behaviour on Windows and Linux, no forked API state
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._all = []
+
+    def start(self):
+        if self._all:
+            return
+        for _ in range(self.size):
+            worker = WorkerProcess(self._ctx, self.limits)
+            self._all.append(worker)
+            self._idle.put(worker)
+
+    @contextmanager
+    def worker(self):
+        worker = self._idle.get()
+        try:
+            yield worker
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        for worker in self._all:
+            worker.stop(timeout=2)
+        self._all = []
+        self._idle = queue.Queue()
+
+    def pids(self):
+        return [w.pid for w in self._all]
@@ -18,8 +18,12 @@ def normalize_month(arg):
         return f"{year}{month:02d}"
     return arg.replace('-', '').replace('_', '')
 
-if __name__ == '__main__':
-    arg = sys.argv[1] if len(sys.argv) > 1 else None
-    norm = normalize_month(arg)
+def generate(month_arg=None):
+    norm = normalize_month(month_arg)
     print(f"Antivirus monthly generator called with month: {norm}")
     # TODO: implement aggregation of daily_reports into monthly report
+    return {"report": None, "month": norm}
+
+
+if __name__ == '__main__':
+    generate(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -17,8 +17,18 @@ import os
 import re
 
 os.system("")  # Enable colors in Windows terminal
+# progress reporting lives in backend/ (silent unless run by the API's workers)
+BACKEND_DIR = Path(__file__).resolve().parents[3] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+import eventstore
+import progress
+
 ## How to generate the
 BASE_FOLDER = Path(__file__).parent
+# FORTI_REPORT_DIR swaps in another report tree with the same folder names (benchmarks)
+if os.environ.get("FORTI_REPORT_DIR"):
+    BASE_FOLDER = Path(os.environ["FORTI_REPORT_DIR"]) / BASE_FOLDER.name
 DAILY_REPORTS_FOLDER = BASE_FOLDER / "daily_reports"
 MONTHLY_OUTPUT = BASE_FOLDER / "monthly_reports"
 MONTHLY_OUTPUT.mkdir(parents=True, exist_ok=True)
@@ -100,40 +110,37 @@ def extract_category_counts(html_path):
     except:
         return {}
 
+def query_dns_day(day):
+    """(domains, category counts) for a stored day, shaped like the two extract_* results"""
+    notable = eventstore.NOTABLE_SQL["dns"]
+    domains = day.frame(
+        "SELECT lower(qname) AS fqdn, lower(COALESCE(action, 'pass')) AS action, COUNT(*) AS count"
+        f" FROM events WHERE {notable} AND qname IS NOT NULL GROUP BY 1, 2")
+    categories = {}
+    for cat, count in day.query(f"SELECT COALESCE(cat, '0'), COUNT(*) FROM events WHERE {notable} GROUP BY 1"):
+        name = eventstore.DNS_CATEGORIES.get(cat, "Other")
+        categories[name] = categories.get(name, 0) + count
+    return domains, categories
+
 # ═══════════════════════════════════════════════════════════════════
-def main():
-    # Accept optional month argument (YYYYMM or YYYY_MM or YYYY-MM)
-    if len(sys.argv) > 1:
-        raw = sys.argv[1]
-        month_str = raw.replace('_', '').replace('-', '')
+def generate(month_arg=None):
+    """DNS monthly recap for YYYYMM (default last month); returns a summary dict."""
+    if month_arg:
+        month_str = month_arg.replace('_', '').replace('-', '')
     else:
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                month_str = get_month_from_user()
-            else:
-                now = datetime.now(); y, m = now.year, now.month - 1
-                if m == 0: m, y = 12, y - 1
-                month_str = f"{y}{m:02d}"
-        except Exception:
-            now = datetime.now(); y, m = now.year, now.month - 1
-            if m == 0: m, y = 12, y - 1
-            month_str = f"{y}{m:02d}"
+        now = datetime.now(); y, m = now.year, now.month - 1
+        if m == 0: m, y = 12, y - 1
+        month_str = f"{y}{m:02d}"
 
     month_name = datetime.strptime(month_str, "%Y%m").strftime("%B %Y")
 
     # Find all daily DNS reports for this month
     pattern = f"DNS_Events_Report_{month_str}*.html"
-    daily_files = sorted(DAILY_REPORTS_FOLDER.glob(pattern))
+    daily_files = eventstore.month_sources(BASE_FOLDER, month_str, DAILY_REPORTS_FOLDER.glob(pattern))
 
     if not daily_files:
         print(f"\nNo daily DNS reports found for {month_name}")
-        print(f"Looking for: {pattern}")
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                input("\nPress Enter to exit...")
-        except Exception:
-            pass
-        return
+        raise FileNotFoundError(f"Looking for: {pattern}")
 
     print(f"\nFound {len(daily_files)} daily reports -> compiling {month_name}...\n")
 
@@ -141,25 +148,23 @@ def main():
     all_categories = {}
     total_events = 0
 
-    for file in daily_files:
-        df_day = extract_dns_events(file)
+    progress.stage("read")
+    for file in progress.iterate(daily_files):
+        if isinstance(file, eventstore.Day):
+            df_day, cat_day = query_dns_day(file)
+        else:
+            df_day, cat_day = extract_dns_events(file), extract_category_counts(file)
         if not df_day.empty:
             all_domains.append(df_day)
             total_events += df_day['count'].sum()
 
-        cat_day = extract_category_counts(file)
         for cat, cnt in cat_day.items():
             all_categories[cat] = all_categories.get(cat, 0) + cnt
 
     if not all_domains:
-        print("No malicious DNS events found in any daily report.")
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                input()
-        except Exception:
-            pass
-        return
+        raise ValueError("No malicious DNS events found in any daily report.")
 
+    progress.stage("aggregate")
     monthly_domains = pd.concat(all_domains, ignore_index=True)
     monthly_domains = monthly_domains.groupby(["fqdn", "action"], as_index=False)["count"].sum()
     monthly_domains = monthly_domains.sort_values("count", ascending=False)
@@ -175,6 +180,7 @@ def main():
     # Action breakdown
     action_counts = monthly_domains['action'].value_counts()
 
+    progress.stage("render")
     # === Generate Pie Charts ===
     def make_pie(data, title, colors=None):
         fig, ax = plt.subplots(figsize=(8, 6))
@@ -250,6 +256,7 @@ def main():
     </footer>
 </div></body></html>"""
 
+    progress.stage("write")
     report_file.write_text(html, encoding="utf-8")
     print("\n" + "=" * 80)
     print("DNS MONTHLY REPORT SUCCESSFULLY CREATED!")
@@ -257,11 +264,29 @@ def main():
     print(f"-> Total malicious DNS events: {total_events:,}")
     print(f"-> From {len(daily_files)} daily reports")
     print("=" * 80)
+    return {"report": str(report_file), "month": month_str,
+            "daily_reports": len(daily_files), "events": int(total_events)}
+
+
+def main():
+    # Accept optional month argument (YYYYMM or YYYY_MM or YYYY-MM)
+    month_arg = sys.argv[1] if len(sys.argv) > 1 else None
+    interactive = False
     try:
-        if sys.stdin and sys.stdin.isatty():
-            input("\nPress Enter to finish...")
+        interactive = bool(sys.stdin and sys.stdin.isatty())
     except Exception:
         pass
+    if month_arg is None and interactive:
+        month_arg = get_month_from_user()
+    try:
+        generate(month_arg)
+        code = 0
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        code = 1
+    if interactive:
+        input("\nPress Enter to finish...")
+    return code
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -19,7 +19,17 @@ import re
 
 os.system("")  # Enable colors in Windows terminal
 
+# progress reporting lives in backend/ (silent unless run by the API's workers)
+BACKEND_DIR = Path(__file__).resolve().parents[3] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+import eventstore
+import progress
+
 BASE_FOLDER = Path(__file__).parent
+# FORTI_REPORT_DIR swaps in another report tree with the same folder names (benchmarks)
+if os.environ.get("FORTI_REPORT_DIR"):
+    BASE_FOLDER = Path(os.environ["FORTI_REPORT_DIR"]) / BASE_FOLDER.name
 DAILY_REPORTS_FOLDER = BASE_FOLDER / "daily_reports"
 MONTHLY_OUTPUT = BASE_FOLDER / "monthly_reports"
 MONTHLY_OUTPUT.mkdir(parents=True, exist_ok=True)
@@ -61,20 +71,21 @@ def extract_ips_events(html_path):
         data = []
         total_count = 0
 
+        # Rank | Attack Name | Count | Action | Source IP Example
         for row in rows[1:]:
             cols = [td.get_text(strip=True) for td in row.find_all("td")]
             if len(cols) < 3: continue
 
-            attack = cols[0].replace("**", "").strip()
+            attack = cols[1].replace("**", "").strip()
             try:
                 count = int(cols[2].replace(",", ""))
             except:
                 continue
 
             total_count += count
-            srcip = cols[3] if len(cols) > 3 else "N/A"
-            country = cols[4] if len(cols) > 4 else "N/A"
-            dstip = cols[5] if len(cols) > 5 else "N/A"
+            srcip = cols[4] if len(cols) > 4 else "N/A"
+            country = "N/A"
+            dstip = "N/A"
 
             data.append({
                 "attack": attack,
@@ -84,6 +95,14 @@ def extract_ips_events(html_path):
                 "dstip": dstip
             })
 
+        # The day's trend point: the headline count covers every critical event, the table only the top 10
+        headline = soup.select_one(".stats span")
+        if headline:
+            try:
+                total_count = int(headline.get_text(strip=True).replace(",", ""))
+            except ValueError:
+                pass
+
         # Extract date from filename
         date_match = re.search(r"IPS_Critical_Events_(\d{8})", html_path.name)
         report_date = datetime.strptime(date_match.group(1), "%Y%m%d").date() if date_match else None
@@ -93,37 +112,32 @@ def extract_ips_events(html_path):
         print(f"Error reading {html_path.name}: {e}")
         return pd.DataFrame(), 0, None
 
-def main():
-    # Accept optional month argument
-    if len(sys.argv) > 1:
-        raw = sys.argv[1]
-        month_str = raw.replace('_', '').replace('-', '')
+def query_ips_events(day):
+    """Same shape as extract_ips_events, from the day's stored events (every critical event, not a top 10)"""
+    df = day.frame(
+        "SELECT COALESCE(attack, msg, 'Unknown Attack') AS attack, COALESCE(srcip, 'Unknown') AS srcip,"
+        " COALESCE(srccountry, 'Unknown') AS country, COALESCE(dstip, dst, destip, 'N/A') AS dstip,"
+        f" COUNT(*) AS count FROM events WHERE {eventstore.NOTABLE_SQL['ips']} GROUP BY 1, 2, 3, 4")
+    return df, int(df["count"].sum()), datetime.strptime(day.ymd, "%Y%m%d").date()
+
+def generate(month_arg=None):
+    """IPS monthly recap for YYYYMM (default last month). Returns a summary dict."""
+    if month_arg:
+        month_str = month_arg.replace('_', '').replace('-', '')
     else:
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                month_str = get_month_from_user()
-            else:
-                now = datetime.now()
-                y, m = now.year, now.month - 1
-                if m == 0: m, y = 12, y - 1
-                month_str = f"{y}{m:02d}"
-        except:
-            now = datetime.now()
-            y, m = now.year, now.month - 1
-            if m == 0: m, y = 12, y - 1
-            month_str = f"{y}{m:02d}"
+        now = datetime.now()
+        y, m = now.year, now.month - 1
+        if m == 0: m, y = 12, y - 1
+        month_str = f"{y}{m:02d}"
 
     month_name = datetime.strptime(month_str, "%Y%m").strftime("%B %Y")
 
     pattern = f"IPS_Critical_Events_{month_str}*.html"
-    daily_files = sorted(DAILY_REPORTS_FOLDER.glob(pattern))
+    daily_files = eventstore.month_sources(BASE_FOLDER, month_str, DAILY_REPORTS_FOLDER.glob(pattern))
 
     if not daily_files:
         print(f"\nNo daily IPS reports found for {month_name}")
-        print(f"Looking for: {pattern}")
-        if sys.stdin.isatty():
-            input("\nPress Enter to exit...")
-        return
+        raise FileNotFoundError(f"Looking for: {pattern}")
 
     print(f"\nFound {len(daily_files)} daily reports -> compiling {month_name}...\n")
 
@@ -131,8 +145,12 @@ def main():
     daily_counts = {}
     total_events = 0
 
-    for file in daily_files:
-        df_day, day_count, day_date = extract_ips_events(file)
+    progress.stage("read")
+    for file in progress.iterate(daily_files):
+        if isinstance(file, eventstore.Day):
+            df_day, day_count, day_date = query_ips_events(file)
+        else:
+            df_day, day_count, day_date = extract_ips_events(file)
         if not df_day.empty:
             all_attacks.append(df_day)
             total_events += day_count
@@ -140,16 +158,15 @@ def main():
                 daily_counts[day_date.day] = day_count
 
     if not all_attacks:
-        print("No IPS events found in any daily report.")
-        if sys.stdin.isatty():
-            input("\nPress Enter...")
-        return
+        raise ValueError("No IPS events found in any daily report.")
 
+    progress.stage("aggregate")
     monthly_df = pd.concat(all_attacks, ignore_index=True)
     monthly_summary = monthly_df.groupby(["attack", "srcip", "country", "dstip"], as_index=False)["count"].sum()
     monthly_summary = monthly_summary.sort_values("count", ascending=False)
     top_attacks = monthly_summary.head(15)
 
+    progress.stage("render")
     # === Daily Trend Line Chart ===
     days_in_month = pd.date_range(f"{month_str}01", periods=31, freq='D')
     trend_data = pd.Series(0, index=range(1, 32))
@@ -219,6 +236,7 @@ def main():
 </body>
 </html>"""
 
+    progress.stage("write")
     report_file.write_text(html, encoding="utf-8")
     print("\n" + "=" * 85)
     print("IPS MONTHLY REPORT SUCCESSFULLY CREATED!")
@@ -227,8 +245,28 @@ def main():
     print(f"→ Total Events   : {total_events:,}")
     print(f"→ Daily Reports  : {len(daily_files)}")
     print("=" * 85)
-    if sys.stdin.isatty():
+    return {"report": str(report_file), "month": month_str,
+            "daily_reports": len(daily_files), "events": total_events}
+
+
+def main():
+    # Accept optional month argument
+    month_arg = sys.argv[1] if len(sys.argv) > 1 else None
+    try:
+        interactive = bool(sys.stdin and sys.stdin.isatty())
+    except:
+        interactive = False
+    if month_arg is None and interactive:
+        month_arg = get_month_from_user()
+    try:
+        generate(month_arg)
+        code = 0
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        code = 1
+    if interactive:
         input("\nPress Enter to finish...")
+    return code
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
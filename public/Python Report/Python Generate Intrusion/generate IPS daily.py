@@ -1,13 +1,24 @@
 # generate_ips_yesterday.py ← FortiGate IPS Critical Events Report (YESTERDAY) – CLEAN VERSION
 
 import sys
+import os
 import pandas as pd
 import re
 from pathlib import Path
 from datetime import datetime, timedelta
 import json
 
+# progress reporting lives in backend/ (silent unless run by the API's workers)
+BACKEND_DIR = Path(__file__).resolve().parents[3] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+import eventstore
+import progress
+
 BASE_FOLDER = Path(__file__).parent
+# FORTI_REPORT_DIR swaps in another report tree with the same folder names (benchmarks)
+if os.environ.get("FORTI_REPORT_DIR"):
+    BASE_FOLDER = Path(os.environ["FORTI_REPORT_DIR"]) / BASE_FOLDER.name
 RAW_LOG_FOLDER   = BASE_FOLDER / "Raw Logs"
 OUTPUT_FOLDER    = BASE_FOLDER / "daily_reports"
 ERROR_FOLDER     = BASE_FOLDER / "error_logs"
@@ -61,40 +72,34 @@ def parse_raw_line(line):
         result[key] = quoted if quoted else unquoted
     return result
 
-def main():
-    if len(sys.argv) > 1:
+def generate(date_arg=None):
+    """IPS critical events report for YYYY_MM_DD (default yesterday). Returns a summary dict."""
+    if date_arg:
         try:
-            report_date = datetime.strptime(sys.argv[1], "%Y_%m_%d")
+            report_date = datetime.strptime(date_arg, "%Y_%m_%d")
         except Exception:
-            print("Invalid date format. Use YYYY_MM_DD.")
-            return
+            raise ValueError("Invalid date format. Use YYYY_MM_DD.")
     else:
         report_date = datetime.now() - timedelta(days=1)
 
     log_file, _ = find_log_for_date(report_date)
     if not log_file:
         log_error(f"IPS log not found for {report_date.strftime('%Y_%m_%d')}!")
-        input("\nPress Enter to exit...")
-        return
+        raise FileNotFoundError(f"IPS log not found for {report_date.strftime('%Y_%m_%d')}!")
 
     print(f"Processing IPS events for: {report_date.strftime('%d %B %Y')}\n")
 
-    logs = []
-    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            parsed = parse_raw_line(line)
-            if parsed and parsed.get("subtype") == "ips" and parsed.get("eventtype") == "signature":
-                logs.append(parsed)
+    df = eventstore.load_day(BASE_FOLDER, "ips", report_date.strftime("%Y%m%d"), log_file, parse_raw_line)
 
-    if not logs:
+    if df.empty:
         log_error("No IPS events found in the log!")
-        input("Press Enter...")
-        return
+        raise ValueError("No IPS events found in the log!")
 
-    df = pd.DataFrame(logs)
+    progress.stage("to_datetime")
     df['datetime'] = pd.to_datetime(df.get('date','') + ' ' + df.get('time',''), errors='coerce')
     df = df.dropna(subset=['datetime']).sort_values('datetime')
 
+    progress.stage("aggregate")
     # Normalize fields
     df['severity'] = df.get('severity', '').str.lower()
     df['action']   = df.get('action', '').str.lower()
@@ -123,6 +128,7 @@ def main():
 
     report_file = OUTPUT_FOLDER / f"IPS_Critical_Events_{report_date:%Y%m%d}.html"
 
+    progress.stage("render")
     html = f"""<!DOCTYPE html>
 <html>
 <head>
@@ -226,6 +232,7 @@ def main():
 </body>
 </html>"""
 
+    progress.stage("write")
     report_file.write_text(html, encoding='utf-8')
     print("="*80)
     print("SUCCESS! IPS Report Generated!")
@@ -233,12 +240,24 @@ def main():
     print(f"→ Events       : {total_critical:,}")
     print(f"→ File         : {report_file.name}")
     print("="*80)
+    return {"report": str(report_file), "date": report_date.strftime("%Y_%m_%d"),
+            "log_file": log_file.name, "total": len(df), "events": total_critical}
+
+
+def main():
+    try:
+        generate(sys.argv[1] if len(sys.argv) > 1 else None)
+        code = 0
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        code = 1
 
     try:
         if sys.stdin.isatty():
             input("\nPress Enter to close...")
     except:
         pass
+    return code
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
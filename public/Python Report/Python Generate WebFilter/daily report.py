@@ -1,12 +1,23 @@
 # generate_daily_yesterday.py ← Always processes YESTERDAY's Web Filter log
 
 import sys
+import os
 import pandas as pd
 import re
 from pathlib import Path
 from datetime import datetime, timedelta
 
+# progress reporting lives in backend/ (silent unless run by the API's workers)
+BACKEND_DIR = Path(__file__).resolve().parents[3] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+import eventstore
+import progress
+
 BASE_FOLDER = Path(__file__).parent
+# FORTI_REPORT_DIR swaps in another report tree with the same folder names (benchmarks)
+if os.environ.get("FORTI_REPORT_DIR"):
+    BASE_FOLDER = Path(os.environ["FORTI_REPORT_DIR"]) / BASE_FOLDER.name
 RAW_LOG_FOLDER   = BASE_FOLDER / "Raw Logs"
 OUTPUT_FOLDER    = BASE_FOLDER / "daily_reports"
 ERROR_FOLDER     = BASE_FOLDER / "error_logs"
@@ -69,43 +80,40 @@ def create_count_table(series, title, col1, col2, top_n=10):
     return f"<h2>{title}</h2>" + df.to_html(index=False, border=0, classes="table")
 
 
-def main():
-    # Accept date argument (YYYY_MM_DD), else use yesterday
-    if len(sys.argv) > 1:
+def generate(date_arg=None):
+    """Build the report for ``date_arg`` (YYYY_MM_DD, default yesterday) and return a summary.
+
+    Raises FileNotFoundError / ValueError when there is nothing to report on.
+    """
+    if date_arg:
         try:
-            report_date = datetime.strptime(sys.argv[1], "%Y_%m_%d")
+            report_date = datetime.strptime(date_arg, "%Y_%m_%d")
         except Exception:
-            print("Invalid date format. Use YYYY_MM_DD.")
-            return
+            raise ValueError("Invalid date format. Use YYYY_MM_DD.")
     else:
         report_date = datetime.now() - timedelta(days=1)
 
     log_file, _ = find_log_for_date(report_date)
 
     if not log_file:
-        log_error(f"Web Filter log not found for {report_date.strftime('%Y_%m_%d')}!\nLooking for: disk-webfilter-{report_date.strftime('%Y_%m_%d')}.log")
-        input("\nPress Enter to exit...")
-        return
+        message = f"Web Filter log not found for {report_date.strftime('%Y_%m_%d')}!\nLooking for: disk-webfilter-{report_date.strftime('%Y_%m_%d')}.log"
+        log_error(message)
+        raise FileNotFoundError(message)
 
     print(f"Processing data for: {report_date.strftime('%d %B %Y')}")
     print(f"Log file: {log_file.name}\n")
 
-    logs = []
-    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            parsed = parse_raw_line(line)
-            if parsed:
-                logs.append(parsed)
+    df = eventstore.load_day(BASE_FOLDER, "webfilter", report_date.strftime("%Y%m%d"), log_file, parse_raw_line)
 
-    if not logs:
+    if df.empty:
         log_error("No valid log entries found!")
-        input("Press Enter...")
-        return
+        raise ValueError("No valid log entries found!")
 
-    df = pd.DataFrame(logs)
+    progress.stage("to_datetime")
     df['datetime'] = pd.to_datetime(df['date'] + ' ' + df['time'], errors='coerce')
     df = df.dropna(subset=['datetime']).sort_values('datetime').reset_index(drop=True)
 
+    progress.stage("aggregate")
     # Blocked web requests
     blocked = df[
         (df['action'] == 'blocked') & 
@@ -122,6 +130,7 @@ def main():
     # Use selected date for filename
     report_file = OUTPUT_FOLDER / f"WebFilter_Blocked_{report_date:%Y%m%d}.html"
 
+    progress.stage("render")
     html = f"""
     <html>
     <head>
@@ -177,6 +186,7 @@ def main():
     </html>
     """
 
+    progress.stage("write")
     report_file.write_text(html, encoding='utf-8')
 
     print("="*80)
@@ -185,11 +195,25 @@ def main():
     print(f"→ Saved as    : {report_file.name}")
     print(f"→ Blocked URLs: {len(blocked):,}")
     print("="*80)
+    return {"report": str(report_file), "date": report_date.strftime("%Y_%m_%d"),
+            "log_file": log_file.name, "total": len(df), "events": len(blocked)}
+
+
+def main():
+    # Accept date argument (YYYY_MM_DD), else use yesterday
+    try:
+        generate(sys.argv[1] if len(sys.argv) > 1 else None)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        code = 1
+    else:
+        code = 0
     try:
         if sys.stdin and sys.stdin.isatty():
             input("\nPress Enter to close...")
     except Exception:
         pass
+    return code
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,5 +1,6 @@
 # generate_monthly.py  ← FINAL VERSION (NO PNG + OVERWRITE + PERFECT HEADERS)
 import sys
+import os
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
@@ -15,8 +16,18 @@ import re
 import base64
 from io import BytesIO
 
+# progress reporting lives in backend/ (silent unless run by the API's workers)
+BACKEND_DIR = Path(__file__).resolve().parents[3] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+import eventstore
+import progress
+
 # SMART PATHS — AUTO DETECTS YOUR FOLDER
 BASE_FOLDER = Path(__file__).parent
+# FORTI_REPORT_DIR swaps in another report tree with the same folder names (benchmarks)
+if os.environ.get("FORTI_REPORT_DIR"):
+    BASE_FOLDER = Path(os.environ["FORTI_REPORT_DIR"]) / BASE_FOLDER.name
 DAILY_REPORTS_FOLDER = BASE_FOLDER / "daily_reports"
 MONTHLY_OUTPUT_FOLDER = BASE_FOLDER / "monthly_reports"
 MONTHLY_OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
@@ -52,6 +63,12 @@ def extract_blocked_events(html_file):
         return pd.DataFrame(data)
     except: return pd.DataFrame()
 
+def query_blocked_events(day):
+    return day.frame(
+        "SELECT COALESCE(srcip, 'Unknown') AS srcip, COALESCE(hostname, '-') AS hostname,"
+        " COALESCE(url, hostname, 'Unknown') AS url, COALESCE(catdesc, 'Uncategorized') AS catdesc"
+        f" FROM events WHERE {eventstore.NOTABLE_SQL['webfilter']}")
+
 def clean_table(series, title, col1_name, col2_name="Count", top_n=10):
     if series.empty: return f"<h2>{title}</h2><p>No data</p>"
     df = series.head(top_n).to_frame(name=col2_name)
@@ -59,54 +76,39 @@ def clean_table(series, title, col1_name, col2_name="Count", top_n=10):
     df = df.reset_index()
     return f"<h2>{title}</h2>" + df.to_html(index=False, border=0, classes="table")
 
-def generate_monthly_report():
-    # Accept optional month argument (YYYYMM or YYYY_MM or YYYY-MM)
-    if len(sys.argv) > 1:
-        raw = sys.argv[1]
+def generate(month_arg=None):
+    """Monthly report for YYYYMM / YYYY_MM / YYYY-MM (default last month); returns a summary dict."""
+    if month_arg:
+        raw = month_arg
         target_month = raw.replace('-', '_') if '_' in raw or '-' in raw else f"{raw[:4]}_{raw[-2:]}"
     else:
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                target_month = get_month_from_user()
-            else:
-                d = datetime.now(); y, m = d.year, d.month - 1
-                if m == 0: m, y = 12, y-1
-                target_month = f"{y}_{m:02d}"
-        except Exception:
-            d = datetime.now(); y, m = d.year, d.month - 1
-            if m == 0: m, y = 12, y-1
-            target_month = f"{y}_{m:02d}"
+        d = datetime.now(); y, m = d.year, d.month - 1
+        if m == 0: m, y = 12, y-1
+        target_month = f"{y}_{m:02d}"
 
     month_name = datetime.strptime(target_month, "%Y_%m").strftime("%B %Y")
 
-    files = list(DAILY_REPORTS_FOLDER.glob(f"WebFilter_Blocked_{target_month.replace('_', '')}*.html"))
+    files = eventstore.month_sources(BASE_FOLDER, target_month.replace('_', ''),
+                                     DAILY_REPORTS_FOLDER.glob(f"WebFilter_Blocked_{target_month.replace('_', '')}*.html"))
     if not files:
         print(f"\nNo daily reports found for {month_name}")
-        print(f"Looking for: WebFilter_Blocked_{target_month.replace('_', '')}*.html")
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                input("\nPress Enter...")
-        except Exception:
-            pass
-        return
+        raise FileNotFoundError(f"Looking for: WebFilter_Blocked_{target_month.replace('_', '')}*.html")
 
     print(f"Found {len(files)} daily reports -> compiling {month_name}...")
 
-    dfs = [extract_blocked_events(f) for f in files]
+    progress.stage("read")
+    dfs = [query_blocked_events(f) if isinstance(f, eventstore.Day) else extract_blocked_events(f)
+           for f in progress.iterate(files)]
+    progress.stage("aggregate")
     df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
     if df.empty:
-        print("No blocked events found.")
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                input()
-        except Exception:
-            pass
-        return
+        raise ValueError("No blocked events found.")
 
     total = len(df)
     top_cats = df['catdesc'].value_counts().head(10)
     top_domains = df['hostname'].value_counts().head(10)
 
+    progress.stage("render")
     # PIE CHART → EMBEDDED IN HTML (NO PNG FILE!)
     plt.figure(figsize=(8,6))
     plt.pie(top_cats, labels=None, autopct=lambda p: f'{p:.1f}%' if p>=2 else '', startangle=90)
@@ -158,6 +160,7 @@ def generate_monthly_report():
     </div></body></html>
     """
 
+    progress.stage("write")
     report_file.write_text(html, encoding='utf-8')
     print("\n" + "="*70)
     print(f"SUCCESS! Monthly report updated")
@@ -165,11 +168,29 @@ def generate_monthly_report():
     print(f"-> Total blocked: {total:,}")
     print("   (Old report overwritten, no PNG file created)")
     print("="*70)
+    return {"report": str(report_file), "month": target_month.replace("_", ""),
+            "daily_reports": len(files), "events": total}
+
+
+def generate_monthly_report():
+    # Accept optional month argument (YYYYMM or YYYY_MM or YYYY-MM)
+    month_arg = sys.argv[1] if len(sys.argv) > 1 else None
+    interactive = False
     try:
-        if sys.stdin and sys.stdin.isatty():
-            input("\nPress Enter to close...")
+        interactive = bool(sys.stdin and sys.stdin.isatty())
     except Exception:
         pass
+    if month_arg is None and interactive:
+        month_arg = get_month_from_user()
+    try:
+        generate(month_arg)
+        code = 0
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        code = 1
+    if interactive:
+        input("\nPress Enter to close...")
+    return code
 
 if __name__ == "__main__":
-    generate_monthly_report()
\ No newline at end of file
+    sys.exit(generate_monthly_report())
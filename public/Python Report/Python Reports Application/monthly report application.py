@@ -17,7 +17,17 @@ import os
 
 os.system("")  # Enable colors/UTF-8 in Windows terminal
 
+# progress reporting lives in backend/ (silent unless run by the API's workers)
+BACKEND_DIR = Path(__file__).resolve().parents[3] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+import eventstore
+import progress
+
 BASE_FOLDER = Path(__file__).parent
+# FORTI_REPORT_DIR swaps in another report tree with the same folder names (benchmarks)
+if os.environ.get("FORTI_REPORT_DIR"):
+    BASE_FOLDER = Path(os.environ["FORTI_REPORT_DIR"]) / BASE_FOLDER.name
 DAILY_REPORTS_FOLDER = BASE_FOLDER / "daily_reports"
 MONTHLY_OUTPUT = BASE_FOLDER / "monthly_reports"
 MONTHLY_OUTPUT.mkdir(parents=True, exist_ok=True)
@@ -78,60 +88,48 @@ def extract_blocked_events(html_path):
         return pd.DataFrame()
 
 
+def query_blocked_events(day):
+    """Blocked app events of a stored day, with the daily report's column names."""
+    return day.frame(
+        "SELECT date || ' ' || time AS datetime, COALESCE(srcip, 'Unknown') AS srcip,"
+        " COALESCE(app, 'Unknown') AS app_safe, COALESCE(hostname, dstip, 'No Hostname') AS hostname_safe,"
+        " COALESCE(url, '-') AS url_safe, COALESCE(appcat, 'Uncategorized') AS appcat,"
+        " COALESCE(apprisk, 'unknown') AS apprisk, service, msg"
+        f" FROM events WHERE {eventstore.NOTABLE_SQL['appctrl']}")
+
 
 # ═══════════════════════════════════════════════════════════════════
-def main():
-    # Accept optional month argument (YYYYMM or YYYY_MM or YYYY-MM)
-    if len(sys.argv) > 1:
-        raw = sys.argv[1]
-        month_str = raw.replace('_', '').replace('-', '')
+def generate(month_arg=None):
+    """Compile the monthly report for YYYYMM (default last month) and return a summary dict."""
+    if month_arg:
+        month_str = month_arg.replace('_', '').replace('-', '')
     else:
-        # If interactive, ask user; otherwise default to last month
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                month_str = get_month_from_user()
-            else:
-                now = datetime.now()
-                y, m = now.year, now.month - 1
-                if m == 0: m, y = 12, y - 1
-                month_str = f"{y}{m:02d}"
-        except Exception:
-            now = datetime.now()
-            y, m = now.year, now.month - 1
-            if m == 0: m, y = 12, y - 1
-            month_str = f"{y}{m:02d}"
+        now = datetime.now()
+        y, m = now.year, now.month - 1
+        if m == 0: m, y = 12, y - 1
+        month_str = f"{y}{m:02d}"
     month_name = datetime.strptime(month_str, "%Y%m").strftime("%B %Y")
 
     # Find all daily HTML reports for this month
     pattern = f"AppCtrl_Blocked_{month_str}*.html"
-    daily_files = sorted(DAILY_REPORTS_FOLDER.glob(pattern))
+    daily_files = eventstore.month_sources(BASE_FOLDER, month_str, DAILY_REPORTS_FOLDER.glob(pattern))
 
     if not daily_files:
-        print(f"\nNo daily reports found: {pattern}")
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                input("\nPress Enter to exit...")
-        except Exception:
-            pass
-        return
+        raise FileNotFoundError(f"No daily reports found: {pattern}")
 
     print(f"\nFound {len(daily_files)} daily reports -> compiling {month_name}...\n")
 
     all_dataframes = []
-    for file in daily_files:
-        df_day = extract_blocked_events(file)
+    progress.stage("read")
+    for file in progress.iterate(daily_files):
+        df_day = query_blocked_events(file) if isinstance(file, eventstore.Day) else extract_blocked_events(file)
         if not df_day.empty:
             all_dataframes.append(df_day)
 
     if not all_dataframes:
-        print("No blocked events found in any daily report.")
-        try:
-            if sys.stdin and sys.stdin.isatty():
-                input()
-        except Exception:
-            pass
-        return
+        raise ValueError("No blocked events found in any daily report.")
 
+    progress.stage("aggregate")
     blocked = pd.concat(all_dataframes, ignore_index=True)
 
     cols_to_clean = ["app", "srcip", "appcat", "apprisk"]
@@ -174,6 +172,7 @@ def main():
     risk_counts = blocked['apprisk'].value_counts().reindex(risk_order, fill_value=0)
     risk_counts['unknown'] = risk_counts.get('unknown', 0)
 
+    progress.stage("render")
     # Pie charts (same as before)
     def make_pie(data, title):
         fig, ax = plt.subplots(figsize=(8,6))
@@ -250,17 +249,37 @@ def main():
     </footer>
 </div></body></html>"""
 
+    progress.stage("write")
     report_file.write_text(html, encoding="utf-8")
     print("\n" + "=" * 80)
     print("MONTHLY REPORT SUCCESSFULLY CREATED!")
     print(f"-> {report_file.name}")
     print(f"-> {total_blocked:,} blocked events from {len(daily_files)} daily reports")
     print("=" * 80)
+    return {"report": str(report_file), "month": month_str,
+            "daily_reports": len(daily_files), "events": total_blocked}
+
+
+def main():
+    # Accept optional month argument (YYYYMM or YYYY_MM or YYYY-MM)
+    month_arg = sys.argv[1] if len(sys.argv) > 1 else None
+    interactive = False
     try:
-        if sys.stdin and sys.stdin.isatty():
-            input("\nPress Enter to finish...")
+        interactive = bool(sys.stdin and sys.stdin.isatty())
     except Exception:
         pass
+    # If interactive, ask user; otherwise default to last month
+    if month_arg is None and interactive:
+        month_arg = get_month_from_user()
+    try:
+        generate(month_arg)
+        code = 0
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        code = 1
+    if interactive:
+        input("\nPress Enter to finish...")
+    return code
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
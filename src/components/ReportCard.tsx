@@ -1,11 +1,12 @@
 import { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { Shield, Globe, AlertTriangle, Server, FileText, Calendar, ArrowRight } from 'lucide-react';
+import { format } from 'date-fns';
+import { Shield, Globe, AlertTriangle, Server, FileText, Calendar, ArrowRight, Activity } from 'lucide-react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Skeleton } from '@/components/ui/skeleton';
-import { ReportType, REPORT_TYPES, ReportSummary } from '@/lib/types';
-import { fetchReportSummary } from '@/lib/api';
+import { ReportType, REPORT_TYPES, ReportSummary, ReportData } from '@/lib/types';
+import { fetchReportData, fetchReportSummary } from '@/lib/api';
 import { cn } from '@/lib/utils';
 
 const iconMap = {
@@ -21,6 +22,8 @@ interface ReportCardProps {
 
 export function ReportCard({ type }: ReportCardProps) {
   const [summary, setSummary] = useState<ReportSummary | null>(null);
+  // aggregates for today so far (syslog / FortiAnalyzer feeds, or an upload); null when there are none
+  const [today, setToday] = useState<ReportData | null>(null);
   const [loading, setLoading] = useState(true);
 
   const metadata = REPORT_TYPES[type];
@@ -31,6 +34,7 @@ export function ReportCard({ type }: ReportCardProps) {
       setSummary(data);
       setLoading(false);
     });
+    fetchReportData(type, 'daily', format(new Date(), 'yyyy-MM-dd'), 1).then(setToday);
   }, [type]);
 
   const formatDate = (dateStr: string | null) => {
@@ -109,6 +113,15 @@ export function ReportCard({ type }: ReportCardProps) {
               </div>
             </div>
 
+            {today && (
+              <div className="flex items-center gap-2 text-xs text-muted-foreground">
+                <Activity className="h-4 w-4" />
+                <span>
+                  Today so far: {today.total.toLocaleString()} events, {today.notable.toLocaleString()} notable
+                </span>
+              </div>
+            )}
+
             <Link to={`/${type}`} className="block">
               <Button className={cn('w-full gap-2', colorClasses[type])}>
                 View Reports
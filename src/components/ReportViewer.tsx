@@ -1,9 +1,10 @@
-import { useState, useRef } from 'react';
+import { useState, useRef, useEffect } from 'react';
 import { Maximize2, Minimize2, Download, ExternalLink, FileX } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card } from '@/components/ui/card';
 import { Skeleton } from '@/components/ui/skeleton';
-import { getReportFileUrl, downloadReport, generateReport, checkRawLog } from '@/lib/api';
+import { getReportFileUrl, downloadReport, generateReport, checkRawLog, subscribeJob } from '@/lib/api';
+import type { Job } from '@/lib/types';
 import { cn } from '@/lib/utils';
 
 interface ReportViewerProps {
@@ -101,11 +102,17 @@ export function ReportViewer({ path, filename, type, mode, selectedDate, onGener
   const [isFullscreen, setIsFullscreen] = useState(false);
   const [loading, setLoading] = useState(true);
   const [genLoading, setGenLoading] = useState(false);
+  const [genJob, setGenJob] = useState<Job | null>(null);
+  const unsubscribeRef = useRef<(() => void) | null>(null);
   const iframeRef = useRef<HTMLIFrameElement>(null);
 
+  // stop following a job when the viewer goes away
+  useEffect(() => () => unsubscribeRef.current?.(), []);
+
   const handleGenerate = async () => {
     if (!mode) return alert('Missing mode for generation');
     setGenLoading(true);
+    let following = false;
     try {
       // Validate source data
       if (mode === 'monthly') {
@@ -128,17 +135,37 @@ export function ReportViewer({ path, filename, type, mode, selectedDate, onGener
         }
       }
 
-      await generateReport(mode, type, selectedDate || undefined);
-      // let parent refresh lists
-      onGenerated?.();
-      alert('Generation started — check error_logs for progress');
+      const started = await generateReport(mode, type, selectedDate || undefined);
+      unsubscribeRef.current?.();
+      unsubscribeRef.current = subscribeJob(started.job_id, setGenJob, (job) => {
+        setGenJob(null);
+        setGenLoading(false);
+        if (job.status === 'succeeded') {
+          // let parent refresh lists
+          onGenerated?.();
+        } else if (job.status === 'failed') {
+          alert(`Report generation failed: ${job.error ?? 'unknown error'}`);
+        }
+      });
+      following = true;
     } catch (e) {
       alert('Failed to start generation. See console for details.');
     } finally {
-      setGenLoading(false);
+      // while following a job the button stays busy until the completion event
+      if (!following) setGenLoading(false);
     }
   };
 
+  const genLabel = () => {
+    if (!genJob) return 'Starting...';
+    if (genJob.status === 'queued') return 'Queued...';
+    const { stage, percent, eta } = genJob.progress ?? {};
+    let label = stage ? `${stage.charAt(0).toUpperCase()}${stage.slice(1)}` : 'Running';
+    if (percent != null && percent < 100) label += ` ${Math.round(percent)}%`;
+    if (eta) label += ` (~${Math.ceil(eta)}s left)`;
+    return `${label}...`;
+  };
+
   const reportUrl = path ? getReportFileUrl(path) : '';
   const isDemo = !reportUrl;
 
@@ -176,7 +203,7 @@ export function ReportViewer({ path, filename, type, mode, selectedDate, onGener
           <p className="text-sm text-muted-foreground">This report has not been generated yet.</p>
           <div className="mt-4 flex items-center justify-center gap-3">
             <Button onClick={handleGenerate} disabled={genLoading || !mode}>
-              {genLoading ? 'Starting...' : mode === 'daily' ? 'Generate Daily Report' : 'Generate Monthly Report'}
+              {genLoading ? genLabel() : mode === 'daily' ? 'Generate Daily Report' : 'Generate Monthly Report'}
             </Button>
           </div>
         </div>
@@ -1,4 +1,4 @@
-import { ReportType, DailyReport, MonthlyReport, ReportSummary } from './types';
+import { ReportType, DailyReport, MonthlyReport, ReportSummary, Job, ReportData } from './types';
 
 const API_BASE = 'http://127.0.0.1:8000/api';
 
@@ -85,6 +85,30 @@ export async function fetchReportSummary(type: ReportType): Promise<ReportSummar
   };
 }
 
+// Aggregates behind a report (date: YYYY-MM-DD for daily, YYYY-MM for monthly); null if there are none
+export async function fetchReportData(
+  type: ReportType,
+  mode: 'daily' | 'monthly',
+  date: string,
+  top?: number
+): Promise<ReportData | null> {
+  if (DEMO_MODE) {
+    // no aggregates without the backend; callers treat this as "no data"
+    return null;
+  }
+
+  const query = top ? `?top=${top}` : '';
+  try {
+    const response = await fetch(`${API_BASE}/reports/${type}/${mode}/${encodeURIComponent(date)}/data${query}`);
+    if (response.status === 404) return null;
+    if (!response.ok) throw new Error('Failed to fetch report data');
+    return response.json();
+  } catch (error) {
+    console.error('Error fetching report data:', error);
+    return null;
+  }
+}
+
 export function getReportFileUrl(path: string): string {
   if (DEMO_MODE) {
     // In demo mode, return a placeholder
@@ -149,6 +173,26 @@ export async function generateReport(
   }
 }
 
+// Follow a generation job over server-sent events. Returns a function that closes the stream.
+export function subscribeJob(
+  jobId: string,
+  onProgress: (job: Job) => void,
+  onComplete: (job: Job) => void
+): () => void {
+  const source = new EventSource(`${API_BASE}/jobs/${jobId}/events`);
+  source.addEventListener('progress', (e) => onProgress(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener('complete', (e) => {
+    source.close();
+    onComplete(JSON.parse((e as MessageEvent).data));
+  });
+  source.onerror = () => {
+    // the server closes the stream after "complete"; don't let EventSource reconnect
+    if (source.readyState === EventSource.CLOSED) return;
+    console.error('Lost connection to job events:', jobId);
+  };
+  return () => source.close();
+}
+
 export async function checkRawLog(type: ReportType, dateYmd: string): Promise<boolean> {
   try {
     const resp = await fetch(`${API_BASE}/check_raw/${type}?date=${encodeURIComponent(dateYmd)}`);
@@ -27,6 +27,46 @@ export interface MonthlyReport {
   path: string;
 }
 
+export interface JobProgress {
+  stage?: string | null;
+  bytes_read?: number;
+  total_bytes?: number | null;
+  lines?: number;
+  done?: number;
+  total?: number;
+  percent?: number | null;
+  eta?: number | null;
+}
+
+export interface Job {
+  id: string;
+  mode: 'daily' | 'monthly';
+  type: ReportType;
+  date: string | null;
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+  error: string | null;
+  progress: JobProgress;
+}
+
+// [value, count], most frequent first
+export type TopEntry = [string, number];
+
+export interface ReportData {
+  type: ReportType;
+  period: 'daily' | 'monthly';
+  date?: string;
+  month?: string;
+  total: number;
+  notable: number;
+  top: Record<string, TopEntry[]>;
+  pie: { field: string; labels: string[]; values: number[] };
+  hourly: number[];
+  // monthly only: one entry per day with data
+  days?: string[];
+  daily_total?: number[];
+  daily_notable?: number[];
+}
+
 export const REPORT_TYPES: Record<ReportType, ReportMetadata> = {
   appctrl: {
     type: 'appctrl',